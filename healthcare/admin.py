@@ -1,12 +1,91 @@
 from django.contrib import admin
+from django.contrib.admin.options import IncorrectLookupParameters
 from django.contrib.auth.admin import UserAdmin
-from .models import User, Appointment, MedicalRecord, Notification, Task, VitalSigns
+from django.db import models
+from django.db.models import Q
+from .models import (User, Appointment, DoctorSchedule, MedicalRecord, Notification, NotificationOutbox,
+                     Task, VitalSigns)
+from .forms import AvatarField
+from .pagination import EstimatedCountPaginator
+from .search import search_filter
+
+class ScalableAdminMixin:
+    """Keep changelists and change forms cheap on large tables.
+    
+    Related users are joined into every query (their __str__ reads names),
+    user foreign keys are picked through autocomplete instead of a <select>
+    of every user, and the changelist never counts the whole table.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    
+    def get_queryset(self, request):
+        # list_select_related only covers the changelist; change and delete pages print __str__ too
+        queryset = super().get_queryset(request)
+        if self.list_select_related:
+            queryset = queryset.select_related(*self.list_select_related)
+        return queryset
+
+class RoleUserFilter(admin.SimpleListFilter):
+    """Filter on a user foreign key by user ID.
+    
+    A link per active doctor or nurse grows with the staff, so the sidebar
+    offers an ID input and only looks up the name of the selected user.
+    """
+    template = 'admin/user_id_filter.html'
+    roles = []
+    
+    def lookups(self, request, model_admin):
+        value = self.value()
+        if not value or not value.isdigit():
+            return []
+        user = User.objects.filter(pk=value, role__in=self.roles).only('username', 'first_name', 'last_name').first()
+        return [(user.pk, user.get_full_name() or user.username)] if user else []
+    
+    def has_output(self):
+        return True
+    
+    def choices(self, changelist):
+        # The input submits a GET form, so carry the changelist's other parameters along
+        self.hidden_params = [(name, value) for name, value in changelist.params.items()
+                              if name != self.parameter_name]
+        yield {
+            'selected': self.value() is None,
+            'query_string': changelist.get_query_string(remove=[self.parameter_name]),
+            'display': 'All',
+        }
+        for pk, name in self.lookup_choices:
+            yield {
+                'selected': True,
+                'query_string': changelist.get_query_string({self.parameter_name: pk}),
+                'display': name,
+            }
+    
+    def queryset(self, request, queryset):
+        value = self.value()
+        if value and not value.isdigit():
+            raise IncorrectLookupParameters(f'Invalid {self.title} ID')
+        if value:
+            return queryset.filter(**{f'{self.parameter_name}_id': value})
+        return queryset
+
+class DoctorFilter(RoleUserFilter):
+    title = 'doctor'
+    parameter_name = 'doctor'
+    roles = ['doctor']
+
+class RecordedByFilter(RoleUserFilter):
+    title = 'recorded by'
+    parameter_name = 'recorded_by'
+    roles = ['doctor', 'nurse']
 
 @admin.register(User)
-class CustomUserAdmin(UserAdmin):
+class CustomUserAdmin(ScalableAdminMixin, UserAdmin):
     list_display = ('username', 'email', 'first_name', 'last_name', 'role', 'is_active')
     list_filter = ('role', 'is_active', 'date_joined')
-    search_fields = ('username', 'email', 'first_name', 'last_name')
+    # Prefix matches keep the autocomplete lookups behind every user field cheap
+    search_fields = ('^username', '^email', '^first_name', '^last_name')
+    formfield_overrides = {models.ImageField: {'form_class': AvatarField}}
     
     fieldsets = UserAdmin.fieldsets + (
         ('Additional Info', {
@@ -15,34 +94,66 @@ class CustomUserAdmin(UserAdmin):
     )
 
 @admin.register(Appointment)
-class AppointmentAdmin(admin.ModelAdmin):
+class AppointmentAdmin(ScalableAdminMixin, admin.ModelAdmin):
     list_display = ('patient', 'doctor', 'date', 'time', 'status', 'type')
-    list_filter = ('status', 'date', 'type')
-    search_fields = ('patient__username', 'doctor__username', 'type')
-    date_hierarchy = 'date'
+    list_filter = ('status', 'date', 'type', DoctorFilter)
+    list_select_related = ('patient', 'doctor')
+    search_fields = ('^patient__username', '^doctor__username', 'type')
+    autocomplete_fields = ('patient', 'doctor')
+    ordering = ('-date',)
+
+@admin.register(DoctorSchedule)
+class DoctorScheduleAdmin(ScalableAdminMixin, admin.ModelAdmin):
+    list_display = ('doctor', 'weekday', 'start_time', 'end_time')
+    list_filter = ('weekday', DoctorFilter)
+    list_select_related = ('doctor',)
+    search_fields = ('doctor__username', 'doctor__first_name', 'doctor__last_name')
+    autocomplete_fields = ('doctor',)
 
 @admin.register(MedicalRecord)
-class MedicalRecordAdmin(admin.ModelAdmin):
+class MedicalRecordAdmin(ScalableAdminMixin, admin.ModelAdmin):
     list_display = ('patient', 'doctor', 'diagnosis', 'date')
-    list_filter = ('date', 'doctor')
-    search_fields = ('patient__username', 'doctor__username', 'diagnosis')
-    date_hierarchy = 'date'
+    list_filter = ('date', DoctorFilter)
+    list_select_related = ('patient', 'doctor')
+    search_fields = ('^patient__username', '^doctor__username')
+    autocomplete_fields = ('patient', 'doctor')
+    ordering = ('-date',)
+    
+    def get_search_results(self, request, queryset, search_term):
+        # Match usernames by prefix and the record text through the full-text index
+        by_user, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        if not search_term:
+            return by_user, may_have_duplicates
+        return queryset.filter(Q(pk__in=by_user.values('pk')) | search_filter(search_term, queryset.db)), False
 
 @admin.register(Notification)
-class NotificationAdmin(admin.ModelAdmin):
+class NotificationAdmin(ScalableAdminMixin, admin.ModelAdmin):
     list_display = ('user', 'title', 'type', 'is_read', 'created_at')
     list_filter = ('type', 'is_read', 'created_at')
-    search_fields = ('user__username', 'title', 'message')
+    list_select_related = ('user',)
+    search_fields = ('^user__username', 'title', 'message')
+    autocomplete_fields = ('user',)
+    # IDs follow creation order, and unlike created_at the primary key is indexed
+    ordering = ('-pk',)
+
+@admin.register(NotificationOutbox)
+class NotificationOutboxAdmin(admin.ModelAdmin):
+    list_display = ('title', 'audience', 'role', 'type', 'created_at', 'processed_at')
+    list_filter = ('audience', 'role', 'type')
+    readonly_fields = ('created_at', 'processed_at')
 
 @admin.register(Task)
-class TaskAdmin(admin.ModelAdmin):
+class TaskAdmin(ScalableAdminMixin, admin.ModelAdmin):
     list_display = ('title', 'assigned_to', 'patient', 'priority', 'status', 'due_date')
     list_filter = ('priority', 'status', 'due_date')
-    search_fields = ('title', 'assigned_to__username', 'patient__username')
+    list_select_related = ('assigned_to', 'patient')
+    search_fields = ('title', '^assigned_to__username', '^patient__username')
+    autocomplete_fields = ('assigned_to', 'patient')
 
 @admin.register(VitalSigns)
-class VitalSignsAdmin(admin.ModelAdmin):
+class VitalSignsAdmin(ScalableAdminMixin, admin.ModelAdmin):
     list_display = ('patient', 'blood_pressure', 'heart_rate', 'temperature', 'recorded_at')
-    list_filter = ('recorded_at', 'recorded_by')
-    search_fields = ('patient__username', 'recorded_by__username')
-    date_hierarchy = 'recorded_at'
\ No newline at end of file
+    list_filter = ('recorded_at', RecordedByFilter)
+    list_select_related = ('patient', 'recorded_by')
+    search_fields = ('^patient__username', '^recorded_by__username')
+    autocomplete_fields = ('patient', 'recorded_by')
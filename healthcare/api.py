@@ -0,0 +1,168 @@
+import hashlib
+import json
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.forms.models import model_to_dict
+from django.utils.http import quote_etag
+from .forms import AppointmentForm, MedicalRecordForm, NotificationForm, TaskForm, VitalSignsForm
+from .models import Appointment, MedicalRecord, Notification, Task, VitalSigns
+from .notifications import decrement_unread, increment_unread, publish_unread_count
+from .scheduling import SlotUnavailable, book_appointment
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+class ApiResource:
+    """JSON API over one model.
+    
+    Objects are scoped with the same visible_to()/editable_by() rules as the
+    HTML views, rows are serialized straight from values(), and writes go
+    through the model's existing form so validation matches the web UI.
+    """
+    model = None
+    fields = []
+    form_class = None
+    create_roles = []
+    
+    def visible(self, user):
+        return self.model.objects.visible_to(user)
+    
+    def editable(self, user):
+        return self.model.objects.editable_by(user)
+    
+    def columns(self, fields=None):
+        """Validate a ?fields= value and return the columns to serialize."""
+        if not fields:
+            return list(self.fields)
+        columns = [field.strip() for field in fields.split(',') if field.strip()]
+        unknown = [column for column in columns if column not in self.fields]
+        if unknown:
+            raise ApiError(f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(self.fields)}")
+        return columns
+    
+    def rows(self, pks, columns):
+        # values() yields plain dicts, so no model instances are built
+        return list(self.model.objects.filter(pk__in=pks).order_by('-pk').values(*columns))
+    
+    def get_form(self, user, data, instance=None):
+        return self.form_class(data=data, instance=instance)
+    
+    def form_data(self, payload, form_fields, instance=None):
+        """Merge a JSON payload over the instance's current values; patient_id is accepted for patient."""
+        data = model_to_dict(instance, fields=form_fields) if instance is not None else {}
+        for key, value in payload.items():
+            if key.endswith('_id') and key[:-3] in form_fields:
+                key = key[:-3]
+            data[key] = value
+        return data
+    
+    def save(self, form, user, created):
+        return form.save()
+
+class AppointmentResource(ApiResource):
+    model = Appointment
+    fields = ['id', 'patient_id', 'doctor_id', 'date', 'time', 'status', 'type', 'notes', 'created_at', 'updated_at']
+    form_class = AppointmentForm
+    create_roles = ['patient']
+    
+    def get_form(self, user, data, instance=None):
+        return self.form_class(data=data, instance=instance, user=user)
+    
+    def save(self, form, user, created):
+        if created:
+            form.instance.patient = user
+        try:
+            return book_appointment(form.instance)
+        except SlotUnavailable as e:
+            raise ApiError(str(e), status=409)
+
+class MedicalRecordResource(ApiResource):
+    model = MedicalRecord
+    fields = ['id', 'patient_id', 'doctor_id', 'date', 'diagnosis', 'treatment', 'prescription', 'notes',
+              'created_at', 'updated_at']
+    form_class = MedicalRecordForm
+    create_roles = ['doctor']
+    
+    def get_form(self, user, data, instance=None):
+        return self.form_class(data=data, instance=instance, user=user)
+    
+    def save(self, form, user, created):
+        if created:
+            form.instance.doctor = user
+        return form.save()
+
+class TaskResource(ApiResource):
+    model = Task
+    fields = ['id', 'title', 'description', 'assigned_to_id', 'patient_id', 'priority', 'status', 'due_date',
+              'created_at', 'updated_at', 'completed_at']
+    form_class = TaskForm
+    create_roles = ['doctor', 'nurse', 'super_admin']
+
+class VitalSignsResource(ApiResource):
+    model = VitalSigns
+    fields = ['id', 'patient_id', 'recorded_by_id', 'recorded_at', 'blood_pressure_systolic',
+              'blood_pressure_diastolic', 'heart_rate', 'temperature', 'oxygen_saturation', 'weight', 'height',
+              'notes', 'updated_at']
+    form_class = VitalSignsForm
+    create_roles = ['nurse', 'doctor']
+    
+    def save(self, form, user, created):
+        if created:
+            form.instance.recorded_by = user
+        return form.save()
+
+class NotificationResource(ApiResource):
+    model = Notification
+    fields = ['id', 'title', 'message', 'type', 'is_read', 'created_at', 'updated_at']
+    form_class = NotificationForm
+    
+    def visible(self, user):
+        return Notification.objects.filter(user=user)
+    
+    def editable(self, user):
+        return Notification.objects.filter(user=user)
+    
+    def save(self, form, user, created):
+        changed = 'is_read' in form.changed_data
+        notification = form.save()
+        # Keep the cached unread badge in step, as mark_notification_read does
+        if changed:
+            if notification.is_read:
+                decrement_unread(user.pk)
+            else:
+                increment_unread(user.pk)
+            publish_unread_count(user.pk)
+        return notification
+
+RESOURCES = {
+    'appointments': AppointmentResource(),
+    'medical-records': MedicalRecordResource(),
+    'tasks': TaskResource(),
+    'vitals': VitalSignsResource(),
+    'notifications': NotificationResource(),
+}
+
+def page_size(value):
+    if not value:
+        return settings.API_PAGE_SIZE
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ApiError('limit must be a number.')
+    return max(1, min(limit, settings.API_MAX_PAGE_SIZE))
+
+def parse_payload(request):
+    try:
+        payload = json.loads(request.body or b'{}')
+    except ValueError:
+        raise ApiError('Request body must be JSON.')
+    if not isinstance(payload, dict):
+        raise ApiError('Request body must be a JSON object.')
+    return payload
+
+def compute_etag(*parts):
+    """Strong ETag over the JSON encoding of parts, e.g. (pk, updated_at) pairs."""
+    encoded = json.dumps(parts, cls=DjangoJSONEncoder, separators=(',', ':')).encode()
+    return quote_etag(hashlib.md5(encoded, usedforsecurity=False).hexdigest())
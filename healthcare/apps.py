@@ -2,4 +2,7 @@ from django.apps import AppConfig
 
 class HealthcareConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'healthcare'
\ No newline at end of file
+    name = 'healthcare'
+    
+    def ready(self):
+        from . import signals  # noqa: F401
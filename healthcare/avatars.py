@@ -0,0 +1,112 @@
+import hashlib
+import io
+import re
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from PIL import Image, ImageOps
+from .models import User
+
+THUMBNAIL_DIR = 'avatars/thumbs'
+
+# Output formats: WebP for browsers that take it, JPEG as the fallback
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpg': ('JPEG', {'quality': 85, 'optimize': True, 'progressive': True}),
+}
+
+CONTENT_TYPES = {'webp': 'image/webp', 'jpg': 'image/jpeg'}
+
+THUMBNAIL_FILENAME = re.compile(r'[0-9a-f]{64}-\d+\.(webp|jpg)')
+
+_worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix='avatars')
+
+class AvatarRejected(ValueError):
+    pass
+
+def check_dimensions(image):
+    """Reject images whose header declares more pixels than AVATAR_MAX_PIXELS.
+    
+    Image.open() only reads the header, so this runs before any pixel data
+    is decoded and a decompression bomb costs almost nothing to refuse.
+    """
+    width, height = image.size
+    if width * height > settings.AVATAR_MAX_PIXELS:
+        raise AvatarRejected(f'Images may have at most {settings.AVATAR_MAX_PIXELS:,} pixels.')
+
+def thumbnail_filename(digest, size, ext):
+    return f'{digest}-{size}.{ext}'
+
+def thumbnail_name(digest, size, ext):
+    return f'{THUMBNAIL_DIR}/{thumbnail_filename(digest, size, ext)}'
+
+def file_digest(file):
+    hasher = hashlib.sha256()
+    file.seek(0)
+    for chunk in file.chunks():
+        hasher.update(chunk)
+    file.seek(0)
+    return hasher.hexdigest()
+
+def render_thumbnails(file, digest):
+    """Write every AVATAR_SIZES thumbnail of an image under its content digest.
+    
+    Names depend only on the original's content and the size, so existing
+    thumbnails are reused and a served thumbnail never changes.
+    """
+    sizes = sorted(settings.AVATAR_SIZES, reverse=True)
+    wanted = [(size, ext) for size in sizes for ext in FORMATS
+              if not default_storage.exists(thumbnail_name(digest, size, ext))]
+    if not wanted:
+        return
+    
+    file.seek(0)
+    with Image.open(file) as image:
+        check_dimensions(image)
+        # Let the JPEG decoder scale down while decoding; it keeps at least the requested size
+        image.draft('RGB', (sizes[0], sizes[0]))
+        image = ImageOps.exif_transpose(image)
+        has_alpha = image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+    
+    for size, ext in wanted:
+        thumbnail = ImageOps.fit(image, (size, size), Image.LANCZOS)
+        fmt, options = FORMATS[ext]
+        if fmt == 'JPEG' and thumbnail.mode == 'RGBA':
+            background = Image.new('RGB', thumbnail.size, 'white')
+            background.paste(thumbnail, mask=thumbnail.getchannel('A'))
+            thumbnail = background
+        buffer = io.BytesIO()
+        thumbnail.save(buffer, fmt, **options)
+        default_storage.save(thumbnail_name(digest, size, ext), ContentFile(buffer.getvalue()))
+
+def process_avatar(user_id):
+    """Render thumbnails for a user's current avatar and record its digest.
+    
+    The digest is only stored if the avatar was not replaced meanwhile, so a
+    slow run never points a user at thumbnails of an older upload.
+    """
+    user = User.objects.filter(pk=user_id).only('avatar').first()
+    if user is None or not user.avatar:
+        return None
+    with user.avatar.open('rb') as file:
+        digest = file_digest(file)
+        render_thumbnails(file, digest)
+    User.objects.filter(pk=user_id, avatar=user.avatar.name).update(avatar_digest=digest)
+    return digest
+
+def queue_avatar(user_id):
+    """Process a new avatar after the transaction commits, off the request thread."""
+    if settings.AVATAR_THUMBNAILS_IN_THREAD:
+        transaction.on_commit(lambda: _worker.submit(_process_in_thread, user_id))
+
+def _process_in_thread(user_id):
+    try:
+        process_avatar(user_id)
+    except (OSError, AvatarRejected, Image.DecompressionBombError):
+        # Unreadable images keep being served as uploaded; rebuild_avatar_thumbnails reports them
+        pass
+    finally:
+        connections.close_all()
@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.db.backends.sqlite3 import base
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """SQLite backend tuned for many concurrent writers.
+    
+    Every new connection applies SQLITE_PRAGMAS (WAL journal, so readers
+    never wait for the writer), and transactions start with BEGIN IMMEDIATE.
+    A deferred BEGIN that reads first and writes later cannot wait for the
+    lock when another writer got there in between, and fails at once with
+    "database is locked"; an immediate one queues on the busy timeout.
+    """
+    
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+    
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute('BEGIN IMMEDIATE')
@@ -0,0 +1,181 @@
+import json
+import tracemalloc
+from time import perf_counter
+from urllib.parse import urlencode
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection, transaction
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+from . import urls
+from .avatars import thumbnail_filename
+from .middleware import QueryRecorder, percentile
+from .models import User, Appointment, MedicalRecord, Notification, Task, VitalSigns
+
+ROLES = ['anonymous', 'patient', 'doctor', 'nurse', 'super_admin']
+
+# URLs that cannot be timed as a plain request/response
+SKIPPED = {
+    'logout': 'ends the benchmark session',
+    'event_stream': 'streams until the client disconnects',
+    'api_sync_vitals': 'only accepts uploads',
+}
+
+def _first(queryset, field='pk'):
+    return queryset.order_by().values_list(field, flat=True).first()
+
+def _target(name, user):
+    """Return (kwargs, query) for a URL name as seen by user, or None if nothing applies."""
+    if name == 'register':
+        return {'role': 'patient'}, {}
+    if name == 'appointment_slots':
+        doctor = _first(User.objects.filter(role='doctor', is_active=True))
+        return {}, {'doctor': doctor, 'date': timezone.localdate().isoformat()} if doctor else {}
+    if name in ['appointment_update', 'appointment_approve', 'appointment_reject']:
+        appointments = Appointment.objects.visible_to(user)
+        if name != 'appointment_update':
+            appointments = appointments.filter(status='pending')
+        pk = _first(appointments)
+        return ({'pk': pk}, {}) if pk else None
+    if name == 'medical_record_detail':
+        pk = _first(MedicalRecord.objects.visible_to(user))
+        return ({'pk': pk}, {}) if pk else None
+    if name in ['task_update', 'task_complete']:
+        pk = _first(Task.objects.visible_to(user))
+        return ({'pk': pk}, {}) if pk else None
+    if name == 'vitals_trend':
+        patient_id = _first(VitalSigns.objects.visible_to(user), 'patient_id')
+        return ({'patient_id': patient_id}, {}) if patient_id else None
+    if name == 'notification_mark_read':
+        pk = _first(Notification.objects.filter(user=user)) if user.is_authenticated else None
+        return ({'pk': pk}, {}) if pk else None
+    if name == 'avatar_thumbnail':
+        # The digest is only set once the thumbnails have been rendered
+        digest = _first(User.objects.exclude(avatar_digest=''), 'avatar_digest')
+        return ({'filename': thumbnail_filename(digest, min(settings.AVATAR_SIZES), 'webp')}, {}) if digest else None
+    if name == 'user_search':
+        return {}, {'role': 'doctor', 'q': 'a'}
+    if name == 'user_detail':
+        return {'pk': user.pk or _first(User.objects.all())}, {}
+    if name == 'api_list':
+        return {'resource': 'appointments'}, {}
+    if name == 'api_detail':
+        pk = _first(Appointment.objects.visible_to(user))
+        return ({'resource': 'appointments', 'pk': pk}, {}) if pk else None
+    if name == 'export_data':
+        # One patient's chart keeps the export bounded at any scale
+        patient_id = _first(MedicalRecord.objects.visible_to(user), 'patient_id')
+        return ({'dataset': 'medical_records'}, {'patient': patient_id}) if patient_id else None
+    return {}, {}
+
+def benchmark_users():
+    """Pick one active user per role, preferring one with appointments or tasks to show."""
+    users = {'anonymous': AnonymousUser()}
+    candidates = {
+        'patient': User.objects.filter(role='patient', is_active=True, patient_appointments__isnull=False),
+        'doctor': User.objects.filter(role='doctor', is_active=True, doctor_appointments__isnull=False),
+        'nurse': User.objects.filter(role='nurse', is_active=True, assigned_tasks__isnull=False),
+        'super_admin': User.objects.filter(role='super_admin', is_active=True),
+    }
+    for role, queryset in candidates.items():
+        users[role] = queryset.order_by('pk').first() or User.objects.filter(role=role, is_active=True).first()
+    return users
+
+def _request(client, path):
+    response = client.get(path)
+    if response.streaming:
+        for chunk in response.streaming_content:
+            pass
+    return response
+
+def measure(client, path, iterations):
+    _request(client, path)  # warm caches and connections
+    timings = []
+    queries = []
+    status = None
+    for _ in range(iterations):
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            start = perf_counter()
+            status = _request(client, path).status_code
+            timings.append((perf_counter() - start) * 1000)
+        queries.append(recorder.count)
+    
+    # Measured separately because tracing allocations slows every request down
+    tracemalloc.start()
+    _request(client, path)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        'path': path,
+        'status': status,
+        'p50_ms': round(percentile(timings, 0.5), 2),
+        'p95_ms': round(percentile(timings, 0.95), 2),
+        'p99_ms': round(percentile(timings, 0.99), 2),
+        'queries': percentile(queries, 0.5),
+        'peak_kb': round(peak / 1024, 1),
+    }
+
+def run_benchmarks(iterations=20, roles=None, names=None, log=None):
+    """Request every healthcare URL as each role and return {'role:url_name': result}.
+    
+    Everything runs in one transaction that is rolled back, so views that
+    change data (approve, complete, mark read) leave the database as it was.
+    """
+    log = log or (lambda message: None)
+    users = benchmark_users()
+    patterns = [pattern for pattern in urls.urlpatterns if pattern.name and (not names or pattern.name in names)]
+    results = {}
+    with transaction.atomic():
+        for role in roles or ROLES:
+            user = users.get(role)
+            if user is None:
+                log(f'Skipping {role}: no active user with that role.')
+                continue
+            client = Client(raise_request_exception=False)
+            if user.is_authenticated:
+                client.force_login(user)
+            for pattern in patterns:
+                if pattern.name in SKIPPED:
+                    continue
+                target = _target(pattern.name, user)
+                if target is None:
+                    continue
+                kwargs, query = target
+                path = reverse(pattern.name, kwargs=kwargs)
+                if query:
+                    path = f'{path}?{urlencode(query)}'
+                results[f'{role}:{pattern.name}'] = measure(client, path, iterations)
+        transaction.set_rollback(True)
+    return results
+
+def compare(results, baseline, tolerance=0.25, noise_ms=1.0):
+    """Return {key: [reasons]} for results that regressed against the baseline.
+    
+    A view regresses when its p95 grows by more than tolerance (and more than
+    noise_ms), or when it runs more queries than before.
+    """
+    regressions = {}
+    for key, result in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        reasons = []
+        if result['p95_ms'] > base['p95_ms'] * (1 + tolerance) and result['p95_ms'] - base['p95_ms'] > noise_ms:
+            reasons.append(f"p95 {base['p95_ms']}ms -> {result['p95_ms']}ms")
+        if result['queries'] > base['queries']:
+            reasons.append(f"queries {base['queries']} -> {result['queries']}")
+        if reasons:
+            regressions[key] = reasons
+    return regressions
+
+def load_baseline(path):
+    with open(path) as f:
+        return json.load(f)['results']
+
+def save_baseline(path, results, iterations):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump({'created_at': timezone.now().isoformat(), 'iterations': iterations, 'results': results},
+                  f, indent=2, sort_keys=True)
@@ -0,0 +1,102 @@
+import asyncio
+import json
+import threading
+from collections import defaultdict
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+class Subscription:
+    def __init__(self, broker, channel, maxsize):
+        self.broker = broker
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=maxsize)
+    
+    def offer(self, event):
+        # Runs on the subscriber's event loop; slow consumers drop events rather than grow without bound
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            pass
+    
+    async def get(self, timeout=None):
+        """Return the next event, or None if nothing arrives within timeout seconds."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+    
+    def close(self):
+        self.broker.unsubscribe(self)
+
+class InMemoryBroker:
+    """Process-local pub/sub delivering events to asyncio subscribers.
+    
+    publish() may be called from any thread, including sync views; delivery is
+    handed to each subscriber's event loop. Only connections served by the same
+    process receive events, so multi-process deployments need a shared backend
+    implementing the same publish/subscribe/has_subscribers interface.
+    """
+    
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+    
+    def subscribe(self, channel):
+        subscription = Subscription(self, channel, settings.EVENTS_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers[channel].add(subscription)
+        return subscription
+    
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.channel]
+    
+    def has_subscribers(self, channel):
+        return channel in self._subscribers
+    
+    def publish(self, channel, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.offer, event)
+            except RuntimeError:
+                # The subscriber's loop has already shut down
+                self.unsubscribe(subscription)
+
+_broker = None
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        _broker = import_string(settings.EVENTS_BROKER)()
+    return _broker
+
+def user_channel(user_id):
+    return f'user:{user_id}'
+
+def has_listeners(user_id):
+    return get_broker().has_subscribers(user_channel(user_id))
+
+def publish_to_user(user_id, event, data):
+    """Publish an event to a user's live connections once the current transaction commits.
+    
+    data may be a callable, evaluated at commit time, so counters read after
+    they have been updated. Nothing is done for users with no open stream.
+    """
+    if not has_listeners(user_id):
+        return
+    
+    def publish():
+        payload = data() if callable(data) else data
+        get_broker().publish(user_channel(user_id), {'event': event, 'data': payload})
+    transaction.on_commit(publish)
+
+def format_event(event, data):
+    return f'event: {event}\ndata: {json.dumps(data, default=str)}\n\n'
@@ -0,0 +1,154 @@
+import csv
+import io
+from datetime import datetime, time, timedelta
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.utils import timezone
+from .models import Appointment, MedicalRecord, VitalSigns
+
+FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'jsonl': ('application/jsonl', 'jsonl'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+class ExportDataset:
+    def __init__(self, model, columns, date_field, doctor_field=None):
+        self.model = model
+        self.columns = columns
+        self.date_field = date_field
+        self.doctor_field = doctor_field
+    
+    def fields(self):
+        return [self.model._meta.get_field(column) for column in self.columns]
+    
+    def headers(self):
+        # Foreign keys are exported as their raw IDs, e.g. patient_id
+        return [field.attname for field in self.fields()]
+
+DATASETS = {
+    'medical_records': ExportDataset(
+        MedicalRecord,
+        ['id', 'patient', 'doctor', 'date', 'diagnosis', 'treatment', 'prescription', 'notes', 'created_at'],
+        date_field='date', doctor_field='doctor',
+    ),
+    'vitals': ExportDataset(
+        VitalSigns,
+        ['id', 'patient', 'recorded_by', 'recorded_at', 'blood_pressure_systolic', 'blood_pressure_diastolic',
+         'heart_rate', 'temperature', 'oxygen_saturation', 'weight', 'height', 'notes'],
+        date_field='recorded_at',
+    ),
+    'appointments': ExportDataset(
+        Appointment,
+        ['id', 'patient', 'doctor', 'date', 'time', 'status', 'type', 'notes', 'created_at'],
+        date_field='date', doctor_field='doctor',
+    ),
+}
+
+def export_queryset(dataset, queryset=None, patient=None, doctor=None, start=None, end=None):
+    """Filter a dataset for export; start and end are inclusive dates."""
+    spec = DATASETS[dataset]
+    queryset = spec.model.objects.all() if queryset is None else queryset
+    if patient:
+        queryset = queryset.filter(patient_id=patient)
+    if doctor:
+        if spec.doctor_field is None:
+            raise ValueError(f'{dataset} cannot be filtered by doctor.')
+        queryset = queryset.filter(**{f'{spec.doctor_field}_id': doctor})
+    
+    date_field = spec.date_field
+    # Compare timestamps against day boundaries so the index on the column is used
+    if isinstance(spec.model._meta.get_field(date_field), models.DateTimeField):
+        if start:
+            queryset = queryset.filter(**{f'{date_field}__gte': timezone.make_aware(datetime.combine(start, time.min))})
+        if end:
+            queryset = queryset.filter(**{f'{date_field}__lt': timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min))})
+    else:
+        if start:
+            queryset = queryset.filter(**{f'{date_field}__gte': start})
+        if end:
+            queryset = queryset.filter(**{f'{date_field}__lte': end})
+    return queryset
+
+def _iter_chunks(dataset, queryset, chunk_size):
+    # values_list() skips model instances and iterator() streams from the cursor,
+    # so only one chunk of tuples is held in memory at a time
+    spec = DATASETS[dataset]
+    rows = queryset.order_by('pk').values_list(*spec.headers()).iterator(chunk_size=chunk_size)
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _csv_stream(dataset, chunks):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(DATASETS[dataset].headers())
+    yield buffer.getvalue().encode()
+    for chunk in chunks:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(chunk)
+        yield buffer.getvalue().encode()
+
+def _jsonl_stream(dataset, chunks):
+    columns = DATASETS[dataset].headers()
+    encoder = DjangoJSONEncoder(separators=(',', ':'))
+    for chunk in chunks:
+        yield ''.join(encoder.encode(dict(zip(columns, row))) + '\n' for row in chunk).encode()
+
+def _arrow_type(pa, field):
+    if isinstance(field, models.ForeignKey):
+        field = field.target_field
+    if isinstance(field, models.IntegerField):
+        return pa.int64()
+    if isinstance(field, models.DecimalField):
+        return pa.decimal128(field.max_digits, field.decimal_places)
+    if isinstance(field, models.FloatField):
+        return pa.float64()
+    if isinstance(field, models.BooleanField):
+        return pa.bool_()
+    if isinstance(field, models.DateTimeField):
+        return pa.timestamp('us', tz=settings.TIME_ZONE if settings.USE_TZ else None)
+    if isinstance(field, models.DateField):
+        return pa.date32()
+    if isinstance(field, models.TimeField):
+        return pa.time64('us')
+    return pa.string()
+
+def _parquet_stream(dataset, chunks):
+    # pyarrow is heavy to import, so only Parquet exports pay for it
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    fields = DATASETS[dataset].fields()
+    schema = pa.schema([pa.field(field.attname, _arrow_type(pa, field), nullable=field.null) for field in fields])
+    buffer = io.BytesIO()
+    writer = pq.ParquetWriter(buffer, schema, compression='zstd')
+    # Each chunk becomes a row group; flush whatever the writer produced after it
+    for chunk in chunks:
+        writer.write_table(pa.Table.from_arrays([pa.array(column, type=schema.field(index).type)
+                                                 for index, column in enumerate(zip(*chunk))], schema=schema))
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    writer.close()
+    yield buffer.getvalue()
+
+STREAMS = {
+    'csv': _csv_stream,
+    'jsonl': _jsonl_stream,
+    'parquet': _parquet_stream,
+}
+
+def stream_export(dataset, queryset, fmt, chunk_size=None):
+    """Yield the exported dataset as encoded byte chunks in the given format."""
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+    return STREAMS[fmt](dataset, _iter_chunks(dataset, queryset, chunk_size))
+
+def export_filename(dataset, fmt):
+    return f'{dataset}-{timezone.localdate():%Y%m%d}.{FORMATS[fmt][1]}'
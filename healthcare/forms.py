@@ -1,8 +1,49 @@
+from datetime import timedelta
 from django import forms
+from django.conf import settings
+from django.core.exceptions import ValidationError
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
+from django.forms.utils import flatatt
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.html import format_html
 from crispy_forms.helper import FormHelper
 from crispy_forms.layout import Layout, Submit, Row, Column, Field
 from .models import User, Appointment, MedicalRecord, Task, VitalSigns, Notification
+from .export import FORMATS
+from .scheduling import FULL_DAY, is_slot_aligned, is_slot_free, slot_index, slot_minutes, working_mask
+from .typeahead import user_label
+from .avatars import AvatarRejected, check_dimensions
+from PIL import Image
+
+class UserTypeaheadWidget(forms.Widget):
+    """Search-as-you-type user picker that submits only the chosen user's ID.
+    
+    Unlike a <select> it never lists the field's choices, so the page costs
+    the same however many users there are. Suggestions come from the
+    user_search view, limited to roles.
+    """
+    
+    def __init__(self, roles, attrs=None):
+        super().__init__(attrs)
+        self.roles = list(roles)
+    
+    def render(self, name, value, attrs=None, renderer=None):
+        attrs = self.build_attrs(self.attrs, attrs)
+        input_id = attrs.pop('id', f'id_{name}')
+        label = user_label(int(value)) if str(value or '').isdigit() else ''
+        attrs['class'] = f"{attrs.get('class', '')} form-control".strip()
+        return format_html(
+            '<div class="position-relative">'
+            '<input type="hidden" name="{}" id="{}_value" value="{}">'
+            '<input type="search" id="{}" value="{}" autocomplete="off" data-typeahead="{}?role={}" '
+            'data-typeahead-target="{}_value" placeholder="Type a name, username or phone"{}>'
+            '<div class="list-group position-absolute w-100 shadow-sm" style="z-index: 1000" '
+            'data-typeahead-results></div>'
+            '</div>',
+            name, input_id, value or '', input_id, label, reverse('user_search'), ','.join(self.roles), input_id,
+            flatatt({key: value for key, value in attrs.items() if key not in ('type', 'name', 'value')}),
+        )
 
 class CustomUserCreationForm(UserCreationForm):
     email = forms.EmailField(required=True)
@@ -60,6 +101,7 @@ class AppointmentForm(forms.ModelForm):
             'date': forms.DateInput(attrs={'type': 'date'}),
             'time': forms.TimeInput(attrs={'type': 'time'}),
             'notes': forms.Textarea(attrs={'rows': 3}),
+            'doctor': UserTypeaheadWidget(roles=['doctor']),
         }
     
     def __init__(self, *args, **kwargs):
@@ -81,6 +123,28 @@ class AppointmentForm(forms.ModelForm):
             'notes',
             Submit('submit', 'Book Appointment', css_class='btn btn-primary')
         )
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        doctor = cleaned_data.get('doctor')
+        date = cleaned_data.get('date')
+        time = cleaned_data.get('time')
+        if not (doctor and date and time):
+            return cleaned_data
+        
+        if not is_slot_aligned(time):
+            self.add_error('time', f'Appointments start on {slot_minutes()}-minute boundaries.')
+            return cleaned_data
+        unchanged = (self.instance.pk and self.instance.doctor_id == doctor.pk
+                     and self.instance.date == date and self.instance.time == time)
+        if unchanged:
+            return cleaned_data
+        working = working_mask(doctor.pk, date)
+        if working is not FULL_DAY and not working >> slot_index(time) & 1:
+            self.add_error('time', 'The doctor is not working at this time.')
+        elif not is_slot_free(doctor.pk, date, time):
+            self.add_error('time', 'This time slot is already booked.')
+        return cleaned_data
 
 class MedicalRecordForm(forms.ModelForm):
     class Meta:
@@ -91,6 +155,7 @@ class MedicalRecordForm(forms.ModelForm):
             'treatment': forms.Textarea(attrs={'rows': 3}),
             'prescription': forms.Textarea(attrs={'rows': 3}),
             'notes': forms.Textarea(attrs={'rows': 3}),
+            'patient': UserTypeaheadWidget(roles=['patient']),
         }
     
     def __init__(self, *args, **kwargs):
@@ -118,6 +183,8 @@ class TaskForm(forms.ModelForm):
         widgets = {
             'due_date': forms.DateInput(attrs={'type': 'date'}),
             'description': forms.Textarea(attrs={'rows': 3}),
+            'assigned_to': UserTypeaheadWidget(roles=['nurse', 'doctor']),
+            'patient': UserTypeaheadWidget(roles=['patient']),
         }
     
     def __init__(self, *args, **kwargs):
@@ -149,6 +216,7 @@ class VitalSignsForm(forms.ModelForm):
                  'heart_rate', 'temperature', 'oxygen_saturation', 'weight', 'height', 'notes']
         widgets = {
             'notes': forms.Textarea(attrs={'rows': 3}),
+            'patient': UserTypeaheadWidget(roles=['patient']),
         }
     
     def __init__(self, *args, **kwargs):
@@ -178,7 +246,28 @@ class VitalSignsForm(forms.ModelForm):
             Submit('submit', 'Record Vitals', css_class='btn btn-primary')
         )
 
+class AvatarField(forms.ImageField):
+    """ImageField that refuses oversized uploads before Pillow decodes or verifies them."""
+    
+    def to_python(self, data):
+        if data and data.size > settings.AVATAR_MAX_UPLOAD_BYTES:
+            raise ValidationError(f'Avatars may be at most {settings.AVATAR_MAX_UPLOAD_BYTES // 1024 // 1024} MB.',
+                                  code='file_size')
+        if data:
+            try:
+                with Image.open(data) as image:
+                    check_dimensions(image)
+            except (AvatarRejected, Image.DecompressionBombError) as e:
+                raise ValidationError(str(e), code='image_dimensions')
+            except Exception:
+                # Not an image Pillow can identify; ImageField reports that below
+                pass
+            data.seek(0)
+        return super().to_python(data)
+
 class UserUpdateForm(forms.ModelForm):
+    avatar = AvatarField(required=False)
+    
     class Meta:
         model = User
         fields = ['first_name', 'last_name', 'email', 'phone', 'address', 'date_of_birth', 'avatar']
@@ -202,4 +291,54 @@ class UserUpdateForm(forms.ModelForm):
             'address',
             'avatar',
             Submit('submit', 'Update Profile', css_class='btn btn-primary')
-        )
\ No newline at end of file
+        )
+
+class VitalSignsRowForm(forms.ModelForm):
+    """VitalSignsForm field rules for bulk-ingested readings.
+    
+    The patient is resolved separately for the whole upload, so it is left out here.
+    recorded_at is optional, for readings taken earlier or offline.
+    """
+    recorded_at = forms.DateTimeField(required=False)
+    
+    class Meta:
+        model = VitalSigns
+        fields = [field for field in VitalSignsForm.Meta.fields if field != 'patient']
+    
+    def clean_recorded_at(self):
+        recorded_at = self.cleaned_data.get('recorded_at')
+        if recorded_at and recorded_at > timezone.now() + timedelta(seconds=settings.VITALS_CLOCK_SKEW_SECONDS):
+            raise ValidationError('Reading time cannot be in the future.')
+        return recorded_at
+
+class VitalSignsBulkUploadForm(forms.Form):
+    file = forms.FileField(help_text='CSV with a header row, or JSON lines. Each reading needs a patient ID.')
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.helper = FormHelper()
+        self.helper.layout = Layout(
+            'file',
+            Submit('submit', 'Upload Readings', css_class='btn btn-primary')
+        )
+
+class ExportForm(forms.Form):
+    format = forms.ChoiceField(choices=[(fmt, fmt.upper()) for fmt in FORMATS], required=False)
+    patient = forms.IntegerField(min_value=1, required=False)
+    doctor = forms.IntegerField(min_value=1, required=False)
+    start = forms.DateField(required=False)
+    end = forms.DateField(required=False)
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        start = cleaned_data.get('start')
+        end = cleaned_data.get('end')
+        if start and end and start > end:
+            raise forms.ValidationError('Start date must be on or before the end date.')
+        cleaned_data['format'] = cleaned_data.get('format') or 'csv'
+        return cleaned_data
+
+class NotificationForm(forms.ModelForm):
+    class Meta:
+        model = Notification
+        fields = ['is_read']
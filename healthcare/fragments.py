@@ -0,0 +1,81 @@
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+# Foreign keys whose users see a model's objects on their dashboard
+OWNER_FIELDS = {
+    'healthcare.appointment': ['patient_id', 'doctor_id'],
+    'healthcare.medicalrecord': ['patient_id', 'doctor_id'],
+    'healthcare.task': ['assigned_to_id'],
+}
+
+# Every fragment that shows user names varies on this scope, bumped when any user changes
+USERS_SCOPE = 'healthcare.user'
+
+def _version_key(scope):
+    return f'healthcare:fragment_version:{scope}'
+
+def _initial_version():
+    # Counters start from the clock rather than 0, so one that was evicted never
+    # repeats a version that a fragment still in the cache was stored under
+    return time.time_ns()
+
+def fragment_versions(*scopes):
+    """Return one string that changes whenever any of the version scopes is bumped.
+    
+    Pass it as a vary_on argument to {% cache %}; a bump then makes every
+    fragment keyed on that scope miss, without deleting anything.
+    """
+    keys = [_version_key(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            initial = _initial_version()
+            cache.add(key, initial, None)
+            versions[key] = cache.get(key, initial)
+    return '.'.join(str(versions[key]) for key in keys)
+
+def attach_fragment_versions(objects, *scopes):
+    """Set fragment_version on each object, combining its own version with scopes."""
+    objects = list(objects)
+    if not objects:
+        return
+    label = objects[0]._meta.label_lower
+    object_scopes = [f'{label}:{obj.pk}' for obj in objects]
+    versions = fragment_versions(*object_scopes, *scopes).split('.')
+    shared = '.'.join(versions[len(objects):])
+    for obj, version in zip(objects, versions):
+        obj.fragment_version = f'{version}.{shared}' if shared else version
+
+def user_scope(model_label, user_id):
+    return f'{model_label}:user:{user_id}'
+
+def instance_scopes(instance):
+    """Version scopes a saved or deleted instance invalidates."""
+    label = instance._meta.label_lower
+    scopes = [label, f'{label}:{instance.pk}']
+    for attname in OWNER_FIELDS.get(label, []):
+        user_id = getattr(instance, attname)
+        if user_id:
+            scopes.append(user_scope(label, user_id))
+    return scopes
+
+def bump_fragment_versions(*scopes):
+    keys = [_version_key(scope) for scope in scopes]
+    
+    def bump():
+        for key in keys:
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.add(key, _initial_version(), None)
+    transaction.on_commit(bump)
+
+class FragmentCacheMixin:
+    """Put fragment_cache_timeout in the context for templates using {% cache %}."""
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['fragment_cache_timeout'] = settings.FRAGMENT_CACHE_TIMEOUT
+        return context
@@ -0,0 +1,111 @@
+import csv
+import io
+import json
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from .forms import VitalSignsRowForm
+from .models import User, VitalSigns
+from .summaries import refresh_summaries
+from .timeseries import refresh_rollups
+
+JSON_LINES_CONTENT_TYPES = ('application/jsonl', 'application/x-ndjson', 'application/json-lines')
+
+def detect_format(name='', content_type=''):
+    if name.lower().endswith(('.jsonl', '.ndjson')) or content_type in JSON_LINES_CONTENT_TYPES:
+        return 'jsonl'
+    return 'csv'
+
+def parse_vitals_rows(stream, fmt):
+    """Yield (line_number, row) pairs from a binary CSV or JSON-lines stream.
+    
+    Rows that cannot be decoded are yielded as None so they can be reported.
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if fmt == 'jsonl':
+        for line_number, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield line_number, row if isinstance(row, dict) else None
+    else:
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, row
+
+def _clean_row(form, row):
+    # Like Form._clean_fields(): each field's clean(), then the form's clean_<name>() hook
+    cleaned = form.cleaned_data = {}
+    errors = {}
+    for name, field in form.fields.items():
+        try:
+            cleaned[name] = field.clean(row.get(name))
+            hook = getattr(form, f'clean_{name}', None)
+            if hook is not None:
+                cleaned[name] = hook()
+        except ValidationError as e:
+            errors[name] = e.messages
+    return cleaned, errors
+
+def build_vitals(rows, recorded_by):
+    """Validate (line_number, row) pairs into unsaved readings.
+    
+    Returns ([(line_number, reading)], errors). Patients are resolved with a
+    single in_bulk() lookup; invalid rows are reported as
+    {'line': ..., 'errors': {...}}.
+    """
+    rows = list(rows)
+    patient_ids = set()
+    for line_number, row in rows:
+        if row is not None:
+            try:
+                patient_ids.add(int(row.get('patient')))
+            except (TypeError, ValueError):
+                pass
+    patients = User.objects.filter(role='patient', is_active=True).only('id').in_bulk(patient_ids)
+    
+    # Building a form per row deep-copies every field; clean against one shared form instead
+    form = VitalSignsRowForm()
+    readings = []
+    errors = []
+    for line_number, row in rows:
+        if row is None:
+            errors.append({'line': line_number, 'errors': {'__all__': ['Could not parse row.']}})
+            continue
+        cleaned, row_errors = _clean_row(form, row)
+        try:
+            patient = patients.get(int(row.get('patient')))
+        except (TypeError, ValueError):
+            patient = None
+        if patient is None:
+            row_errors['patient'] = ['Unknown or inactive patient.']
+        if row_errors:
+            errors.append({'line': line_number, 'errors': row_errors})
+            continue
+        if cleaned['recorded_at'] is None:
+            del cleaned['recorded_at']
+        readings.append((line_number, VitalSigns(patient=patient, recorded_by=recorded_by, **cleaned)))
+    return readings, errors
+
+def insert_vitals(readings, batch_size=None):
+    """bulk_create() readings in chunks of batch_size inside one transaction and refresh their rollups."""
+    batch_size = batch_size or settings.VITALS_BULK_BATCH_SIZE
+    with transaction.atomic():
+        for start in range(0, len(readings), batch_size):
+            VitalSigns.objects.bulk_create(readings[start:start + batch_size])
+        # bulk_create() sends no post_save, so update the patient summaries in the same transaction
+        refresh_summaries({reading.patient_id for reading in readings}, ['vitals'])
+    
+    # bulk_create() sends no signals, so refresh the rollups once for the whole upload
+    if readings and settings.VITALS_ROLLUPS_ON_INSERT:
+        times = [reading.recorded_at for reading in readings]
+        refresh_rollups({reading.patient_id for reading in readings}, min(times), max(times))
+
+def ingest_vitals(rows, recorded_by, batch_size=None):
+    """Validate and insert many vital sign readings; invalid rows are skipped and reported."""
+    readings, errors = build_vitals(rows, recorded_by)
+    insert_vitals([reading for line_number, reading in readings], batch_size)
+    return {'created': len(readings), 'errors': errors}
@@ -0,0 +1,47 @@
+from pathlib import Path
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from healthcare.benchmarks import ROLES, compare, load_baseline, run_benchmarks, save_baseline
+
+class Command(BaseCommand):
+    help = 'Time every healthcare URL per role and compare against a stored baseline.'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20, help='Timed requests per URL and role.')
+        parser.add_argument('--role', action='append', dest='roles', choices=ROLES,
+                            help='Only benchmark this role (may be repeated).')
+        parser.add_argument('--url', action='append', dest='names',
+                            help='Only benchmark this URL name (may be repeated).')
+        parser.add_argument('--baseline', default=str(Path(settings.BASE_DIR) / 'benchmarks' / 'baseline.json'),
+                            help='Baseline file to compare against or save to.')
+        parser.add_argument('--save-baseline', action='store_true', help='Store these results as the new baseline.')
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help='Allowed relative p95 increase before a URL counts as regressed.')
+        parser.add_argument('--fail-on-regression', action='store_true',
+                            help='Exit with an error if any URL regressed against the baseline.')
+    
+    def handle(self, *args, **options):
+        if settings.DEBUG:
+            self.stderr.write(self.style.WARNING('DEBUG is on; timings include debug overhead.'))
+        
+        iterations = options['iterations']
+        results = run_benchmarks(iterations, options['roles'], options['names'], log=self.stderr.write)
+        baseline_path = Path(options['baseline'])
+        baseline = load_baseline(baseline_path) if baseline_path.exists() and not options['save_baseline'] else {}
+        regressions = compare(results, baseline, options['tolerance'])
+        
+        self.stdout.write(f"{'role:url':<42} {'status':>6} {'p50':>9} {'p95':>9} {'p99':>9} {'queries':>7} {'peak KB':>9}")
+        for key, result in sorted(results.items()):
+            line = (f"{key:<42} {result['status']:>6} {result['p50_ms']:>7.1f}ms {result['p95_ms']:>7.1f}ms "
+                    f"{result['p99_ms']:>7.1f}ms {result['queries']:>7} {result['peak_kb']:>9.1f}")
+            if key in regressions:
+                line = self.style.ERROR(f"{line}  REGRESSED: {', '.join(regressions[key])}")
+            self.stdout.write(line)
+        
+        if options['save_baseline']:
+            save_baseline(baseline_path, results, iterations)
+            self.stdout.write(self.style.SUCCESS(f'Saved baseline to {baseline_path}.'))
+        elif baseline:
+            self.stdout.write(f'Compared against {baseline_path}: {len(regressions)} regressions.')
+        if regressions and options['fail_on_regression']:
+            raise CommandError(f'{len(regressions)} URLs regressed against the baseline.')
@@ -0,0 +1,23 @@
+import time
+from django.core.management.base import BaseCommand
+from healthcare.notifications import dispatch_outbox
+
+class Command(BaseCommand):
+    help = 'Deliver queued notifications from the outbox.'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep polling the outbox instead of exiting once it is empty.')
+        parser.add_argument('--interval', type=float, default=2.0,
+                            help='Seconds to sleep between polls when looping.')
+        parser.add_argument('--batch-size', type=int,
+                            help='Notifications created per bulk insert.')
+    
+    def handle(self, *args, **options):
+        while True:
+            delivered = dispatch_outbox(batch_size=options['batch_size'])
+            if delivered:
+                self.stdout.write(f'Delivered {delivered} notifications.')
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
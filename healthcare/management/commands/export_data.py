@@ -0,0 +1,41 @@
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from healthcare.export import DATASETS, FORMATS, export_queryset, stream_export
+
+def _date(value):
+    parsed = parse_date(value)
+    if parsed is None:
+        raise ValueError(value)
+    return parsed
+
+class Command(BaseCommand):
+    help = 'Stream a dataset to a file or stdout as CSV, JSON lines or Parquet.'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=sorted(DATASETS))
+        parser.add_argument('--format', choices=sorted(FORMATS), default='csv')
+        parser.add_argument('--output', help='File to write to; defaults to stdout.')
+        parser.add_argument('--patient', type=int, help='Only export this patient.')
+        parser.add_argument('--doctor', type=int, help='Only export this doctor.')
+        parser.add_argument('--start', type=_date, help='First date to include (YYYY-MM-DD).')
+        parser.add_argument('--end', type=_date, help='Last date to include (YYYY-MM-DD).')
+        parser.add_argument('--chunk-size', type=int, help='Rows fetched and written per chunk.')
+    
+    def handle(self, *args, **options):
+        dataset = options['dataset']
+        try:
+            queryset = export_queryset(dataset, patient=options['patient'], doctor=options['doctor'],
+                                       start=options['start'], end=options['end'])
+        except ValueError as e:
+            raise CommandError(e)
+        
+        output = open(options['output'], 'wb') if options['output'] else sys.stdout.buffer
+        try:
+            for chunk in stream_export(dataset, queryset, options['format'], options['chunk_size']):
+                output.write(chunk)
+        finally:
+            if options['output']:
+                output.close()
+        if options['output']:
+            self.stderr.write(self.style.SUCCESS(f"Exported {dataset} to {options['output']}."))
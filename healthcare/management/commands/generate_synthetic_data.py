@@ -0,0 +1,53 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from healthcare.stats import invalidate_dashboard_stats
+from healthcare.synthetic import SCALES, SyntheticDataGenerator
+
+class Command(BaseCommand):
+    help = 'Fill the database with synthetic users, appointments, records, vitals, tasks and notifications.'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=sorted(SCALES), default='small',
+                            help='Preset sizes; "hospital" is 10k doctors, 1M patients and 50M vital sign readings.')
+        for name, help_text in [
+            ('admins', 'Number of super admins.'),
+            ('doctors', 'Number of doctors.'),
+            ('nurses', 'Number of nurses.'),
+            ('patients', 'Number of patients.'),
+            ('appointments', 'Appointments per patient.'),
+            ('records', 'Medical records per patient.'),
+            ('vitals', 'Vital sign readings per patient.'),
+            ('tasks', 'Tasks per nurse.'),
+            ('notifications', 'Notifications per user.'),
+        ]:
+            parser.add_argument(f'--{name}', type=int, help=f'{help_text} Overrides the preset.')
+        parser.add_argument('--prefix', default='synth', help='Username prefix for generated users.')
+        parser.add_argument('--days', type=int, default=365, help='Days of history to spread data over.')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed, for repeatable datasets.')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per bulk insert.')
+        parser.add_argument('--password', default='password', help='Password for every generated user.')
+        parser.add_argument('--rollups', action='store_true',
+                            help='Rebuild vital sign rollups afterwards (bulk inserts skip the signals).')
+    
+    def handle(self, *args, **options):
+        scale = dict(SCALES[options['scale']])
+        for name in scale:
+            if options[name] is not None:
+                scale[name] = options[name]
+        if min(scale['doctors'], scale['nurses'], scale['patients']) < 1:
+            raise CommandError('At least one doctor, nurse and patient is needed.')
+        
+        generator = SyntheticDataGenerator(
+            scale, prefix=options['prefix'], days=options['days'], seed=options['seed'],
+            batch_size=options['batch_size'], password=options['password'], log=self.stdout.write,
+        )
+        try:
+            generator.generate()
+        except ValueError as e:
+            raise CommandError(e)
+        invalidate_dashboard_stats()
+        if options['rollups']:
+            call_command('rebuild_vitals_rollups', stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated synthetic data; log in as {options['prefix']}_<role>_<n> with the given password."
+        ))
@@ -0,0 +1,21 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from healthcare.models import IdempotencyKey, SyncTombstone
+
+class Command(BaseCommand):
+    help = 'Delete sync tombstones and idempotency keys older than SYNC_RETENTION_DAYS.'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int,
+                            help='Keep this many days instead of SYNC_RETENTION_DAYS.')
+    
+    def handle(self, *args, **options):
+        # Sync tokens older than this are rejected, so no client still needs these rows
+        cutoff = timezone.now() - timedelta(days=settings.SYNC_RETENTION_DAYS if options['days'] is None else options['days'])
+        tombstones, _ = SyncTombstone.objects.filter(deleted_at__lt=cutoff).delete()
+        keys, _ = IdempotencyKey.objects.filter(created_at__lt=cutoff).delete()
+        self.stdout.write(self.style.SUCCESS(
+            f'Deleted {tombstones} tombstones and {keys} idempotency keys.'
+        ))
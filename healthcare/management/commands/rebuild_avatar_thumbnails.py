@@ -0,0 +1,38 @@
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from PIL import Image
+from healthcare.avatars import THUMBNAIL_DIR, AvatarRejected, process_avatar
+from healthcare.models import User
+
+class Command(BaseCommand):
+    help = 'Render avatar thumbnails for users whose thumbnails are missing, or for everyone with --all.'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help='Re-render every avatar, e.g. after changing AVATAR_SIZES.')
+        parser.add_argument('--prune', action='store_true',
+                            help='Delete thumbnails no user refers to any more.')
+    
+    def handle(self, *args, **options):
+        users = User.objects.exclude(avatar='').exclude(avatar__isnull=True)
+        if not options['all']:
+            users = users.filter(avatar_digest='')
+        rendered = 0
+        for user_id in users.values_list('pk', flat=True).iterator():
+            try:
+                if process_avatar(user_id):
+                    rendered += 1
+            except (OSError, AvatarRejected, Image.DecompressionBombError) as e:
+                self.stderr.write(f'User {user_id}: {e}')
+        self.stdout.write(self.style.SUCCESS(f'Rendered thumbnails for {rendered} avatars.'))
+        
+        if options['prune']:
+            digests = set(User.objects.exclude(avatar_digest='').values_list('avatar_digest', flat=True))
+            try:
+                filenames = default_storage.listdir(THUMBNAIL_DIR)[1]
+            except FileNotFoundError:
+                filenames = []
+            stale = [filename for filename in filenames if filename.split('-', 1)[0] not in digests]
+            for filename in stale:
+                default_storage.delete(f'{THUMBNAIL_DIR}/{filename}')
+            self.stdout.write(self.style.SUCCESS(f'Deleted {len(stale)} unused thumbnails.'))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from healthcare.panel import rebuild_panel
+
+class Command(BaseCommand):
+    help = "Rebuild doctors' patient panels from the appointment history."
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--doctor', type=int, action='append', dest='doctors',
+                            help='Only rebuild this doctor (may be repeated).')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of panel rows inserted per query.')
+    
+    def handle(self, *args, **options):
+        written = rebuild_panel(options['doctors'], options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {written} panel entries.'))
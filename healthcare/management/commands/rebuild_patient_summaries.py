@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from healthcare.summaries import rebuild_summaries
+
+class Command(BaseCommand):
+    help = 'Rebuild patient summaries from their vitals, records, appointments and tasks.'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--patient', type=int, action='append', dest='patients',
+                            help='Only rebuild this patient (may be repeated).')
+        parser.add_argument('--chunk-size', type=int, default=500,
+                            help='Number of patients refreshed per transaction.')
+    
+    def handle(self, *args, **options):
+        rebuilt = rebuild_summaries(options['patients'], options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt summaries for {rebuilt} patients.'))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+from healthcare.search import install_search_index, rebuild_search_index
+
+class Command(BaseCommand):
+    help = 'Create the medical record search index if missing and rebuild it from the records table.'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS,
+                            help='Database alias to rebuild the index on.')
+    
+    def handle(self, *args, **options):
+        install_search_index(options['database'])
+        rebuild_search_index(options['database'])
+        self.stdout.write(self.style.SUCCESS('Rebuilt the medical record search index.'))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from healthcare.typeahead import rebuild_user_index
+
+class Command(BaseCommand):
+    help = 'Rebuild the name, username and phone keys that user pickers search.'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='users',
+                            help='Only rebuild this user (may be repeated).')
+        parser.add_argument('--batch-size', type=int, default=2000,
+                            help='Number of keys inserted per query.')
+    
+    def handle(self, *args, **options):
+        written = rebuild_user_index(options['users'], options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} user search keys.'))
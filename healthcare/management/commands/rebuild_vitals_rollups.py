@@ -0,0 +1,35 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db.models import Max, Min
+from django.utils import timezone
+from healthcare.models import VitalSigns
+from healthcare.timeseries import refresh_rollups
+
+class Command(BaseCommand):
+    help = 'Rebuild hourly and daily vital sign rollups from the raw readings.'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--patient', type=int, action='append', dest='patients',
+                            help='Only rebuild this patient (may be repeated).')
+        parser.add_argument('--days', type=int,
+                            help='Only rebuild readings from the last N days.')
+        parser.add_argument('--chunk-size', type=int, default=100,
+                            help='Number of patients aggregated per query.')
+    
+    def handle(self, *args, **options):
+        readings = VitalSigns.objects.order_by()
+        if options['patients']:
+            readings = readings.filter(patient_id__in=options['patients'])
+        if options['days']:
+            readings = readings.filter(recorded_at__gte=timezone.now() - timedelta(days=options['days']))
+        
+        patient_ids = list(readings.values_list('patient_id', flat=True).distinct())
+        chunk_size = options['chunk_size']
+        written = 0
+        for offset in range(0, len(patient_ids), chunk_size):
+            chunk = patient_ids[offset:offset + chunk_size]
+            bounds = readings.filter(patient_id__in=chunk).aggregate(start=Min('recorded_at'), end=Max('recorded_at'))
+            written += refresh_rollups(chunk, bounds['start'], bounds['end'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {written} rollups for {len(patient_ids)} patients.'
+        ))
@@ -0,0 +1,109 @@
+import tempfile
+import threading
+from pathlib import Path
+from time import perf_counter
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections, transaction
+from django.utils import timezone
+from healthcare.middleware import percentile
+
+CONFIGURATIONS = {
+    'stock': ('django.db.backends.sqlite3', {}),
+    'tuned': ('healthcare.backends.sqlite3', {'timeout': 20}),
+}
+
+class Command(BaseCommand):
+    help = 'Compare write throughput of the stock and tuned SQLite backends under many parallel writers.'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=16, help='Concurrent writer threads.')
+        parser.add_argument('--readers', type=int, default=4, help='Concurrent reader threads.')
+        parser.add_argument('--transactions', type=int, default=100, help='Write transactions per writer.')
+        parser.add_argument('--configuration', action='append', dest='configurations', choices=CONFIGURATIONS,
+                            help='Only run this configuration (may be repeated).')
+    
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as directory:
+            for name in options['configurations'] or CONFIGURATIONS:
+                result = self.run(name, Path(directory) / f'{name}.sqlite3', options)
+                self.stdout.write(
+                    f"{name:<6} {result['committed']:>6} committed  {result['errors']:>5} locked  "
+                    f"{result['throughput']:>8.0f} writes/s  p95 {result['p95_ms']:>7.1f}ms  "
+                    f"{result['reads']:>7} reads"
+                )
+    
+    def run(self, name, path, options):
+        engine, engine_options = CONFIGURATIONS[name]
+        alias = f'stress_{name}'
+        connections.settings[alias] = {
+            **connections.settings['default'],
+            'ENGINE': engine,
+            'NAME': str(path),
+            'OPTIONS': engine_options,
+        }
+        with connections[alias].cursor() as cursor:
+            cursor.execute('CREATE TABLE stress_vitals (id INTEGER PRIMARY KEY, patient_id INTEGER, '
+                           'heart_rate INTEGER, recorded_at TEXT)')
+            cursor.execute('CREATE INDEX stress_vitals_patient ON stress_vitals (patient_id)')
+        connections[alias].close()
+        
+        stats = {'committed': 0, 'errors': 0, 'reads': 0, 'timings': []}
+        lock = threading.Lock()
+        done = threading.Event()
+        
+        def write(worker):
+            # Each transaction reads before it writes, like a create view validating its form
+            try:
+                for number in range(options['transactions']):
+                    start = perf_counter()
+                    try:
+                        with transaction.atomic(using=alias):
+                            with connections[alias].cursor() as cursor:
+                                cursor.execute('SELECT COUNT(*) FROM stress_vitals WHERE patient_id = %s', [worker])
+                                cursor.execute('INSERT INTO stress_vitals (patient_id, heart_rate, recorded_at) '
+                                               'VALUES (%s, %s, %s)', [worker, 60 + number % 40, timezone.now()])
+                    except OperationalError:
+                        with lock:
+                            stats['errors'] += 1
+                        continue
+                    with lock:
+                        stats['committed'] += 1
+                        stats['timings'].append((perf_counter() - start) * 1000)
+            finally:
+                connections[alias].close()
+        
+        def read():
+            reads = 0
+            try:
+                while not done.is_set():
+                    try:
+                        with connections[alias].cursor() as cursor:
+                            cursor.execute('SELECT patient_id, AVG(heart_rate) FROM stress_vitals GROUP BY patient_id')
+                            cursor.fetchall()
+                        reads += 1
+                    except OperationalError:
+                        pass
+            finally:
+                connections[alias].close()
+                with lock:
+                    stats['reads'] += reads
+        
+        writers = [threading.Thread(target=write, args=(worker,)) for worker in range(options['writers'])]
+        readers = [threading.Thread(target=read) for _ in range(options['readers'])]
+        start = perf_counter()
+        for thread in readers + writers:
+            thread.start()
+        for thread in writers:
+            thread.join()
+        elapsed = perf_counter() - start
+        done.set()
+        for thread in readers:
+            thread.join()
+        del connections.settings[alias]
+        return {
+            'committed': stats['committed'],
+            'errors': stats['errors'],
+            'throughput': stats['committed'] / elapsed,
+            'p95_ms': percentile(stats['timings'], 0.95) if stats['timings'] else 0,
+            'reads': stats['reads'],
+        }
@@ -0,0 +1,42 @@
+from django.db import models
+from .permissions import scope
+
+USER_NAME_FIELDS = ('first_name', 'last_name')
+
+def _user_fields(*relations):
+    return [f'{relation}__{field}' for relation in relations for field in USER_NAME_FIELDS]
+
+class ScopedQuerySet(models.QuerySet):
+    def visible_to(self, user):
+        return scope(self, user, 'view')
+    
+    def editable_by(self, user):
+        return scope(self, user, 'change')
+
+class AppointmentQuerySet(ScopedQuerySet):
+    def for_listing(self):
+        return self.select_related('patient', 'doctor').only(
+            'id', 'date', 'time', 'status', 'type', *_user_fields('patient', 'doctor')
+        )
+
+class MedicalRecordQuerySet(ScopedQuerySet):
+    def for_listing(self):
+        return self.select_related('patient', 'doctor').only(
+            'id', 'diagnosis', 'treatment', 'prescription', 'notes', 'date',
+            *_user_fields('patient', 'doctor')
+        )
+
+class TaskQuerySet(ScopedQuerySet):
+    def for_listing(self):
+        return self.select_related('assigned_to', 'patient').only(
+            'id', 'title', 'description', 'priority', 'status', 'due_date',
+            *_user_fields('assigned_to', 'patient')
+        )
+
+class VitalSignsQuerySet(ScopedQuerySet):
+    def for_listing(self):
+        return self.select_related('patient', 'recorded_by').only(
+            'id', 'blood_pressure_systolic', 'blood_pressure_diastolic', 'heart_rate',
+            'temperature', 'oxygen_saturation', 'weight', 'height', 'notes', 'recorded_at',
+            *_user_fields('patient', 'recorded_by')
+        )
@@ -0,0 +1,230 @@
+import logging
+import threading
+from collections import Counter, deque
+from contextlib import ExitStack
+from time import perf_counter, time
+from django.conf import settings
+from django.db import connections
+from django.http import StreamingHttpResponse
+from .routers import read_target
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds, in milliseconds, of the response time histogram buckets
+HISTOGRAM_BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, float('inf'))
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+class QueryRecorder:
+    """connection.execute_wrapper() callable that times and counts queries."""
+    
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+        self.executions = Counter()
+    
+    def __call__(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += perf_counter() - start
+            self.count += 1
+            self.statements[sql] += 1
+            try:
+                self.executions[(sql, tuple(params or ()))] += 1
+            except TypeError:
+                self.executions[(sql, repr(params))] += 1
+    
+    @property
+    def duplicates(self):
+        """Queries that repeat an earlier query with the same parameters."""
+        return sum(count - 1 for count in self.executions.values())
+    
+    @property
+    def similar(self):
+        """Most executions of one SQL statement with any parameters, a sign of N+1 queries."""
+        return max(self.statements.values(), default=0)
+
+class RequestProfile:
+    def __init__(self, view, queries, duplicates, similar, db_time, render_time, total_time):
+        self.view = view
+        self.queries = queries
+        self.duplicates = duplicates
+        self.similar = similar
+        self.db_time = db_time
+        self.render_time = render_time
+        self.total_time = total_time
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+class ProfileStore:
+    """Rolling window of request profiles per URL name, kept in process memory."""
+    
+    def __init__(self, window):
+        self.window = window
+        self._profiles = {}
+        self._lock = threading.Lock()
+    
+    def add(self, profile):
+        samples = self._profiles.get(profile.view)
+        if samples is None:
+            with self._lock:
+                samples = self._profiles.setdefault(profile.view, deque(maxlen=self.window))
+        samples.append(profile)
+    
+    def clear(self):
+        with self._lock:
+            self._profiles.clear()
+    
+    def summary(self):
+        summary = {}
+        for view, samples in list(self._profiles.items()):
+            samples = list(samples)
+            if not samples:
+                continue
+            queries = [sample.queries for sample in samples]
+            db_times = [sample.db_time * 1000 for sample in samples]
+            total_times = [sample.total_time * 1000 for sample in samples]
+            render_times = [sample.render_time * 1000 for sample in samples if sample.render_time is not None]
+            histogram = Counter(
+                next(bound for bound in HISTOGRAM_BUCKETS if time <= bound) for time in total_times
+            )
+            summary[view] = {
+                'requests': len(samples),
+                'queries': {'p50': percentile(queries, 0.5), 'p95': percentile(queries, 0.95), 'max': max(queries)},
+                'duplicate_queries_max': max(sample.duplicates for sample in samples),
+                'similar_queries_max': max(sample.similar for sample in samples),
+                'db_ms': {'p50': round(percentile(db_times, 0.5), 2), 'p95': round(percentile(db_times, 0.95), 2)},
+                'render_ms': {
+                    'p50': round(percentile(render_times, 0.5), 2),
+                    'p95': round(percentile(render_times, 0.95), 2),
+                } if render_times else None,
+                'total_ms': {
+                    'p50': round(percentile(total_times, 0.5), 2),
+                    'p95': round(percentile(total_times, 0.95), 2),
+                    'p99': round(percentile(total_times, 0.99), 2),
+                },
+                'histogram_ms': [
+                    ['+Inf' if bound == float('inf') else bound, histogram[bound]] for bound in HISTOGRAM_BUCKETS
+                ],
+            }
+        return summary
+
+profiles = ProfileStore(settings.QUERY_PROFILING_WINDOW)
+
+def query_budget(view):
+    return settings.QUERY_BUDGETS.get(view, settings.QUERY_BUDGET_DEFAULT)
+
+class QueryProfilingMiddleware:
+    """Record query count, DB time, duplicate queries and render time per request.
+    
+    Results go to the rolling per-view store, to Server-Timing and X-DB-*
+    response headers when QUERY_PROFILING_HEADERS is on, and are checked
+    against the view's query budget. With QUERY_BUDGET_RAISE an overrun
+    raises, so a test client request fails the test; otherwise it is logged.
+    """
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+    
+    def __call__(self, request):
+        if not settings.QUERY_PROFILING:
+            return self.get_response(request)
+        
+        recorder = QueryRecorder()
+        request._render_time = None
+        start = perf_counter()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(recorder))
+            response = self.get_response(request)
+        total_time = perf_counter() - start
+        
+        match = request.resolver_match
+        # Streaming bodies run their queries after this returns, so only complete responses are profiled
+        if match is None or isinstance(response, StreamingHttpResponse):
+            return response
+        
+        view = match.view_name
+        profile = RequestProfile(view, recorder.count, recorder.duplicates, recorder.similar,
+                                 recorder.duration, request._render_time, total_time)
+        profiles.add(profile)
+        if settings.QUERY_PROFILING_HEADERS:
+            self.add_headers(response, profile)
+        self.check_budget(request, profile)
+        return response
+    
+    def process_template_response(self, request, response):
+        start = perf_counter()
+        
+        def rendered(response):
+            request._render_time = perf_counter() - start
+        response.add_post_render_callback(rendered)
+        return response
+    
+    def add_headers(self, response, profile):
+        timings = [f'db;dur={profile.db_time * 1000:.1f};desc="{profile.queries} queries"']
+        if profile.render_time is not None:
+            timings.append(f'render;dur={profile.render_time * 1000:.1f}')
+        timings.append(f'total;dur={profile.total_time * 1000:.1f}')
+        response['Server-Timing'] = ', '.join(timings)
+        response['X-DB-Queries'] = str(profile.queries)
+        response['X-DB-Duplicate-Queries'] = str(profile.duplicates)
+        response['X-DB-Time-Ms'] = f'{profile.db_time * 1000:.1f}'
+    
+    def check_budget(self, request, profile):
+        budget = query_budget(profile.view)
+        if not budget or profile.queries <= budget:
+            return
+        message = (f'{profile.view} ran {profile.queries} queries, over its budget of {budget} '
+                   f'({profile.duplicates} duplicates, up to {profile.similar} of one statement)')
+        if settings.QUERY_BUDGET_RAISE:
+            raise QueryBudgetExceeded(message)
+        logger.warning(message, extra={'request': request})
+
+# Holds the time until which the client reads from the primary after a write
+STICKY_COOKIE = 'db_primary_until'
+
+class ReplicaRoutingMiddleware:
+    """Serve GET requests for REPLICA_VIEWS from a read replica.
+    
+    Any other method sets a cookie that keeps the client on the primary for
+    REPLICA_STICKY_SECONDS, long enough for replicas to catch up, so users
+    always see their own changes.
+    """
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = len(settings.DATABASES) > 1
+    
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+        
+        token = read_target.set(None)
+        try:
+            response = self.get_response(request)
+        finally:
+            read_target.reset(token)
+        if request.method not in ['GET', 'HEAD', 'OPTIONS']:
+            response.set_cookie(STICKY_COOKIE, str(time() + settings.REPLICA_STICKY_SECONDS),
+                                max_age=settings.REPLICA_STICKY_SECONDS, httponly=True, samesite='Lax')
+        return response
+    
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not self.enabled or request.method not in ['GET', 'HEAD']:
+            return None
+        if request.resolver_match.url_name in settings.REPLICA_VIEWS and not self.pinned(request):
+            read_target.set('replica')
+        return None
+    
+    def pinned(self, request):
+        try:
+            return float(request.COOKIES.get(STICKY_COOKIE, 0)) > time()
+        except ValueError:
+            return False
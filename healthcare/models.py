@@ -1,6 +1,9 @@
+from datetime import time
 from django.contrib.auth.models import AbstractUser
+from django.core.exceptions import ValidationError
 from django.db import models
 from django.utils import timezone
+from .managers import AppointmentQuerySet, MedicalRecordQuerySet, TaskQuerySet, VitalSignsQuerySet
 
 class User(AbstractUser):
     ROLE_CHOICES = [
@@ -12,13 +15,47 @@ class User(AbstractUser):
     
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, default='patient')
     avatar = models.ImageField(upload_to='avatars/', null=True, blank=True)
+    # SHA-256 of the avatar once its thumbnails are rendered; empty while they are pending
+    avatar_digest = models.CharField(max_length=64, blank=True, editable=False)
     is_active = models.BooleanField(default=True)
     phone = models.CharField(max_length=15, blank=True)
     address = models.TextField(blank=True)
     date_of_birth = models.DateField(null=True, blank=True)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['role', 'is_active'], name='user_role_active_idx'),
+        ]
+    
     def __str__(self):
         return f"{self.get_full_name()} ({self.get_role_display()})"
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the loaded avatar so a new upload can be detected and its thumbnails rendered
+        instance._loaded_avatar = instance.__dict__.get('avatar')
+        return instance
+    
+    @property
+    def avatar_changed(self):
+        if 'avatar' in self.get_deferred_fields():
+            return False
+        return (self.avatar.name or None) != (getattr(self, '_loaded_avatar', None) or None)
+
+class UserSearchKey(models.Model):
+    """A normalized name, username or phone of an active user, for prefix search in user pickers."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='search_keys')
+    role = models.CharField(max_length=20)
+    key = models.CharField(max_length=301)
+    
+    class Meta:
+        indexes = [
+            # PostgreSQL needs the pattern operator class to answer LIKE 'prefix%' from the index. Under a
+            # non-C collation it answers nothing else, so searches neither sort on key nor rely on its range
+            models.Index(fields=['role', 'key'], name='user_search_role_key_idx',
+                         opclasses=['varchar_pattern_ops', 'varchar_pattern_ops']),
+        ]
 
 class Appointment(models.Model):
     STATUS_CHOICES = [
@@ -29,6 +66,9 @@ class Appointment(models.Model):
         ('cancelled', 'Cancelled'),
     ]
     
+    # Statuses that hold a doctor's time slot
+    ACTIVE_STATUSES = ['pending', 'approved']
+    
     patient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='patient_appointments')
     doctor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='doctor_appointments')
     date = models.DateField()
@@ -39,11 +79,78 @@ class Appointment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = AppointmentQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['doctor', '-date'], name='appt_doctor_date_idx'),
+            models.Index(fields=['patient', '-date'], name='appt_patient_date_idx'),
+            models.Index(fields=['patient', 'status', 'date'], name='appt_patient_status_date_idx'),
+            models.Index(fields=['-date'], name='appt_date_idx'),
+            models.Index(fields=['doctor', 'date'], name='appt_pending_doctor_idx',
+                         condition=models.Q(status='pending')),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['doctor', 'date', 'time'], name='appt_active_slot_unique',
+                                    condition=models.Q(status__in=['pending', 'approved'])),
+        ]
     
     def __str__(self):
         return f"{self.patient.get_full_name()} - {self.doctor.get_full_name()} ({self.date})"
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the loaded slot so a reschedule can release the old one
+        instance._loaded_slot = (instance.__dict__.get('doctor_id'), instance.__dict__.get('date'))
+        return instance
+
+class DoctorPatient(models.Model):
+    """A patient on a doctor's panel, maintained from their appointments by healthcare.panel."""
+    doctor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='panel_patients')
+    patient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='panel_doctors')
+    first_visit = models.DateField()
+    last_visit = models.DateField()
+    visit_count = models.PositiveIntegerField()
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['doctor', 'patient'], name='panel_doctor_patient_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['doctor', '-last_visit'], name='panel_doctor_last_visit_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.doctor_id} - {self.patient_id} ({self.visit_count} visits)"
+
+class DoctorSchedule(models.Model):
+    WEEKDAY_CHOICES = [
+        (0, 'Monday'),
+        (1, 'Tuesday'),
+        (2, 'Wednesday'),
+        (3, 'Thursday'),
+        (4, 'Friday'),
+        (5, 'Saturday'),
+        (6, 'Sunday'),
+    ]
+    
+    doctor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='schedules')
+    weekday = models.PositiveSmallIntegerField(choices=WEEKDAY_CHOICES)
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+    
+    class Meta:
+        ordering = ['doctor', 'weekday', 'start_time']
+    
+    def __str__(self):
+        return f"{self.doctor.get_full_name()} - {self.get_weekday_display()} {self.start_time}-{self.end_time}"
+    
+    def clean(self):
+        # An end time of midnight means the shift runs to the end of the day
+        if self.start_time and self.end_time and self.end_time != time(0) and self.end_time <= self.start_time:
+            raise ValidationError({'end_time': 'End time must be after start time.'})
 
 class MedicalRecord(models.Model):
     patient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='medical_records')
@@ -54,9 +161,17 @@ class MedicalRecord(models.Model):
     notes = models.TextField(blank=True)
     date = models.DateField()
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    objects = MedicalRecordQuerySet.as_manager()
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['patient', '-date'], name='record_patient_date_idx'),
+            models.Index(fields=['doctor', '-date'], name='record_doctor_date_idx'),
+            models.Index(fields=['-date'], name='record_date_idx'),
+        ]
     
     def __str__(self):
         return f"{self.patient.get_full_name()} - {self.diagnosis} ({self.date})"
@@ -75,13 +190,50 @@ class Notification(models.Model):
     type = models.CharField(max_length=20, choices=TYPE_CHOICES, default='info')
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='notif_user_created_idx'),
+            models.Index(fields=['user', '-created_at'], name='notif_unread_user_idx',
+                         condition=models.Q(is_read=False)),
+            models.Index(fields=['user', 'updated_at'], name='notif_user_updated_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.title}"
 
+class NotificationOutbox(models.Model):
+    AUDIENCE_CHOICES = [
+        ('users', 'Users'),
+        ('role', 'Role'),
+    ]
+    
+    audience = models.CharField(max_length=20, choices=AUDIENCE_CHOICES)
+    role = models.CharField(max_length=20, choices=User.ROLE_CHOICES, blank=True)
+    user_ids = models.JSONField(default=list, blank=True)
+    title = models.CharField(max_length=200)
+    message = models.TextField()
+    type = models.CharField(max_length=20, choices=Notification.TYPE_CHOICES, default='info')
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['created_at'], name='outbox_pending_idx',
+                         condition=models.Q(processed_at__isnull=True)),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_audience_display()} - {self.title}"
+    
+    def recipient_ids(self, chunk_size=2000):
+        if self.audience == 'role':
+            return User.objects.filter(role=self.role, is_active=True).values_list('pk', flat=True).iterator(chunk_size=chunk_size)
+        return iter(self.user_ids)
+
 class Task(models.Model):
     PRIORITY_CHOICES = [
         ('low', 'Low'),
@@ -103,13 +255,32 @@ class Task(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     due_date = models.DateField()
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     completed_at = models.DateTimeField(null=True, blank=True)
     
+    objects = TaskQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['assigned_to', '-created_at'], name='task_assignee_created_idx'),
+            models.Index(fields=['assigned_to', 'due_date'], name='task_assignee_due_idx'),
+            models.Index(fields=['assigned_to', 'status'], name='task_assignee_status_idx'),
+            models.Index(fields=['-created_at'], name='task_created_idx'),
+            models.Index(fields=['assigned_to', 'updated_at'], name='task_assignee_updated_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} - {self.assigned_to.get_full_name()}"
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the loaded assignee so a reassignment can tombstone the task for them,
+        # and the loaded patient so moving the task updates both patients' summaries
+        instance._loaded_assignee = instance.__dict__.get('assigned_to_id')
+        instance._loaded_patient = instance.__dict__.get('patient_id')
+        return instance
 
 class VitalSigns(models.Model):
     patient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='vital_signs')
@@ -122,14 +293,128 @@ class VitalSigns(models.Model):
     weight = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
     height = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
     notes = models.TextField(blank=True)
-    recorded_at = models.DateTimeField(auto_now_add=True)
+    # Defaults to now, but readings recorded offline keep the time they were taken
+    recorded_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    objects = VitalSignsQuerySet.as_manager()
     
     class Meta:
         ordering = ['-recorded_at']
+        indexes = [
+            models.Index(fields=['patient', '-recorded_at'], name='vitals_patient_recorded_idx'),
+            models.Index(fields=['-recorded_at'], name='vitals_recorded_idx'),
+            models.Index(fields=['patient', 'updated_at'], name='vitals_patient_updated_idx'),
+        ]
     
     def __str__(self):
         return f"{self.patient.get_full_name()} - {self.recorded_at.date()}"
     
     @property
     def blood_pressure(self):
-        return f"{self.blood_pressure_systolic}/{self.blood_pressure_diastolic}"
\ No newline at end of file
+        return f"{self.blood_pressure_systolic}/{self.blood_pressure_diastolic}"
+
+class VitalSignsRollup(models.Model):
+    PERIOD_CHOICES = [
+        ('hour', 'Hourly'),
+        ('day', 'Daily'),
+    ]
+    
+    METRIC_CHOICES = [
+        ('blood_pressure_systolic', 'Systolic Blood Pressure'),
+        ('blood_pressure_diastolic', 'Diastolic Blood Pressure'),
+        ('heart_rate', 'Heart Rate'),
+        ('temperature', 'Temperature'),
+        ('oxygen_saturation', 'Oxygen Saturation'),
+        ('weight', 'Weight'),
+    ]
+    
+    patient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='vital_rollups')
+    metric = models.CharField(max_length=30, choices=METRIC_CHOICES)
+    period = models.CharField(max_length=10, choices=PERIOD_CHOICES)
+    bucket = models.DateTimeField()
+    count = models.PositiveIntegerField()
+    total = models.FloatField()
+    minimum = models.FloatField()
+    maximum = models.FloatField()
+    
+    class Meta:
+        ordering = ['bucket']
+        constraints = [
+            models.UniqueConstraint(fields=['patient', 'metric', 'period', 'bucket'], name='vitals_rollup_unique'),
+        ]
+    
+    def __str__(self):
+        return f"{self.patient_id} {self.metric} {self.period} {self.bucket}"
+    
+    @property
+    def mean(self):
+        return self.total / self.count
+
+class PatientSummary(models.Model):
+    """A patient's current state, kept in step with its sources by healthcare.summaries.
+    
+    Each section (latest vitals, latest diagnosis, next approved appointment,
+    open tasks) is copied here when its model changes, so a roster of many
+    patients is one query.
+    """
+    patient = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='summary')
+    vitals_recorded_at = models.DateTimeField(null=True, blank=True)
+    blood_pressure_systolic = models.IntegerField(null=True, blank=True)
+    blood_pressure_diastolic = models.IntegerField(null=True, blank=True)
+    heart_rate = models.IntegerField(null=True, blank=True)
+    temperature = models.DecimalField(max_digits=4, decimal_places=1, null=True, blank=True)
+    oxygen_saturation = models.IntegerField(null=True, blank=True)
+    latest_diagnosis = models.CharField(max_length=200, blank=True)
+    latest_record_date = models.DateField(null=True, blank=True)
+    next_appointment_date = models.DateField(null=True, blank=True)
+    next_appointment_time = models.TimeField(null=True, blank=True)
+    next_appointment_doctor = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True,
+                                                related_name='+')
+    open_tasks = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Summary of {self.patient_id}"
+    
+    @property
+    def blood_pressure(self):
+        if self.blood_pressure_systolic is None:
+            return None
+        return f"{self.blood_pressure_systolic}/{self.blood_pressure_diastolic}"
+
+class SyncTombstone(models.Model):
+    """A deleted row, kept so offline clients remove their copy on their next sync."""
+    collection = models.CharField(max_length=30)
+    object_id = models.BigIntegerField()
+    # The user (or, for vitals, the patient) whose sync scope the row was in; not a
+    # foreign key, because tombstones are written while that user is being deleted too
+    owner_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['collection', 'owner_id', 'deleted_at'], name='tombstone_owner_deleted_idx'),
+            models.Index(fields=['deleted_at'], name='tombstone_deleted_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.collection} #{self.object_id} deleted {self.deleted_at}"
+
+class IdempotencyKey(models.Model):
+    """Client-chosen key of an offline upload, so a retried upload is not stored twice."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    key = models.CharField(max_length=64)
+    vital_signs = models.ForeignKey(VitalSigns, on_delete=models.SET_NULL, null=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='idempotency_user_key_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['created_at'], name='idempotency_created_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user_id}:{self.key}"
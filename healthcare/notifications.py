@@ -0,0 +1,135 @@
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import QuerySet
+from django.utils import timezone
+from .events import has_listeners, publish_to_user
+from .models import User, Notification, NotificationOutbox
+
+_dispatcher = ThreadPoolExecutor(max_workers=1, thread_name_prefix='notifications')
+
+def _unread_key(user_id):
+    return f'healthcare:unread_notifications:{user_id}'
+
+def get_unread_count(user):
+    """Return the user's unread notification count from the cache.
+    
+    The counter is rebuilt from the database when missing; its timeout doubles
+    as the reconciliation period, so any drift is corrected on expiry.
+    """
+    return unread_count(user.pk)
+
+def unread_count(user_id):
+    key = _unread_key(user_id)
+    count = cache.get(key)
+    if count is None:
+        # Counted on the primary, which has every change the cached counter will be adjusted for
+        count = Notification.objects.using(DEFAULT_DB_ALIAS).filter(user_id=user_id, is_read=False).count()
+        cache.add(key, count, settings.UNREAD_NOTIFICATIONS_RECONCILE_INTERVAL)
+    return max(count, 0)
+
+def publish_notification(notification):
+    publish_to_user(notification.user_id, 'notification', lambda: {
+        'title': notification.title,
+        'message': notification.message,
+        'type': notification.type,
+        'unread_notifications': unread_count(notification.user_id),
+    })
+
+def publish_unread_count(user_id):
+    publish_to_user(user_id, 'counters', lambda: {'unread_notifications': unread_count(user_id)})
+
+def _adjust_unread(user_id, delta):
+    try:
+        cache.incr(_unread_key(user_id), delta)
+    except ValueError:
+        # No counter cached yet; the next read rebuilds it from the database
+        pass
+
+def increment_unread(user_id, amount=1):
+    transaction.on_commit(lambda: _adjust_unread(user_id, amount))
+
+def increment_unread_many(user_ids):
+    user_ids = list(user_ids)
+    transaction.on_commit(lambda: [_adjust_unread(user_id, 1) for user_id in user_ids])
+
+def decrement_unread(user_id, amount=1):
+    transaction.on_commit(lambda: _adjust_unread(user_id, -amount))
+
+def reset_unread(user_id):
+    cache.delete(_unread_key(user_id))
+
+def notify(recipients, title, message, type='info'):
+    """Queue a notification for a user, a user id, or an iterable or queryset of either.
+    
+    Only an outbox row is written here, inside the caller's transaction; the
+    Notification rows are created by dispatch_outbox().
+    """
+    if isinstance(recipients, QuerySet):
+        user_ids = list(recipients.values_list('pk', flat=True))
+    elif isinstance(recipients, (User, int)):
+        user_ids = [recipients]
+    else:
+        user_ids = list(recipients)
+    user_ids = [user.pk if isinstance(user, User) else user for user in user_ids]
+    return _enqueue(audience='users', user_ids=user_ids, title=title, message=message, type=type)
+
+def broadcast(role, title, message, type='info'):
+    """Queue a notification for every active user with the given role."""
+    return _enqueue(audience='role', role=role, title=title, message=message, type=type)
+
+def _enqueue(**fields):
+    entry = NotificationOutbox.objects.create(**fields)
+    if settings.NOTIFICATIONS_DISPATCH_IN_THREAD:
+        transaction.on_commit(lambda: _dispatcher.submit(_dispatch_in_thread))
+    return entry
+
+def _dispatch_in_thread():
+    try:
+        dispatch_outbox()
+    finally:
+        connections.close_all()
+
+def _deliver(entry, batch_size):
+    delivered = 0
+    recipients = entry.recipient_ids(chunk_size=batch_size)
+    while True:
+        user_ids = list(islice(recipients, batch_size))
+        if not user_ids:
+            return delivered
+        notifications = Notification.objects.bulk_create([
+            Notification(user_id=user_id, title=entry.title, message=entry.message, type=entry.type)
+            for user_id in user_ids
+        ], batch_size=batch_size)
+        # bulk_create() sends no post_save, so bump the unread counters and notify live streams here
+        increment_unread_many(user_ids)
+        for notification in notifications:
+            if has_listeners(notification.user_id):
+                publish_notification(notification)
+        delivered += len(user_ids)
+
+def dispatch_outbox(limit=None, batch_size=None):
+    """Drain pending outbox entries, oldest first, and return the number of notifications created.
+    
+    Each entry is claimed with SELECT ... FOR UPDATE SKIP LOCKED where supported,
+    so several workers can drain the outbox concurrently.
+    """
+    batch_size = batch_size or settings.NOTIFICATIONS_BATCH_SIZE
+    delivered = 0
+    processed = 0
+    while limit is None or processed < limit:
+        with transaction.atomic():
+            entry = (NotificationOutbox.objects
+                     .filter(processed_at__isnull=True)
+                     .order_by('created_at', 'pk')
+                     .select_for_update(skip_locked=True)
+                     .first())
+            if entry is None:
+                break
+            delivered += _deliver(entry, batch_size)
+            entry.processed_at = timezone.now()
+            entry.save(update_fields=['processed_at'])
+        processed += 1
+    return delivered
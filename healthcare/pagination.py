@@ -0,0 +1,191 @@
+import base64
+import binascii
+import json
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.http import Http404
+from django.utils.functional import cached_property
+
+def estimated_count(queryset):
+    """Return the planner's row estimate on PostgreSQL, an exact count elsewhere."""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+    sql, params = queryset.order_by().values('pk').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator for admin changelists that never counts a whole large table.
+    
+    Up to ADMIN_COUNT_LIMIT rows are counted exactly. Past that PostgreSQL
+    reports the planner's estimate, and other databases report the limit.
+    """
+    
+    @cached_property
+    def count(self):
+        limit = settings.ADMIN_COUNT_LIMIT
+        count = self.object_list.order_by()[:limit].count()
+        if count < limit or connections[self.object_list.db].vendor != 'postgresql':
+            return count
+        return max(limit, estimated_count(self.object_list))
+
+class KeysetPage:
+    def __init__(self, object_list, paginator, has_next, has_previous, count=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self.count = count
+    
+    def __iter__(self):
+        return iter(self.object_list)
+    
+    def __len__(self):
+        return len(self.object_list)
+    
+    def has_next(self):
+        return self._has_next
+    
+    def has_previous(self):
+        return self._has_previous
+    
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+    
+    @property
+    def next_cursor(self):
+        if self._has_next:
+            return self.paginator.encode_cursor('next', self.object_list[-1])
+    
+    @property
+    def previous_cursor(self):
+        if self._has_previous:
+            return self.paginator.encode_cursor('prev', self.object_list[0])
+
+class KeysetPaginator:
+    """Paginate a queryset newest-first on (field, pk) using opaque cursors.
+    
+    Each page is a single indexed range scan, so deep pages cost the same as
+    the first one and no COUNT(*) is needed to render next/previous links.
+    """
+    
+    def __init__(self, queryset, field, per_page, count_mode=None):
+        self.queryset = queryset
+        self.field = field
+        self.per_page = int(per_page)
+        self.count_mode = count_mode
+        self._model_field = queryset.model._meta.get_field(field)
+    
+    def encode_cursor(self, direction, obj):
+        value = self._model_field.value_to_string(obj)
+        payload = json.dumps([direction, value, obj.pk], separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+    
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            direction, value, pk = json.loads(base64.urlsafe_b64decode(padded))
+            # Cursors come from the client, so check the types before they reach a query
+            if not isinstance(value, str) or not isinstance(pk, int) or isinstance(pk, bool):
+                raise ValueError
+            value = self._model_field.to_python(value)
+        except (ValueError, TypeError, ValidationError, binascii.Error):
+            raise Http404('Invalid cursor')
+        if direction not in ('next', 'prev') or value is None:
+            raise Http404('Invalid cursor')
+        return direction, value, pk
+    
+    def page(self, cursor=None):
+        field = self.field
+        queryset = self.queryset.order_by(f'-{field}', '-pk')
+        direction = None
+        if cursor:
+            direction, value, pk = self.decode_cursor(cursor)
+            if direction == 'next':
+                queryset = queryset.filter(Q(**{f'{field}__lt': value}) | Q(**{field: value, 'pk__lt': pk}))
+            else:
+                queryset = queryset.filter(
+                    Q(**{f'{field}__gt': value}) | Q(**{field: value, 'pk__gt': pk})
+                ).order_by(field, 'pk')
+        
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if direction == 'prev':
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, direction is not None
+        
+        count = None
+        if self.count_mode == 'estimated':
+            count = estimated_count(self.queryset)
+        elif self.count_mode == 'exact':
+            count = self.queryset.count()
+        return KeysetPage(rows, self, has_next, has_previous, count)
+
+class KeysetPaginationMixin:
+    """ListView mixin that swaps offset pagination for KeysetPaginator."""
+    cursor_field = None
+    cursor_kwarg = 'cursor'
+    count_mode = None
+    
+    def paginate_queryset(self, queryset, page_size):
+        paginator = KeysetPaginator(queryset, self.cursor_field, page_size, count_mode=self.count_mode)
+        page = paginator.page(self.request.GET.get(self.cursor_kwarg))
+        return (paginator, page, page.object_list, page.has_other_pages())
+
+class OffsetPage(KeysetPage):
+    def __init__(self, object_list, paginator, offset, has_next):
+        super().__init__(object_list, paginator, has_next, offset > 0)
+        self.offset = offset
+    
+    @property
+    def next_cursor(self):
+        if self._has_next:
+            return self.paginator.encode_cursor(self.offset + len(self.object_list))
+    
+    @property
+    def previous_cursor(self):
+        if self._has_previous:
+            return self.paginator.encode_cursor(max(self.offset - self.paginator.per_page, 0))
+
+class RankedPaginator:
+    """Paginate a queryset in its existing order, e.g. search results by rank.
+    
+    A computed rank has no column to seek on, so cursors carry an offset. Pages
+    still fetch one extra row to find out whether there is a next page rather
+    than counting every match.
+    """
+    
+    def __init__(self, queryset, per_page):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+    
+    def encode_cursor(self, offset):
+        payload = json.dumps(['offset', offset], separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+    
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            kind, offset = json.loads(base64.urlsafe_b64decode(padded))
+        except (ValueError, TypeError, binascii.Error):
+            raise Http404('Invalid cursor')
+        if kind != 'offset' or not isinstance(offset, int) or isinstance(offset, bool) or offset < 0:
+            raise Http404('Invalid cursor')
+        return offset
+    
+    def page(self, cursor=None):
+        offset = self.decode_cursor(cursor) if cursor else 0
+        rows = list(self.queryset[offset:offset + self.per_page + 1])
+        has_next = len(rows) > self.per_page
+        return OffsetPage(rows[:self.per_page], self, offset, has_next)
@@ -0,0 +1,44 @@
+from django.db import transaction
+from django.db.models import Count, Max, Min
+from .models import Appointment, DoctorPatient
+from .permissions import CARE_STATUSES
+
+def _visits(appointments):
+    """Group appointments that count as visits into DoctorPatient rows."""
+    rows = (appointments.filter(status__in=CARE_STATUSES).order_by().values('doctor_id', 'patient_id')
+            .annotate(first_visit=Min('date'), last_visit=Max('date'), visit_count=Count('pk')))
+    return [DoctorPatient(**row) for row in rows]
+
+def refresh_panel(pairs):
+    """Recompute the DoctorPatient rows of (doctor_id, patient_id) pairs from their appointments.
+    
+    Each pair is re-aggregated over its own appointments only, through the
+    (patient, date) index, and written with one upsert; pairs left without
+    visits are removed from the panel.
+    """
+    pairs = {(doctor_id, patient_id) for doctor_id, patient_id in pairs if doctor_id and patient_id}
+    if not pairs:
+        return
+    patient_ids = {patient_id for doctor_id, patient_id in pairs}
+    appointments = Appointment.objects.filter(patient_id__in=patient_ids,
+                                              doctor_id__in={doctor_id for doctor_id, patient_id in pairs})
+    rows = [row for row in _visits(appointments) if (row.doctor_id, row.patient_id) in pairs]
+    with transaction.atomic():
+        DoctorPatient.objects.bulk_create(rows, update_conflicts=True, unique_fields=['doctor', 'patient'],
+                                          update_fields=['first_visit', 'last_visit', 'visit_count'])
+        stale = pairs - {(row.doctor_id, row.patient_id) for row in rows}
+        for doctor_id, patient_id in stale:
+            DoctorPatient.objects.filter(doctor_id=doctor_id, patient_id=patient_id).delete()
+
+def rebuild_panel(doctor_ids=None, batch_size=1000):
+    """Rebuild DoctorPatient from scratch, for all doctors or the given ones; returns the rows written."""
+    panel = DoctorPatient.objects.all()
+    appointments = Appointment.objects.all()
+    if doctor_ids:
+        panel = panel.filter(doctor_id__in=doctor_ids)
+        appointments = appointments.filter(doctor_id__in=doctor_ids)
+    with transaction.atomic():
+        panel.delete()
+        rows = _visits(appointments)
+        DoctorPatient.objects.bulk_create(rows, batch_size=batch_size)
+    return len(rows)
@@ -0,0 +1,154 @@
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Q
+from django.http import Http404
+
+# Appointments in these statuses put a patient in a doctor's care team
+CARE_STATUSES = ['pending', 'approved', 'completed']
+
+def _care_team_key(doctor_id):
+    return f'healthcare:care_team:{doctor_id}'
+
+def care_team_patient_ids(user):
+    """IDs of the patients on a doctor's panel or that they have written records for.
+    
+    The set is cached per doctor and memoised on the user object, so every
+    check after the first one in a request is a set lookup.
+    """
+    if getattr(user, 'role', None) != 'doctor':
+        return frozenset()
+    patient_ids = getattr(user, '_care_team_patient_ids', None)
+    if patient_ids is None:
+        key = _care_team_key(user.pk)
+        cached = cache.get(key)
+        if cached is None:
+            DoctorPatient = apps.get_model('healthcare', 'DoctorPatient')
+            MedicalRecord = apps.get_model('healthcare', 'MedicalRecord')
+            # The panel holds one row per patient seen, so this avoids scanning the appointment history.
+            # Read from the primary, as invalidation runs on commit and a replica may not have the change yet
+            panel = DoctorPatient.objects.using(DEFAULT_DB_ALIAS).filter(doctor_id=user.pk)
+            records = MedicalRecord.objects.using(DEFAULT_DB_ALIAS).filter(doctor_id=user.pk)
+            cached = sorted(
+                panel.order_by().values_list('patient_id', flat=True)
+                .union(records.order_by().values_list('patient_id', flat=True))
+            )
+            cache.set(key, cached, settings.PERMISSIONS_CACHE_TIMEOUT)
+        patient_ids = user._care_team_patient_ids = frozenset(cached)
+    return patient_ids
+
+def invalidate_care_team(*doctor_ids):
+    keys = [_care_team_key(doctor_id) for doctor_id in set(doctor_ids) if doctor_id]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+class Policy:
+    """Access rules for one model.
+    
+    rules() returns True (every object), False (none) or a list of
+    (attname, allowed) pairs where allowed is an ID or a set of IDs; an object
+    matches if any pair does. The same rules drive queryset filtering and
+    single-object checks, so an object check is a few attribute comparisons.
+    The base policy denies everything.
+    """
+    
+    def rules(self, user, action):
+        return False
+
+class AppointmentPolicy(Policy):
+    def rules(self, user, action):
+        if action == 'approve':
+            return [('doctor_id', user.pk)] if user.role == 'doctor' else False
+        if user.role in ['nurse', 'super_admin']:
+            return True
+        if user.role == 'patient':
+            return [('patient_id', user.pk)]
+        if user.role == 'doctor':
+            return [('doctor_id', user.pk)]
+        return False
+
+class MedicalRecordPolicy(Policy):
+    def rules(self, user, action):
+        if user.role == 'super_admin':
+            return True
+        if action == 'view':
+            if user.role == 'nurse':
+                return True
+            if user.role == 'patient':
+                return [('patient_id', user.pk)]
+            if user.role == 'doctor':
+                return [('doctor_id', user.pk), ('patient_id', care_team_patient_ids(user))]
+        if action == 'change' and user.role == 'doctor':
+            return [('doctor_id', user.pk)]
+        return False
+
+class TaskPolicy(Policy):
+    def rules(self, user, action):
+        if user.role == 'super_admin' and action in ['view', 'change']:
+            return True
+        if user.role in ['nurse', 'doctor']:
+            return [('assigned_to_id', user.pk)]
+        return False
+
+class VitalSignsPolicy(Policy):
+    def rules(self, user, action):
+        if user.role == 'super_admin':
+            return True
+        if action == 'view':
+            if user.role == 'patient':
+                return [('patient_id', user.pk)]
+            if user.role in ['nurse', 'doctor']:
+                return True
+        if action == 'change' and user.role in ['nurse', 'doctor']:
+            return [('recorded_by_id', user.pk)]
+        return False
+
+POLICIES = {
+    'healthcare.appointment': AppointmentPolicy(),
+    'healthcare.medicalrecord': MedicalRecordPolicy(),
+    'healthcare.task': TaskPolicy(),
+    'healthcare.vitalsigns': VitalSignsPolicy(),
+}
+
+def _rules(user, model, action):
+    if not getattr(user, 'role', None):
+        return False
+    return POLICIES[model._meta.label_lower].rules(user, action)
+
+def scope(queryset, user, action='view'):
+    """Filter queryset down to the objects user may perform action on."""
+    rules = _rules(user, queryset.model, action)
+    if rules is True:
+        return queryset.all()
+    if not rules:
+        return queryset.none()
+    condition = Q()
+    for attname, allowed in rules:
+        if isinstance(allowed, (set, frozenset)):
+            condition |= Q(**{f'{attname}__in': sorted(allowed)})
+        else:
+            condition |= Q(**{attname: allowed})
+    return queryset.filter(condition)
+
+def has_object_permission(user, obj, action='view'):
+    rules = _rules(user, type(obj), action)
+    if isinstance(rules, bool):
+        return rules
+    for attname, allowed in rules:
+        value = getattr(obj, attname)
+        if isinstance(allowed, (set, frozenset)):
+            if value in allowed:
+                return True
+        elif value == allowed:
+            return True
+    return False
+
+class ObjectPermissionMixin:
+    """Detail/update view mixin that hides objects the user has no permission_action on."""
+    permission_action = 'view'
+    
+    def get_object(self, queryset=None):
+        obj = super().get_object(queryset)
+        if not has_object_permission(self.request.user, obj, self.permission_action):
+            raise Http404('No object found matching the query')
+        return obj
@@ -0,0 +1,40 @@
+import random
+from contextvars import ContextVar
+from django.conf import settings
+from django.db import connections
+
+# Where reads go for the current request: None (primary), 'replica', or 'primary'
+# once the request has written something
+read_target = ContextVar('healthcare_read_target', default=None)
+
+class PrimaryReplicaRouter:
+    """Send every write to the primary and reads of replica-routed requests to a replica.
+    
+    Reads only leave the primary while ReplicaRoutingMiddleware has marked
+    the request, so management commands and background work always see
+    current data. A request that writes, or opens a transaction, reads from
+    the primary from then on. Sessions are always read from the primary, as
+    a lagging replica would log out a user who has only just signed in.
+    """
+    
+    def __init__(self):
+        self.replicas = [alias for alias in settings.DATABASES if alias != 'default']
+    
+    def db_for_read(self, model, **hints):
+        if not self.replicas or read_target.get() != 'replica' or model._meta.app_label == 'sessions':
+            return 'default'
+        if connections['default'].in_atomic_block:
+            return 'default'
+        return random.choice(self.replicas)
+    
+    def db_for_write(self, model, **hints):
+        if read_target.get() == 'replica':
+            read_target.set('primary')
+        return 'default'
+    
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold copies of the primary's data
+        return True
+    
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
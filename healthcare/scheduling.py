@@ -0,0 +1,155 @@
+from datetime import time, timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, transaction
+from django.utils import timezone
+from .models import User, Appointment, DoctorSchedule
+
+SCHEDULES_CACHE_KEY = 'healthcare:doctor_schedules'
+FULL_DAY = None
+
+class SlotUnavailable(Exception):
+    pass
+
+def slot_minutes():
+    return settings.APPOINTMENT_SLOT_MINUTES
+
+def slot_index(value):
+    return (value.hour * 60 + value.minute) // slot_minutes()
+
+def slot_time(index):
+    minutes = index * slot_minutes()
+    return time(minutes // 60, minutes % 60)
+
+def is_slot_aligned(value):
+    return value.second == 0 and value.microsecond == 0 and (value.hour * 60 + value.minute) % slot_minutes() == 0
+
+def _span_mask(start, end):
+    first = slot_index(start)
+    last = slot_index(end) if end != time(0) else 1440 // slot_minutes()
+    return ((1 << last) - 1) & ~((1 << first) - 1)
+
+def working_masks():
+    """Return {doctor_id: [mask for Monday, ..., mask for Sunday]} for doctors with working hours."""
+    masks = cache.get(SCHEDULES_CACHE_KEY)
+    if masks is None:
+        masks = {}
+        # Cache fills read the primary; a replica may predate the change that emptied the cache
+        for doctor_id, weekday, start, end in DoctorSchedule.objects.using(DEFAULT_DB_ALIAS).values_list(
+                'doctor_id', 'weekday', 'start_time', 'end_time'):
+            masks.setdefault(doctor_id, [0] * 7)[weekday] |= _span_mask(start, end)
+        cache.set(SCHEDULES_CACHE_KEY, masks, None)
+    return masks
+
+def working_mask(doctor_id, day):
+    """Working-hours bitmap for a doctor on a date; FULL_DAY if no hours are configured."""
+    weekly = working_masks().get(doctor_id)
+    return FULL_DAY if weekly is None else weekly[day.weekday()]
+
+def _booked_key(doctor_id, day):
+    return f'healthcare:booked_slots:{doctor_id}:{day}'
+
+def booked_masks(doctor_ids, day):
+    """Return {doctor_id: bitmap of slots held by active appointments} for one date.
+    
+    Bitmaps are cached per doctor per day; all misses are filled with one query.
+    """
+    keys = {_booked_key(doctor_id, day): doctor_id for doctor_id in doctor_ids}
+    cached = cache.get_many(keys)
+    masks = {keys[key]: mask for key, mask in cached.items()}
+    missing = [doctor_id for doctor_id in doctor_ids if doctor_id not in masks]
+    if missing:
+        fresh = dict.fromkeys(missing, 0)
+        for doctor_id, start in Appointment.objects.using(DEFAULT_DB_ALIAS).filter(
+                doctor_id__in=missing, date=day, status__in=Appointment.ACTIVE_STATUSES
+        ).values_list('doctor_id', 'time'):
+            fresh[doctor_id] |= 1 << slot_index(start)
+        cache.set_many({_booked_key(doctor_id, day): mask for doctor_id, mask in fresh.items()},
+                       settings.APPOINTMENT_SLOTS_CACHE_TIMEOUT)
+        masks.update(fresh)
+    return masks
+
+def free_mask(doctor_id, day):
+    working = working_mask(doctor_id, day)
+    if working is FULL_DAY:
+        working = (1 << (1440 // slot_minutes())) - 1
+    return working & ~booked_masks([doctor_id], day)[doctor_id]
+
+def is_slot_free(doctor_id, day, start):
+    return bool(free_mask(doctor_id, day) >> slot_index(start) & 1)
+
+def free_slots(doctor_id, day):
+    mask = free_mask(doctor_id, day)
+    return [slot_time(index) for index in range(1440 // slot_minutes()) if mask >> index & 1]
+
+def next_free_slots(count, after=None, doctor_ids=None, days=None):
+    """Return up to `count` (date, time, doctor_id) tuples in chronological order.
+    
+    Only doctors with configured working hours are searched. Each day costs at
+    most one query, for doctors whose bitmaps are not cached yet.
+    """
+    after = timezone.localtime(after or timezone.now())
+    days = days or settings.APPOINTMENT_SEARCH_DAYS
+    weekly = working_masks()
+    candidates = [doctor_id for doctor_id in weekly if doctor_ids is None or doctor_id in doctor_ids]
+    if candidates:
+        active = set(User.objects.filter(pk__in=candidates, role='doctor', is_active=True).values_list('pk', flat=True))
+        candidates = [doctor_id for doctor_id in candidates if doctor_id in active]
+    
+    results = []
+    for offset in range(days):
+        day = after.date() + timedelta(days=offset)
+        earliest = slot_index(after.time()) + 1 if offset == 0 else 0
+        working = {}
+        for doctor_id in candidates:
+            mask = weekly[doctor_id][day.weekday()] >> earliest << earliest
+            if mask:
+                working[doctor_id] = mask
+        if not working:
+            continue
+        booked = booked_masks(list(working), day)
+        needed = count - len(results)
+        found = []
+        for doctor_id, mask in working.items():
+            free = mask & ~booked[doctor_id]
+            # Only the earliest `needed` slots of each doctor can make the cut
+            for _ in range(needed):
+                if not free:
+                    break
+                lowest = free & -free
+                found.append((lowest.bit_length() - 1, doctor_id))
+                free ^= lowest
+        for index, doctor_id in sorted(found)[:needed]:
+            results.append((day, slot_time(index), doctor_id))
+        if len(results) >= count:
+            break
+    return results
+
+def invalidate_booked_slots(doctor_id, day):
+    cache.delete(_booked_key(doctor_id, day))
+
+def invalidate_schedules():
+    cache.delete(SCHEDULES_CACHE_KEY)
+
+def book_appointment(appointment):
+    """Save a new or rescheduled appointment, refusing slots that are not free.
+    
+    The doctor row is locked so concurrent bookings for the same doctor are
+    serialized, and the partial unique constraint on (doctor, date, time) for
+    active statuses backs this up on databases without row locks.
+    """
+    clash = Appointment.objects.filter(
+        doctor_id=appointment.doctor_id, date=appointment.date, time=appointment.time,
+        status__in=Appointment.ACTIVE_STATUSES,
+    ).exclude(pk=appointment.pk)
+    try:
+        with transaction.atomic():
+            User.objects.select_for_update().filter(pk=appointment.doctor_id).exists()
+            if clash.exists():
+                raise SlotUnavailable('This time slot is already booked.')
+            appointment.save()
+    except IntegrityError:
+        if clash.exists():
+            raise SlotUnavailable('This time slot is already booked.')
+        raise
+    return appointment
@@ -0,0 +1,149 @@
+import re
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from .models import MedicalRecord
+
+SEARCH_FIELDS = ('diagnosis', 'treatment', 'prescription', 'notes')
+SEARCH_CONFIG = 'english'
+MAX_TERMS = 8
+
+# Diagnosis matches rank above treatment and prescription, which rank above notes
+POSTGRES_WEIGHTS = {'diagnosis': 'A', 'treatment': 'B', 'prescription': 'B', 'notes': 'C'}
+SQLITE_WEIGHTS = {'diagnosis': 10.0, 'treatment': 4.0, 'prescription': 4.0, 'notes': 1.0}
+
+FTS_TABLE = f'{MedicalRecord._meta.db_table}_fts'
+VECTOR_COLUMN = 'search_vector'
+VECTOR_INDEX = 'record_search_vector_idx'
+
+TERM_RE = re.compile(r'\w+')
+
+def search_terms(query):
+    return TERM_RE.findall((query or '').lower())[:MAX_TERMS]
+
+def _sqlite_statements(table):
+    columns = ', '.join(SEARCH_FIELDS)
+    new_values = ', '.join(f'new.{field}' for field in SEARCH_FIELDS)
+    old_values = ', '.join(f'old.{field}' for field in SEARCH_FIELDS)
+    insert = f'INSERT INTO {FTS_TABLE}(rowid, {columns}) VALUES (new.id, {new_values});'
+    delete = f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {columns}) VALUES ('delete', old.id, {old_values});"
+    return [
+        f'CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {table} BEGIN {insert} END',
+        f'CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {table} BEGIN {delete} END',
+        f'CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF {columns} ON {table} '
+        f'BEGIN {delete} {insert} END',
+    ]
+
+def _postgres_vector():
+    parts = [
+        f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce({field}, '')), '{weight}')"
+        for field, weight in POSTGRES_WEIGHTS.items()
+    ]
+    return ' || '.join(parts)
+
+def install_search_index(using='default'):
+    """Create the medical record search index if it does not exist yet.
+    
+    SQLite gets an external-content FTS5 table kept in sync by triggers, so
+    bulk_create() and queryset updates are indexed too. PostgreSQL gets a
+    stored tsvector column generated from the searchable fields plus a GIN
+    index. Other backends fall back to substring matching.
+    """
+    connection = connections[using]
+    table = MedicalRecord._meta.db_table
+    if table not in connection.introspection.table_names():
+        return
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+            created = cursor.fetchone() is None
+            if created:
+                cursor.execute(
+                    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5({', '.join(SEARCH_FIELDS)}, "
+                    f"content='{table}', content_rowid='id', tokenize='porter unicode61')"
+                )
+            # Rebuilding a table during a migration drops its triggers, so always restore them
+            for statement in _sqlite_statements(table):
+                cursor.execute(statement)
+            if created:
+                rebuild_search_index(using)
+        elif connection.vendor == 'postgresql':
+            cursor.execute(
+                f'ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {VECTOR_COLUMN} tsvector '
+                f'GENERATED ALWAYS AS ({_postgres_vector()}) STORED'
+            )
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS {VECTOR_INDEX} ON {table} USING gin ({VECTOR_COLUMN})')
+
+def rebuild_search_index(using='default'):
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+        elif connection.vendor == 'postgresql':
+            cursor.execute(f'REINDEX INDEX {VECTOR_INDEX}')
+
+def _match_expressions(terms):
+    return ' '.join(f'"{term}"*' for term in terms), ' & '.join(f'{term}:*' for term in terms)
+
+def search_filter(query, using='default'):
+    """Return a Q matching records for query without ranking them.
+    
+    The match is a self-contained subquery on the primary key, so it can be
+    combined with other conditions or used inside subqueries such as the
+    admin's search.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return Q(pk__in=[])
+    
+    connection = connections[using]
+    fts_query, tsquery = _match_expressions(terms)
+    if connection.vendor == 'sqlite':
+        return Q(pk__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [fts_query]))
+    if connection.vendor == 'postgresql':
+        table = MedicalRecord._meta.db_table
+        return Q(pk__in=RawSQL(
+            f"SELECT id FROM {table} WHERE {VECTOR_COLUMN} @@ to_tsquery('{SEARCH_CONFIG}', %s)", [tsquery]
+        ))
+    
+    match = Q()
+    for term in terms:
+        match &= Q(*[Q(**{f'{field}__icontains': term}) for field in SEARCH_FIELDS], _connector=Q.OR)
+    return match
+
+def search_records(queryset, query):
+    """Filter a MedicalRecord queryset to records matching query, best match first.
+    
+    Every term must match and each one also matches as a word prefix, so
+    partially typed words still find results. The rank is exposed as
+    search_rank and the queryset stays lazy so role filters compose with it.
+    The rank joins the index against the records table by name, so use the
+    result as the outer query and search_filter() inside subqueries.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return queryset.none()
+    
+    connection = connections[queryset.db]
+    table = MedicalRecord._meta.db_table
+    fts_query, tsquery = _match_expressions(terms)
+    if connection.vendor == 'sqlite':
+        weights = ', '.join(str(weight) for weight in SQLITE_WEIGHTS.values())
+        # bm25() scores better matches lower
+        return queryset.extra(
+            select={'search_rank': f'bm25({FTS_TABLE}, {weights})'},
+            tables=[FTS_TABLE],
+            where=[f'{FTS_TABLE}.rowid = {table}.id', f'{FTS_TABLE} MATCH %s'],
+            params=[fts_query],
+        ).order_by('search_rank', '-pk')
+    
+    if connection.vendor == 'postgresql':
+        return queryset.extra(
+            select={'search_rank': f"ts_rank_cd({table}.{VECTOR_COLUMN}, to_tsquery('{SEARCH_CONFIG}', %s))"},
+            select_params=[tsquery],
+            where=[f"{table}.{VECTOR_COLUMN} @@ to_tsquery('{SEARCH_CONFIG}', %s)"],
+            params=[tsquery],
+        ).order_by('-search_rank', '-pk')
+    
+    return queryset.filter(search_filter(query, queryset.db)).order_by('-date', '-pk')
@@ -0,0 +1,202 @@
+import weakref
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete, post_migrate
+from django.dispatch import receiver
+from .models import User, Appointment, DoctorSchedule, MedicalRecord, Notification, PatientSummary, Task, VitalSigns
+from .notifications import increment_unread, decrement_unread, publish_notification, publish_unread_count
+from .events import has_listeners, publish_to_user
+from .stats import invalidate_dashboard_stats
+from .timeseries import refresh_rollups
+from .scheduling import invalidate_booked_slots, invalidate_schedules
+from .search import install_search_index
+from .permissions import invalidate_care_team
+from .fragments import USERS_SCOPE, bump_fragment_versions, instance_scopes, user_scope
+from .sync import add_tombstone
+from .avatars import queue_avatar
+from .panel import refresh_panel
+from .summaries import refresh_summaries
+from .typeahead import SEARCH_FIELDS, index_user
+
+@receiver(pre_save, sender=User)
+def user_saving(sender, instance, **kwargs):
+    # Serve a new avatar as uploaded until its thumbnails are rendered
+    if instance.avatar_changed:
+        instance.avatar_digest = ''
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, update_fields=None, **kwargs):
+    if instance.avatar_changed:
+        instance._loaded_avatar = instance.avatar.name
+        if instance.avatar:
+            queue_avatar(instance.pk)
+    if created and instance.role == 'patient':
+        PatientSummary.objects.get_or_create(patient=instance)
+    if update_fields is None or SEARCH_FIELDS & set(update_fields):
+        index_user(instance)
+    # Logins only touch last_login and must not flush the stats on every request
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    invalidate_dashboard_stats()
+    bump_fragment_versions(USERS_SCOPE)
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    invalidate_dashboard_stats()
+    bump_fragment_versions(USERS_SCOPE)
+
+def _refresh_summaries(patient_ids, section, origin=None):
+    # Rows deleted because their patient is being deleted take the summary with them
+    if isinstance(origin, User):
+        patient_ids = [patient_id for patient_id in patient_ids if patient_id != origin.pk]
+    elif getattr(origin, 'model', None) is User:
+        return
+    refresh_summaries(patient_ids, [section])
+
+def _release_booked_slots(instance):
+    slots = {(instance.doctor_id, instance.date)}
+    loaded = getattr(instance, '_loaded_slot', None)
+    if loaded and None not in loaded:
+        slots.add(loaded)
+    instance._loaded_slot = (instance.doctor_id, instance.date)
+    transaction.on_commit(lambda: [invalidate_booked_slots(doctor_id, day) for doctor_id, day in slots])
+
+def _publish_pending_approvals(instance):
+    doctor_id = instance.doctor_id
+    if has_listeners(doctor_id):
+        publish_to_user(doctor_id, 'counters', lambda: {
+            'pending_approvals': Appointment.objects.filter(doctor_id=doctor_id, status='pending').count(),
+        })
+
+def _bump_appointment_fragments(instance):
+    scopes = instance_scopes(instance)
+    loaded = getattr(instance, '_loaded_slot', None)
+    # A rescheduled appointment also leaves the previous doctor's dashboard
+    if loaded and loaded[0] and loaded[0] != instance.doctor_id:
+        scopes.append(user_scope('healthcare.appointment', loaded[0]))
+    bump_fragment_versions(*scopes)
+
+def _refresh_panel(instance):
+    pairs = [(instance.doctor_id, instance.patient_id)]
+    loaded = getattr(instance, '_loaded_slot', None)
+    if loaded:
+        pairs.append((loaded[0], instance.patient_id))
+    transaction.on_commit(lambda: refresh_panel(pairs))
+
+def _invalidate_care_teams(instance):
+    loaded = getattr(instance, '_loaded_slot', None)
+    invalidate_care_team(instance.doctor_id, loaded[0] if loaded else None)
+
+@receiver(post_save, sender=Appointment)
+def appointment_saved(sender, instance, created, **kwargs):
+    # First, so caches invalidated below are never refilled from a stale panel
+    _refresh_panel(instance)
+    invalidate_dashboard_stats()
+    _bump_appointment_fragments(instance)
+    _invalidate_care_teams(instance)
+    _release_booked_slots(instance)
+    _publish_pending_approvals(instance)
+    _refresh_summaries([instance.patient_id], 'appointment')
+
+@receiver(post_delete, sender=Appointment)
+def appointment_deleted(sender, instance, origin=None, **kwargs):
+    _refresh_panel(instance)
+    invalidate_dashboard_stats()
+    _bump_appointment_fragments(instance)
+    _invalidate_care_teams(instance)
+    _release_booked_slots(instance)
+    _publish_pending_approvals(instance)
+    _refresh_summaries([instance.patient_id], 'appointment', origin)
+
+@receiver(post_save, sender=MedicalRecord)
+def medical_record_saved(sender, instance, created, **kwargs):
+    invalidate_care_team(instance.doctor_id)
+    bump_fragment_versions(*instance_scopes(instance))
+    _refresh_summaries([instance.patient_id], 'record')
+
+@receiver(post_delete, sender=MedicalRecord)
+def medical_record_deleted(sender, instance, origin=None, **kwargs):
+    invalidate_care_team(instance.doctor_id)
+    bump_fragment_versions(*instance_scopes(instance))
+    _refresh_summaries([instance.patient_id], 'record', origin)
+
+@receiver(post_save, sender=Task)
+def task_saved(sender, instance, created, **kwargs):
+    bump_fragment_versions(*instance_scopes(instance))
+    loaded = getattr(instance, '_loaded_assignee', None)
+    # A reassigned task leaves the previous assignee's offline copy
+    if loaded and loaded != instance.assigned_to_id:
+        add_tombstone(instance, owner_id=loaded)
+    instance._loaded_assignee = instance.assigned_to_id
+    _refresh_summaries([instance.patient_id, getattr(instance, '_loaded_patient', None)], 'tasks')
+    instance._loaded_patient = instance.patient_id
+
+@receiver(post_delete, sender=Task)
+def task_deleted(sender, instance, origin=None, **kwargs):
+    bump_fragment_versions(*instance_scopes(instance))
+    add_tombstone(instance, origin=origin)
+    _refresh_summaries([instance.patient_id], 'tasks', origin)
+
+@receiver(post_save, sender=DoctorSchedule)
+def doctor_schedule_saved(sender, instance, created, **kwargs):
+    transaction.on_commit(invalidate_schedules)
+
+@receiver(post_delete, sender=DoctorSchedule)
+def doctor_schedule_deleted(sender, instance, **kwargs):
+    transaction.on_commit(invalidate_schedules)
+
+@receiver(post_save, sender=Notification)
+def notification_saved(sender, instance, created, **kwargs):
+    if created and not instance.is_read:
+        increment_unread(instance.user_id)
+        publish_notification(instance)
+
+@receiver(post_delete, sender=Notification)
+def notification_deleted(sender, instance, origin=None, **kwargs):
+    add_tombstone(instance, origin=origin)
+    if not instance.is_read:
+        decrement_unread(instance.user_id)
+        publish_unread_count(instance.user_id)
+
+def _refresh_reading_rollups(instance):
+    if settings.VITALS_ROLLUPS_ON_INSERT:
+        transaction.on_commit(lambda: refresh_rollups([instance.patient_id], instance.recorded_at, instance.recorded_at))
+
+# Readings removed by each delete() call, keyed by the object or queryset it was called on
+_deleted_readings = weakref.WeakKeyDictionary()
+
+def _refresh_deleted_rollups(instance, origin):
+    """Refresh rollups once per patient after a delete() commits, however many readings it removed."""
+    if not settings.VITALS_ROLLUPS_ON_INSERT:
+        return
+    # The patient's rollups are deleted along with them
+    if isinstance(origin, User) and origin.pk == instance.patient_id:
+        return
+    ranges = _deleted_readings.get(origin)
+    if ranges is None:
+        ranges = _deleted_readings[origin] = {}
+        
+        def refresh():
+            _deleted_readings.pop(origin, None)
+            for patient_id, (start, end) in ranges.items():
+                refresh_rollups([patient_id], start, end)
+        transaction.on_commit(refresh)
+    start, end = ranges.get(instance.patient_id, (instance.recorded_at, instance.recorded_at))
+    ranges[instance.patient_id] = (min(start, instance.recorded_at), max(end, instance.recorded_at))
+
+@receiver(post_save, sender=VitalSigns)
+def vital_signs_saved(sender, instance, created, **kwargs):
+    _refresh_reading_rollups(instance)
+    _refresh_summaries([instance.patient_id], 'vitals')
+
+@receiver(post_delete, sender=VitalSigns)
+def vital_signs_deleted(sender, instance, origin=None, **kwargs):
+    add_tombstone(instance, origin=origin)
+    _refresh_deleted_rollups(instance, origin if origin is not None else instance)
+    _refresh_summaries([instance.patient_id], 'vitals', origin)
+
+@receiver(post_migrate)
+def install_search(sender, app_config=None, using='default', **kwargs):
+    # Search index objects live outside the model schema, so (re)create them after every migrate
+    if app_config is not None and app_config.label == 'healthcare':
+        install_search_index(using)
@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Count, Q
+from .models import User, Appointment
+
+DASHBOARD_STATS_CACHE_KEY = 'healthcare:dashboard_stats'
+
+def get_dashboard_stats():
+    """Return system-wide counters for the dashboard, cached for a short TTL."""
+    stats = cache.get(DASHBOARD_STATS_CACHE_KEY)
+    if stats is None:
+        # Filled from the primary: a lagging replica would cache counts the last write already changed
+        stats = User.objects.using(DEFAULT_DB_ALIAS).aggregate(
+            total_users=Count('id'),
+            doctors=Count('id', filter=Q(role='doctor')),
+            nurses=Count('id', filter=Q(role='nurse')),
+            patients=Count('id', filter=Q(role='patient')),
+        )
+        stats.update(Appointment.objects.using(DEFAULT_DB_ALIAS).aggregate(
+            total_appointments=Count('id'),
+            pending_appointments=Count('id', filter=Q(status='pending')),
+        ))
+        cache.set(DASHBOARD_STATS_CACHE_KEY, stats, settings.DASHBOARD_STATS_TIMEOUT)
+    return stats
+
+def invalidate_dashboard_stats():
+    cache.delete(DASHBOARD_STATS_CACHE_KEY)
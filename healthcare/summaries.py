@@ -0,0 +1,92 @@
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.utils import timezone
+from .models import User, Appointment, MedicalRecord, PatientSummary, Task, VitalSigns
+
+VITALS_FIELDS = ['blood_pressure_systolic', 'blood_pressure_diastolic', 'heart_rate', 'temperature',
+                 'oxygen_saturation']
+
+def _latest(model, ordering, patient_ids, **filters):
+    """Return {patient_id: latest object} in two queries, whatever the number of patients."""
+    latest = model.objects.filter(patient_id=OuterRef('pk'), **filters).order_by(*ordering).values('pk')[:1]
+    pks = User.objects.filter(pk__in=patient_ids).annotate(latest=Subquery(latest)).values_list('pk', 'latest')
+    objects = model.objects.in_bulk([pk for patient_id, pk in pks if pk])
+    return {obj.patient_id: obj for obj in objects.values()}
+
+def _vitals(patient_ids):
+    latest = _latest(VitalSigns, ['-recorded_at', '-pk'], patient_ids)
+    for patient_id in patient_ids:
+        reading = latest.get(patient_id)
+        values = {field: getattr(reading, field) if reading else None for field in VITALS_FIELDS}
+        yield patient_id, {'vitals_recorded_at': reading.recorded_at if reading else None, **values}
+
+def _record(patient_ids):
+    latest = _latest(MedicalRecord, ['-date', '-pk'], patient_ids)
+    for patient_id in patient_ids:
+        record = latest.get(patient_id)
+        yield patient_id, {
+            'latest_diagnosis': record.diagnosis if record else '',
+            'latest_record_date': record.date if record else None,
+        }
+
+def _appointment(patient_ids):
+    upcoming = _latest(Appointment, ['date', 'time', 'pk'], patient_ids,
+                       status='approved', date__gte=timezone.localdate())
+    for patient_id in patient_ids:
+        appointment = upcoming.get(patient_id)
+        yield patient_id, {
+            'next_appointment_date': appointment.date if appointment else None,
+            'next_appointment_time': appointment.time if appointment else None,
+            'next_appointment_doctor_id': appointment.doctor_id if appointment else None,
+        }
+
+def _tasks(patient_ids):
+    counts = dict(Task.objects.filter(patient_id__in=patient_ids).exclude(status='completed')
+                  .order_by().values_list('patient_id').annotate(Count('pk')))
+    for patient_id in patient_ids:
+        yield patient_id, {'open_tasks': counts.get(patient_id, 0)}
+
+# Summary sections, each recomputed from its own model
+SECTIONS = {
+    'vitals': _vitals,
+    'record': _record,
+    'appointment': _appointment,
+    'tasks': _tasks,
+}
+
+def refresh_summaries(patient_ids, sections=None):
+    """Recompute sections of the patients' summaries from their source rows.
+    
+    Runs in the caller's transaction, so a summary commits or rolls back with
+    the change that caused it. Summary rows are locked in patient order first:
+    concurrent writers for one patient then take turns, and each re-reads the
+    sources after the previous one committed. Returns {patient_id: summary}.
+    """
+    patient_ids = sorted({patient_id for patient_id in patient_ids if patient_id})
+    if not patient_ids:
+        return {}
+    sections = sections or list(SECTIONS)
+    with transaction.atomic():
+        PatientSummary.objects.bulk_create([PatientSummary(patient_id=patient_id) for patient_id in patient_ids],
+                                           ignore_conflicts=True)
+        summaries = PatientSummary.objects.select_for_update().filter(patient_id__in=patient_ids).order_by('pk')
+        summaries = {summary.patient_id: summary for summary in summaries}
+        fields = {'updated_at'}
+        for section in sections:
+            for patient_id, values in SECTIONS[section](patient_ids):
+                for field, value in values.items():
+                    setattr(summaries[patient_id], field, value)
+                fields.update(values)
+        for summary in summaries.values():
+            summary.updated_at = timezone.now()
+        PatientSummary.objects.bulk_update(summaries.values(), sorted(fields))
+    return summaries
+
+def rebuild_summaries(patient_ids=None, chunk_size=500):
+    """Rebuild every section for the given patients, or for all patients, and return the count."""
+    if patient_ids is None:
+        patient_ids = User.objects.filter(role='patient').order_by('pk').values_list('pk', flat=True)
+    patient_ids = list(patient_ids)
+    for start in range(0, len(patient_ids), chunk_size):
+        refresh_summaries(patient_ids[start:start + chunk_size])
+    return len(patient_ids)
@@ -0,0 +1,234 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.core import signing
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from .api import RESOURCES, ApiError
+from .ingest import build_vitals, insert_vitals
+from .models import IdempotencyKey, Notification, SyncTombstone, Task, User, VitalSigns
+from .permissions import care_team_patient_ids
+
+TOKEN_SALT = 'healthcare.sync'
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+def _micros(value):
+    return (value - EPOCH) // timedelta(microseconds=1)
+
+def _datetime(micros):
+    return EPOCH + timedelta(microseconds=micros)
+
+class SyncCollection:
+    """One kind of row a client keeps offline, and whose rows are in a user's scope.
+    
+    owner_field names the column that puts a row in someone's scope; the
+    same owner ID is written to the tombstone when the row is deleted.
+    """
+    
+    def __init__(self, name, owner_field):
+        self.name = name
+        self.owner_field = owner_field
+    
+    @property
+    def resource(self):
+        return RESOURCES[self.name]
+    
+    def owners(self, user):
+        return [user.pk]
+    
+    def rows(self, owners):
+        return self.resource.model.objects.filter(**{f'{self.owner_field}__in': owners})
+    
+    def tombstones(self, owners):
+        return SyncTombstone.objects.filter(collection=self.name, owner_id__in=owners)
+
+class VitalsCollection(SyncCollection):
+    def owners(self, user):
+        """Patients whose vitals the user keeps offline."""
+        if user.role == 'patient':
+            return [user.pk]
+        if user.role == 'doctor':
+            return sorted(care_team_patient_ids(user))
+        if user.role == 'nurse':
+            # A ward tablet follows the patients of the nurse's open tasks
+            return sorted(set(
+                Task.objects.filter(assigned_to=user, patient__isnull=False).exclude(status='completed')
+                .order_by().values_list('patient_id', flat=True)
+            ))
+        return []
+
+COLLECTIONS = {
+    'tasks': SyncCollection('tasks', 'assigned_to_id'),
+    'vitals': VitalsCollection('vitals', 'patient_id'),
+    'notifications': SyncCollection('notifications', 'user_id'),
+}
+
+# Collection whose rows belong to each model, for tombstones written by the delete signals
+MODEL_COLLECTIONS = {
+    Task: COLLECTIONS['tasks'],
+    VitalSigns: COLLECTIONS['vitals'],
+    Notification: COLLECTIONS['notifications'],
+}
+
+def add_tombstone(instance, owner_id=None, origin=None):
+    """Record a deleted row for its owner's next sync; origin is what delete() was called on."""
+    collection = MODEL_COLLECTIONS[type(instance)]
+    owner_id = owner_id or getattr(instance, collection.owner_field)
+    # Nobody syncs for an owner that is being deleted, so a cascade writes no tombstones
+    if isinstance(origin, User) and origin.pk == owner_id:
+        return
+    if owner_id:
+        SyncTombstone.objects.create(collection=collection.name, object_id=instance.pk, owner_id=owner_id)
+
+def encode_token(state):
+    return signing.dumps(state, salt=TOKEN_SALT, compress=True)
+
+def decode_token(token):
+    if not token:
+        return {'cursors': {}, 'patients': None, 'backfill': [], 'backfill_cursor': None}
+    try:
+        state = signing.loads(token, salt=TOKEN_SALT)
+    except signing.BadSignature:
+        raise ApiError('Invalid sync token.')
+    # Tombstones and idempotency keys older than the retention period are purged
+    if _datetime(state['issued']) < timezone.now() - timedelta(days=settings.SYNC_RETENTION_DAYS):
+        raise ApiError('Sync token expired; discard local data and sync from scratch.', status=410)
+    return state
+
+def _after(field, cursor):
+    """Keyset condition for rows ordered by (field, pk) that come after cursor."""
+    if cursor is None:
+        return Q()
+    moment, pk = _datetime(cursor[0]), cursor[1]
+    return Q(**{f'{field}__gt': moment}) | Q(**{field: moment, 'pk__gt': pk})
+
+def _next_cursor(page, field, limit, floor):
+    # A full page continues from its last row. Once caught up, restart from a little
+    # in the past, so rows from transactions that committed late are sent again
+    # rather than missed; clients apply rows by id, so repeats are harmless.
+    if len(page) > limit:
+        last = page[limit - 1]
+        return [_micros(last[field]), last['id']], True
+    return [floor, 0], False
+
+def sync_changes(user, token=None, limit=None):
+    """Return rows created, updated or deleted in the user's scope since token.
+    
+    The response holds, per collection, 'updated' rows and 'deleted' IDs, plus
+    a new token. Clients apply deletions before updates. While 'more' is true
+    there are further pages and the client should call again straight away.
+    For vitals, patients who joined the user's scope since the last sync get
+    their full history, and 'removed_patients' lists the ones who left it.
+    """
+    limit = limit or settings.SYNC_BATCH_SIZE
+    state = decode_token(token)
+    now = timezone.now()
+    floor = _micros(now - timedelta(seconds=settings.SYNC_OVERLAP_SECONDS))
+    more = False
+    changes = {}
+    cursors = {}
+    
+    for name, collection in COLLECTIONS.items():
+        owners = collection.owners(user)
+        row_cursor, tombstone_cursor = state['cursors'].get(name, [None, None])
+        columns = collection.resource.fields
+        rows = list(collection.rows(owners).filter(_after('updated_at', row_cursor))
+                    .order_by('updated_at', 'pk').values(*columns)[:limit + 1])
+        tombstones = list(collection.tombstones(owners).filter(_after('deleted_at', tombstone_cursor))
+                          .order_by('deleted_at', 'pk').values('id', 'object_id', 'deleted_at')[:limit + 1])
+        next_rows, rows_more = _next_cursor(rows, 'updated_at', limit, floor)
+        next_tombstones, tombstones_more = _next_cursor(tombstones, 'deleted_at', limit, floor)
+        cursors[name] = [next_rows, next_tombstones]
+        more = more or rows_more or tombstones_more
+        changes[name] = {
+            'updated': rows[:limit],
+            'deleted': [tombstone['object_id'] for tombstone in tombstones[:limit]],
+        }
+    
+    patients, backfill, backfill_cursor, backfill_more = _vitals_backfill(
+        user, state, changes['vitals'], state['cursors'].get('vitals', [None])[0], limit)
+    return {
+        **changes,
+        'more': more or backfill_more,
+        'token': encode_token({
+            'issued': _micros(now),
+            'cursors': cursors,
+            'patients': patients,
+            'backfill': backfill,
+            'backfill_cursor': backfill_cursor,
+        }),
+    }
+
+def _vitals_backfill(user, state, changes, row_cursor, limit):
+    """Send the older vitals of patients who joined the user's scope since the last sync."""
+    current = COLLECTIONS['vitals'].owners(user)
+    if state['patients'] is None or row_cursor is None:
+        # A first sync already sends every reading for everyone in scope
+        return current, [], None, False
+    
+    known = set(state['patients']) | set(state['backfill'])
+    changes['removed_patients'] = sorted(known - set(current))
+    synced = sorted(set(state['patients']) & set(current))
+    backfill = sorted((set(state['backfill']) & set(current)) | (set(current) - known))
+    if not backfill:
+        return synced, [], None, False
+    
+    # Readings after the row cursor already come with the regular changes
+    queryset = VitalSigns.objects.filter(patient_id__in=backfill).exclude(_after('updated_at', row_cursor))
+    cursor = state['backfill_cursor']
+    if cursor:
+        queryset = queryset.filter(Q(patient_id__gt=cursor[0]) | Q(patient_id=cursor[0], pk__gt=cursor[1]))
+    rows = list(queryset.order_by('patient_id', 'pk').values(*RESOURCES['vitals'].fields)[:limit + 1])
+    changes['updated'].extend(rows[:limit])
+    if len(rows) <= limit:
+        return sorted(set(synced) | set(backfill)), [], None, False
+    
+    last = rows[limit - 1]
+    done = [patient_id for patient_id in backfill if patient_id < last['patient_id']]
+    pending = [patient_id for patient_id in backfill if patient_id >= last['patient_id']]
+    return sorted(set(synced) | set(done)), pending, [last['patient_id'], last['id']], True
+
+def upload_vitals(user, readings):
+    """Store vitals recorded offline, each carrying a client-chosen idempotency_key.
+    
+    Readings whose key was stored before are reported as duplicates with the
+    ID they were stored under, so a client can safely retry a whole batch.
+    A key repeated within the batch is an error on every line after the first.
+    """
+    results = []
+    errors = []
+    keyed = {}
+    for index, reading in enumerate(readings, start=1):
+        key = reading.get('idempotency_key') if isinstance(reading, dict) else None
+        if not key or not isinstance(key, str) or len(key) > 64:
+            errors.append({'line': index, 'errors': {'idempotency_key': ['A key of up to 64 characters is required.']}})
+            continue
+        if key in keyed:
+            errors.append({'line': index, 'idempotency_key': key,
+                           'errors': {'idempotency_key': [f'Key already used on line {keyed[key][0]}.']}})
+            continue
+        # Accept patient_id as the API returns it, as well as patient as in bulk uploads
+        row = {**reading}
+        row.setdefault('patient', row.get('patient_id'))
+        keyed[key] = (index, row)
+    
+    existing = dict(IdempotencyKey.objects.filter(user=user, key__in=keyed).values_list('key', 'vital_signs_id'))
+    for key, vital_signs_id in existing.items():
+        results.append({'idempotency_key': key, 'id': vital_signs_id, 'status': 'duplicate'})
+    
+    pending = {key: value for key, value in keyed.items() if key not in existing}
+    lines = {index: key for key, (index, row) in pending.items()}
+    built, row_errors = build_vitals([(index, row) for index, row in pending.values()], user)
+    errors.extend({**error, 'idempotency_key': lines[error['line']]} for error in row_errors)
+    try:
+        with transaction.atomic():
+            insert_vitals([reading for index, reading in built])
+            IdempotencyKey.objects.bulk_create([
+                IdempotencyKey(user=user, key=lines[index], vital_signs=reading) for index, reading in built
+            ])
+    except IntegrityError:
+        # Another request stored one of these keys first; a retry reports it as a duplicate
+        raise ApiError('A concurrent upload used the same idempotency keys; retry the request.', status=409)
+    results.extend({'idempotency_key': lines[index], 'id': reading.pk, 'status': 'created'}
+                   for index, reading in built)
+    return {'results': results, 'errors': errors}
@@ -0,0 +1,258 @@
+import random
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from itertools import islice
+from math import gcd
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+from .models import User, Appointment, DoctorSchedule, MedicalRecord, Notification, Task, VitalSigns
+from .panel import rebuild_panel
+from .scheduling import slot_index, slot_time
+from .summaries import rebuild_summaries
+from .typeahead import rebuild_user_index
+
+SCALES = {
+    'small': {'admins': 2, 'doctors': 20, 'nurses': 40, 'patients': 2000,
+              'appointments': 3, 'records': 2, 'vitals': 20, 'tasks': 20, 'notifications': 5},
+    'medium': {'admins': 5, 'doctors': 500, 'nurses': 1000, 'patients': 100000,
+               'appointments': 3, 'records': 3, 'vitals': 30, 'tasks': 50, 'notifications': 10},
+    'hospital': {'admins': 20, 'doctors': 10000, 'nurses': 20000, 'patients': 1000000,
+                 'appointments': 4, 'records': 3, 'vitals': 50, 'tasks': 100, 'notifications': 10},
+}
+
+FIRST_NAMES = ['James', 'Mary', 'Robert', 'Patricia', 'John', 'Jennifer', 'Michael', 'Linda', 'David',
+               'Elizabeth', 'Aisha', 'Wei', 'Priya', 'Carlos', 'Fatima', 'Yuki', 'Olga', 'Kwame', 'Sofia', 'Omar']
+LAST_NAMES = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Martinez',
+              'Lopez', 'Chen', 'Patel', 'Kim', 'Nguyen', 'Okafor', 'Ivanova', 'Rossi', 'Haddad', 'Sato', 'Silva']
+
+DIAGNOSES = [
+    ('Essential hypertension', 'Lifestyle changes, low sodium diet and home blood pressure monitoring.', 'Lisinopril 10mg once daily'),
+    ('Type 2 diabetes mellitus', 'Dietary counselling and glucose monitoring; HbA1c in three months.', 'Metformin 500mg twice daily'),
+    ('Acute bronchitis', 'Rest, fluids and steam inhalation.', 'Dextromethorphan syrup as needed'),
+    ('Seasonal allergic rhinitis', 'Avoid triggers and use saline nasal rinse.', 'Cetirizine 10mg once daily'),
+    ('Asthma, mild persistent', 'Inhaler technique reviewed; asthma action plan provided.', 'Budesonide inhaler 200mcg twice daily'),
+    ('Hyperlipidemia', 'Diet and exercise plan; repeat lipid panel in six weeks.', 'Atorvastatin 20mg at night'),
+    ('Migraine without aura', 'Headache diary and sleep hygiene advice.', 'Sumatriptan 50mg at onset'),
+    ('Urinary tract infection', 'Increase fluid intake; urine culture sent.', 'Nitrofurantoin 100mg twice daily for 5 days'),
+    ('Gastroesophageal reflux disease', 'Elevate head of bed and avoid late meals.', 'Omeprazole 20mg before breakfast'),
+    ('Hypothyroidism', 'TSH to be rechecked in eight weeks.', 'Levothyroxine 50mcg once daily'),
+    ('Iron deficiency anemia', 'Dietary iron advice; repeat blood count in one month.', 'Ferrous sulfate 325mg daily'),
+    ('Low back pain', 'Physiotherapy referral and activity modification.', 'Ibuprofen 400mg as needed'),
+]
+APPOINTMENT_TYPES = ['Consultation', 'Follow-up', 'Check-up', 'Vaccination', 'Lab Review', 'Procedure']
+TASK_TITLES = ['Administer medication', 'Record vitals', 'Change dressing', 'Prepare discharge papers',
+               'Collect blood sample', 'Update care plan', 'Patient education session', 'Follow-up call']
+NOTIFICATIONS = [
+    ('Appointment Approved', 'Your appointment has been approved.', 'success'),
+    ('Appointment Reminder', 'You have an appointment tomorrow.', 'info'),
+    ('New Task Assigned', 'A new task has been assigned to you.', 'info'),
+    ('Lab Results Ready', 'New lab results are available.', 'info'),
+    ('Abnormal Reading', 'A recent vital sign reading is outside the normal range.', 'warning'),
+]
+
+# Every generated doctor works these hours on these weekdays (Monday is 0)
+WORKING_DAYS = range(5)
+WORKING_HOURS = (time(9), time(17))
+# Stepping through a doctor's calendar by a prime spreads appointments without repeating a slot
+SLOT_STRIDE = 7919
+
+@contextmanager
+def historical_timestamps(*models):
+    """Let bulk_create() keep the auto_now/auto_now_add values set on the objects."""
+    fields = [field for model in models for field in model._meta.concrete_fields
+              if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now = auto_now
+            field.auto_now_add = auto_now_add
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+class SyntheticDataGenerator:
+    """Generate a synthetic hospital with bulk_create() in fixed-size batches.
+    
+    Objects are produced lazily and inserted batch by batch, so memory use
+    depends on the batch size and the number of users, not on the number of
+    readings. Only user IDs are kept between steps.
+    """
+    
+    def __init__(self, scale, prefix='synth', days=365, seed=0, batch_size=5000, password='password', log=None):
+        self.scale = scale
+        self.prefix = prefix
+        self.days = days
+        self.random = random.Random(seed)
+        self.batch_size = batch_size
+        self.password = make_password(password)
+        self.log = log or (lambda message: None)
+        self.now = timezone.now()
+        self.today = timezone.localdate()
+        self.doctor_slots = {}
+        # Appointments run from days ago to 30 days ahead, on the bookable slots of the working days
+        first_day = self.today - timedelta(days=days)
+        self.working_days = [first_day + timedelta(days=offset) for offset in range(days + 30)
+                             if (first_day + timedelta(days=offset)).weekday() in WORKING_DAYS]
+        start, end = WORKING_HOURS
+        self.day_slots = [slot_time(index) for index in range(slot_index(start), slot_index(end))]
+        self.total_slots = len(self.working_days) * len(self.day_slots)
+        self.slot_stride = SLOT_STRIDE
+        while gcd(self.slot_stride, self.total_slots) != 1:
+            self.slot_stride += 1
+    
+    def insert(self, model, objects, keep_ids=False):
+        ids = []
+        count = 0
+        with transaction.atomic():
+            for chunk in _chunks(objects, self.batch_size):
+                created = model.objects.bulk_create(chunk)
+                count += len(created)
+                if keep_ids:
+                    ids.extend(obj.pk for obj in created)
+        self.log(f'{model._meta.verbose_name_plural}: {count}')
+        return ids if keep_ids else count
+    
+    def past_datetime(self):
+        return self.now - timedelta(seconds=self.random.randrange(self.days * 86400))
+    
+    def generate(self):
+        if User.objects.filter(username__startswith=f'{self.prefix}_').exists():
+            raise ValueError(f'Users prefixed "{self.prefix}_" already exist; pick another prefix.')
+        with historical_timestamps(User, Appointment, MedicalRecord, Notification, Task, VitalSigns):
+            admins = self.insert(User, self.users('super_admin', self.scale['admins']), keep_ids=True)
+            doctors = self.insert(User, self.users('doctor', self.scale['doctors']), keep_ids=True)
+            nurses = self.insert(User, self.users('nurse', self.scale['nurses']), keep_ids=True)
+            patients = self.insert(User, self.users('patient', self.scale['patients']), keep_ids=True)
+            users = admins + doctors + nurses + patients
+            # bulk_create() sends no signals, so index the generated users for the user pickers here
+            keys = sum(rebuild_user_index(chunk, self.batch_size) for chunk in _chunks(users, self.batch_size))
+            self.log(f'user search keys: {keys}')
+            self.insert(DoctorSchedule, self.schedules(doctors))
+            self.insert(Appointment, self.appointments(doctors, patients))
+            # bulk_create() sends no signals, so build the generated doctors' panels in one pass
+            self.log(f'panel entries: {rebuild_panel(doctors, self.batch_size)}')
+            self.insert(MedicalRecord, self.records(doctors, patients))
+            self.insert(VitalSigns, self.vitals(nurses, patients))
+            self.insert(Task, self.tasks(nurses, patients))
+            self.insert(Notification, self.notifications(users))
+        self.log(f'patient summaries: {rebuild_summaries(patients, self.batch_size)}')
+    
+    def users(self, role, count):
+        for index in range(count):
+            joined = self.past_datetime()
+            yield User(
+                username=f'{self.prefix}_{role}_{index}',
+                password=self.password,
+                email=f'{self.prefix}_{role}_{index}@example.com',
+                first_name=self.random.choice(FIRST_NAMES),
+                last_name=self.random.choice(LAST_NAMES),
+                role=role,
+                is_staff=role == 'super_admin',
+                is_superuser=role == 'super_admin',
+                date_joined=joined,
+                date_of_birth=(self.now - timedelta(days=self.random.randint(18 * 365, 90 * 365))).date()
+                if role == 'patient' else None,
+            )
+    
+    def schedules(self, doctors):
+        for doctor_id in doctors:
+            for weekday in WORKING_DAYS:
+                yield DoctorSchedule(doctor_id=doctor_id, weekday=weekday,
+                                     start_time=WORKING_HOURS[0], end_time=WORKING_HOURS[1])
+    
+    def next_slot(self, doctor_id):
+        # Each doctor's k-th appointment takes a distinct (day, slot) within
+        # their working hours, so active ones never clash
+        k = self.doctor_slots.get(doctor_id, 0)
+        self.doctor_slots[doctor_id] = k + 1
+        position = (k * self.slot_stride) % self.total_slots
+        day_index, slot = divmod(position, len(self.day_slots))
+        return self.working_days[day_index], self.day_slots[slot]
+    
+    def care_doctor(self, doctors, index):
+        # Most visits go to the patient's own doctor, the rest to a random colleague
+        if self.random.random() < 0.8:
+            return doctors[index % len(doctors)]
+        return self.random.choice(doctors)
+    
+    def appointments(self, doctors, patients):
+        for index, patient_id in enumerate(patients):
+            for _ in range(self.scale['appointments']):
+                doctor_id = self.care_doctor(doctors, index)
+                day, start = self.next_slot(doctor_id)
+                if day < self.today:
+                    status = self.random.choices(['completed', 'cancelled', 'rejected'], [85, 10, 5])[0]
+                else:
+                    status = self.random.choice(['pending', 'approved'])
+                created = timezone.make_aware(datetime.combine(min(day, self.today), time(8))) - timedelta(
+                    days=self.random.randint(1, 30))
+                yield Appointment(
+                    patient_id=patient_id, doctor_id=doctor_id, date=day, time=start, status=status,
+                    type=self.random.choice(APPOINTMENT_TYPES), created_at=created, updated_at=created,
+                )
+    
+    def records(self, doctors, patients):
+        for index, patient_id in enumerate(patients):
+            for _ in range(self.scale['records']):
+                diagnosis, treatment, prescription = self.random.choice(DIAGNOSES)
+                created = self.past_datetime()
+                yield MedicalRecord(
+                    patient_id=patient_id, doctor_id=self.care_doctor(doctors, index), diagnosis=diagnosis,
+                    treatment=treatment, prescription=prescription,
+                    notes='Patient tolerating treatment well.' if self.random.random() < 0.3 else '',
+                    date=timezone.localtime(created).date(), created_at=created, updated_at=created,
+                )
+    
+    def vitals(self, nurses, patients):
+        for patient_id in patients:
+            weight = self.random.uniform(50, 110)
+            height = Decimal(f'{self.random.uniform(150, 195):.2f}')
+            for _ in range(self.scale['vitals']):
+                recorded = self.past_datetime()
+                yield VitalSigns(
+                    patient_id=patient_id,
+                    recorded_by_id=self.random.choice(nurses),
+                    blood_pressure_systolic=round(self.random.gauss(122, 15)),
+                    blood_pressure_diastolic=round(self.random.gauss(79, 10)),
+                    heart_rate=round(self.random.gauss(74, 12)),
+                    temperature=Decimal(f'{self.random.gauss(36.8, 0.4):.1f}'),
+                    oxygen_saturation=min(100, round(self.random.gauss(97, 1.5))),
+                    weight=Decimal(f'{weight + self.random.gauss(0, 1):.2f}'),
+                    height=height,
+                    recorded_at=recorded, updated_at=recorded,
+                )
+    
+    def tasks(self, nurses, patients):
+        for nurse_id in nurses:
+            for _ in range(self.scale['tasks']):
+                created = self.past_datetime()
+                status = self.random.choices(['completed', 'in_progress', 'pending'], [70, 10, 20])[0]
+                completed = created + timedelta(hours=4) if status == 'completed' else None
+                yield Task(
+                    title=self.random.choice(TASK_TITLES), description='Generated task.',
+                    assigned_to_id=nurse_id, patient_id=self.random.choice(patients),
+                    priority=self.random.choice(['low', 'medium', 'high']), status=status,
+                    due_date=timezone.localtime(created).date() + timedelta(days=self.random.randint(0, 7)),
+                    created_at=created, updated_at=completed or created, completed_at=completed,
+                )
+    
+    def notifications(self, users):
+        for user_id in users:
+            for _ in range(self.scale['notifications']):
+                title, message, type = self.random.choice(NOTIFICATIONS)
+                created = self.past_datetime()
+                yield Notification(
+                    user_id=user_id, title=title, message=message, type=type,
+                    is_read=self.random.random() < 0.7, created_at=created, updated_at=created,
+                )
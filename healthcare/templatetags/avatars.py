@@ -0,0 +1,35 @@
+from django import template
+from django.conf import settings
+from django.urls import reverse
+from django.utils.html import format_html
+from ..avatars import thumbnail_filename
+
+register = template.Library()
+
+def _url(digest, size, ext):
+    return reverse('avatar_thumbnail', args=[thumbnail_filename(digest, size, ext)])
+
+@register.simple_tag
+def avatar(user, size, css_class=''):
+    """<img> of a user's avatar at size CSS pixels, from thumbnails where rendered.
+    
+    Renders WebP with a JPEG fallback and a 2x image for dense screens when
+    AVATAR_SIZES has one. Until the thumbnails exist the upload is served as is.
+    """
+    if not user.avatar:
+        return ''
+    if not user.avatar_digest or size not in settings.AVATAR_SIZES:
+        return format_html('<img src="{}" alt="Avatar" class="{}" width="{}" height="{}">',
+                           user.avatar.url, css_class, size, size)
+    
+    def srcset(ext):
+        sources = [f'{_url(user.avatar_digest, size, ext)} 1x']
+        if size * 2 in settings.AVATAR_SIZES:
+            sources.append(f'{_url(user.avatar_digest, size * 2, ext)} 2x')
+        return ', '.join(sources)
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}">'
+        '<img src="{}" srcset="{}" alt="Avatar" class="{}" width="{}" height="{}" loading="lazy" decoding="async">'
+        '</picture>',
+        srcset('webp'), _url(user.avatar_digest, size, 'jpg'), srcset('jpg'), css_class, size, size,
+    )
@@ -0,0 +1,27 @@
+from contextlib import ExitStack
+from django.db import connections
+from .middleware import QueryRecorder, query_budget
+
+class QueryBudgetMixin:
+    """TestCase mixin that checks a request against its view's QUERY_BUDGETS entry.
+    
+    Queries are counted on every database alias, like QueryProfilingMiddleware
+    does, so the check holds whether or not QUERY_PROFILING is on.
+    """
+    
+    def assertWithinQueryBudget(self, path, client=None, **extra):
+        client = client or self.client
+        recorder = QueryRecorder()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(recorder))
+            response = client.get(path, **extra)
+        view = response.resolver_match.view_name
+        budget = query_budget(view)
+        if budget:
+            self.assertLessEqual(
+                recorder.count, budget,
+                f'{view} ran {recorder.count} queries, over its budget of {budget} '
+                f'({recorder.duplicates} duplicates, up to {recorder.similar} of one statement)',
+            )
+        return response
@@ -0,0 +1,47 @@
+from datetime import time
+from django.test import TestCase
+from django.urls import resolve, reverse
+from django.utils import timezone
+from healthcare import urls, views
+from healthcare.benchmarks import SKIPPED, ROLES, _target, benchmark_users
+from healthcare.models import User, Appointment, MedicalRecord, Notification, Task, VitalSigns
+
+class BenchmarkTargetTests(TestCase):
+    """Every named URL the benchmark requests reverses with the arguments _target builds for it."""
+    
+    @classmethod
+    def setUpTestData(cls):
+        doctor = User.objects.create_user('doctor', role='doctor')
+        nurse = User.objects.create_user('nurse', role='nurse', avatar_digest='a' * 64)
+        patient = User.objects.create_user('patient', role='patient')
+        User.objects.create_user('admin', role='super_admin')
+        today = timezone.localdate()
+        Appointment.objects.create(patient=patient, doctor=doctor, status='pending', type='Checkup',
+                                   date=today, time=time(9))
+        MedicalRecord.objects.create(patient=patient, doctor=doctor, diagnosis='Flu', treatment='Rest',
+                                     prescription='Fluids', date=today)
+        VitalSigns.objects.create(patient=patient, recorded_by=nurse, blood_pressure_systolic=120,
+                                  blood_pressure_diastolic=80, heart_rate=70, temperature=36.6,
+                                  oxygen_saturation=98)
+        Task.objects.create(title='Check vitals', description='Morning round', assigned_to=nurse,
+                            patient=patient, due_date=today)
+        for user in [doctor, nurse, patient]:
+            Notification.objects.create(user=user, title='Update', message='Something changed')
+    
+    def test_every_named_url_reverses(self):
+        users = benchmark_users()
+        for role in ROLES:
+            for pattern in urls.urlpatterns:
+                if not pattern.name or pattern.name in SKIPPED:
+                    continue
+                with self.subTest(role=role, url=pattern.name):
+                    target = _target(pattern.name, users[role])
+                    if target is not None:
+                        kwargs, query = target
+                        reverse(pattern.name, kwargs=kwargs)
+    
+    def test_avatar_thumbnail_target(self):
+        kwargs, query = _target('avatar_thumbnail', benchmark_users()['nurse'])
+        match = resolve(reverse('avatar_thumbnail', kwargs=kwargs))
+        self.assertEqual(match.func, views.avatar_thumbnail)
+        self.assertTrue(kwargs['filename'].startswith('a' * 64))
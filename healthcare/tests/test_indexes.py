@@ -0,0 +1,56 @@
+from unittest import skipUnless
+from django.db import connection
+from django.test import TestCase
+from healthcare.models import User, Appointment, MedicalRecord, Notification, Task, VitalSigns
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN output is checked in the SQLite format')
+class ListQueryIndexTests(TestCase):
+    """Each list and dashboard query is answered from one of the Meta.indexes, not a table scan."""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.doctor = User.objects.create_user('doctor', role='doctor')
+        cls.nurse = User.objects.create_user('nurse', role='nurse')
+        cls.patient = User.objects.create_user('patient', role='patient')
+    
+    def assertUsesIndex(self, queryset, index):
+        plan = queryset.explain()
+        self.assertIn(f'USING INDEX {index}', plan)
+        self.assertNotRegex(plan, r'\bSCAN healthcare_')
+    
+    def test_appointments(self):
+        self.assertUsesIndex(Appointment.objects.filter(doctor=self.doctor).order_by('-date'),
+                             'appt_doctor_date_idx')
+        self.assertUsesIndex(Appointment.objects.filter(patient=self.patient).order_by('-date'),
+                             'appt_patient_date_idx')
+        self.assertUsesIndex(Appointment.objects.visible_to(self.doctor).for_listing().order_by('-date'),
+                             'appt_doctor_date_idx')
+    
+    def test_pending_appointments_use_partial_index(self):
+        self.assertUsesIndex(Appointment.objects.filter(doctor=self.doctor, status='pending'),
+                             'appt_pending_doctor_idx')
+    
+    def test_medical_records(self):
+        self.assertUsesIndex(MedicalRecord.objects.filter(patient=self.patient).order_by('-date'),
+                             'record_patient_date_idx')
+        self.assertUsesIndex(MedicalRecord.objects.filter(doctor=self.doctor).order_by('-date'),
+                             'record_doctor_date_idx')
+    
+    def test_tasks(self):
+        self.assertUsesIndex(Task.objects.filter(assigned_to=self.nurse).order_by('-created_at'),
+                             'task_assignee_created_idx')
+        self.assertUsesIndex(Task.objects.filter(assigned_to=self.nurse).order_by('due_date'),
+                             'task_assignee_due_idx')
+    
+    def test_vitals(self):
+        self.assertUsesIndex(VitalSigns.objects.filter(patient=self.patient).order_by('-recorded_at'),
+                             'vitals_patient_recorded_idx')
+    
+    def test_notifications(self):
+        self.assertUsesIndex(Notification.objects.filter(user=self.nurse).order_by('-created_at'),
+                             'notif_user_created_idx')
+        self.assertUsesIndex(Notification.objects.filter(user=self.nurse, is_read=False).order_by('-created_at'),
+                             'notif_unread_user_idx')
+    
+    def test_users_by_role(self):
+        self.assertUsesIndex(User.objects.filter(role='doctor', is_active=True), 'user_role_active_idx')
@@ -0,0 +1,48 @@
+import base64
+import json
+from django.test import TestCase
+from django.urls import reverse
+from healthcare.models import User, Notification
+
+def cursor(payload):
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+class KeysetCursorTests(TestCase):
+    """Cursors are client input: a tampered one answers 404 instead of reaching the query."""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.nurse = User.objects.create_user('nurse', role='nurse')
+        Notification.objects.bulk_create([
+            Notification(user=cls.nurse, title=f'Update {index}', message='Changed') for index in range(30)
+        ])
+    
+    def setUp(self):
+        self.client.force_login(self.nurse)
+    
+    def get(self, value):
+        return self.client.get(reverse('notifications'), {'cursor': value})
+    
+    def test_next_page_cursor(self):
+        response = self.client.get(reverse('notifications'))
+        next_cursor = response.context['page_obj'].next_cursor
+        self.assertIsNotNone(next_cursor)
+        self.assertEqual(self.get(next_cursor).status_code, 200)
+    
+    def test_tampered_cursors(self):
+        valid = self.client.get(reverse('notifications')).context['page_obj'].next_cursor
+        direction, value, pk = json.loads(base64.urlsafe_b64decode(valid + '=' * (-len(valid) % 4)))
+        for tampered in [
+            'not-base64!',
+            cursor({'pk': 'x'}),
+            cursor({'direction': 'next', 'value': value, 'pk': pk}),
+            cursor([direction, value, 'x']),
+            cursor([direction, value, True]),
+            cursor([direction, value, None]),
+            cursor([direction, 'yesterday', pk]),
+            cursor([direction, ['2026-01-01'], pk]),
+            cursor([direction, 12, pk]),
+            cursor(['sideways', value, pk]),
+        ]:
+            with self.subTest(cursor=tampered):
+                self.assertEqual(self.get(tampered).status_code, 404)
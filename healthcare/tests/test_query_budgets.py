@@ -0,0 +1,54 @@
+from datetime import time, timedelta
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from healthcare.models import User, Appointment, MedicalRecord, Notification, Task, VitalSigns
+from healthcare.testing import QueryBudgetMixin
+
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    """The budgeted views stay within QUERY_BUDGETS whatever the number of rows they list."""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.doctor = User.objects.create_user('doctor', role='doctor', first_name='Dana')
+        cls.nurse = User.objects.create_user('nurse', role='nurse', first_name='Noor')
+        cls.patient = User.objects.create_user('patient', role='patient', first_name='Pat')
+        cls.admin = User.objects.create_user('admin', role='super_admin')
+        today = timezone.localdate()
+        for index in range(10):
+            patient = User.objects.create_user(f'patient{index}', role='patient')
+            for owner in [patient, cls.patient]:
+                Appointment.objects.create(patient=owner, doctor=cls.doctor, status='approved', type='Checkup',
+                                           date=today + timedelta(days=index), time=time(8, index * 2 + (owner == patient)))
+                MedicalRecord.objects.create(patient=owner, doctor=cls.doctor, diagnosis='Flu', treatment='Rest',
+                                             prescription='Fluids', date=today)
+                VitalSigns.objects.create(patient=owner, recorded_by=cls.nurse, blood_pressure_systolic=120,
+                                          blood_pressure_diastolic=80, heart_rate=70, temperature=36.6,
+                                          oxygen_saturation=98)
+                Task.objects.create(title='Check vitals', description='Morning round', assigned_to=cls.nurse,
+                                    patient=owner, due_date=today)
+            for user in [cls.doctor, cls.nurse, cls.patient]:
+                Notification.objects.create(user=user, title='Update', message='Something changed')
+    
+    def assertViewsWithinBudget(self, user, names):
+        self.client.force_login(user)
+        for name in names:
+            with self.subTest(role=user.role, view=name):
+                response = self.assertWithinQueryBudget(reverse(name))
+                self.assertEqual(response.status_code, 200)
+    
+    def test_doctor(self):
+        self.assertViewsWithinBudget(self.doctor, ['dashboard', 'appointments', 'medical_records', 'tasks',
+                                                   'notifications', 'patient_roster'])
+    
+    def test_nurse(self):
+        self.assertViewsWithinBudget(self.nurse, ['dashboard', 'appointments', 'medical_records', 'tasks',
+                                                  'vitals', 'notifications', 'patient_roster'])
+    
+    def test_patient(self):
+        self.assertViewsWithinBudget(self.patient, ['dashboard', 'appointments', 'medical_records', 'vitals',
+                                                    'notifications'])
+    
+    def test_super_admin(self):
+        self.assertViewsWithinBudget(self.admin, ['dashboard', 'appointments', 'medical_records', 'tasks',
+                                                  'vitals', 'patient_roster'])
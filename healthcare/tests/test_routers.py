@@ -0,0 +1,75 @@
+from unittest import skipUnless
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from healthcare.middleware import STICKY_COOKIE
+from healthcare.models import User, Notification
+from healthcare.notifications import unread_count
+
+WRITES = ('INSERT', 'UPDATE', 'DELETE')
+
+@skipUnless('replica_1' in settings.DATABASES, 'set DB_REPLICAS to run the replica routing tests')
+class ReplicaRoutingTests(TransactionTestCase):
+    """Replica-routed views read from the replica, writes and everything after them use the primary.
+    
+    replica_1 is a TEST MIRROR of the default database, so both connections see
+    the same rows. TransactionTestCase commits them, which a mirror needs: it is
+    a separate connection and cannot see another connection's open transaction.
+    """
+    # Every configured alias, i.e. default and replica_1 when the test runs
+    databases = '__all__'
+    
+    def setUp(self):
+        self.nurse = User.objects.create_user('nurse', role='nurse')
+        self.notification = Notification.objects.create(user=self.nurse, title='Update', message='Changed')
+        self.client.force_login(self.nurse)
+        cache.clear()
+    
+    def get(self, name, method='get', **kwargs):
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica_1']) as replica:
+            response = getattr(self.client, method)(reverse(name, kwargs=kwargs))
+        return response, [query['sql'] for query in primary], [query['sql'] for query in replica]
+    
+    def test_replica_views_read_from_replica(self):
+        unread_count(self.nurse.pk)
+        response, primary, replica = self.get('notifications')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(any('healthcare_notification' in sql for sql in replica))
+        self.assertFalse(any('healthcare_notification' in sql for sql in primary))
+    
+    def test_cache_fills_read_from_primary(self):
+        # The unread counter is not cached yet, so the page counts unread rows to fill it
+        response, primary, replica = self.get('notifications')
+        self.assertEqual(response.status_code, 200)
+        unread = [sql for sql in primary + replica if 'NOT "healthcare_notification"."is_read"' in sql]
+        self.assertEqual(len(unread), 1)
+        self.assertIn(unread[0], primary)
+        self.assertTrue(any('healthcare_notification' in sql for sql in replica))
+    
+    def test_fragment_cached_views_read_from_primary(self):
+        response, primary, replica = self.get('dashboard')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(replica, [])
+    
+    def test_other_views_read_from_primary(self):
+        response, primary, replica = self.get('profile')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(replica, [])
+    
+    def test_writes_go_to_primary(self):
+        response, primary, replica = self.get('notification_mark_read', method='post', pk=self.notification.pk)
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(any(sql.startswith('UPDATE "healthcare_notification"') for sql in primary))
+        self.assertFalse(any(sql.startswith(WRITES) for sql in replica))
+        self.assertIn(STICKY_COOKIE, response.cookies)
+    
+    def test_reads_stick_to_primary_after_write(self):
+        self.get('notification_mark_read', method='post', pk=self.notification.pk)
+        response, primary, replica = self.get('notifications')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(replica, [])
+        self.assertTrue(any('healthcare_notification' in sql for sql in primary))
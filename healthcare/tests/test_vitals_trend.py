@@ -0,0 +1,53 @@
+from datetime import timedelta
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from healthcare.models import User, VitalSigns
+
+class VitalsTrendPointsTests(TestCase):
+    """?points= is clamped to [3, 1000], so no value returns the unsampled series."""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.nurse = User.objects.create_user('nurse', role='nurse')
+        cls.patient = User.objects.create_user('patient', role='patient')
+        now = timezone.now()
+        VitalSigns.objects.bulk_create([
+            VitalSigns(patient=cls.patient, recorded_by=cls.nurse, blood_pressure_systolic=120,
+                       blood_pressure_diastolic=80, heart_rate=60 + index % 30, temperature=36.6,
+                       oxygen_saturation=98, recorded_at=now - timedelta(minutes=10 * index))
+            for index in range(50)
+        ])
+    
+    def setUp(self):
+        self.client.force_login(self.nurse)
+    
+    def get(self, points):
+        # A one-day range is served from the raw readings
+        end = timezone.now()
+        return self.client.get(reverse('vitals_trend', kwargs={'patient_id': self.patient.pk}), {
+            'metric': 'heart_rate', 'points': points,
+            'start': (end - timedelta(days=1)).isoformat(), 'end': end.isoformat(),
+        })
+    
+    def test_small_and_negative_points_are_raised_to_the_minimum(self):
+        for points in ['0', '1', '2', '-5']:
+            with self.subTest(points=points):
+                response = self.get(points)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.json()['points']), 3)
+    
+    def test_points_within_range(self):
+        response = self.get('10')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['points']), 10)
+    
+    def test_large_points_are_capped(self):
+        response = self.get('1000000000000000000000')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['points']), 50)
+    
+    def test_non_integer_points(self):
+        for points in ['abc', '1.5', '', 'nan']:
+            with self.subTest(points=points):
+                self.assertEqual(self.get(points).status_code, 400)
@@ -0,0 +1,129 @@
+from datetime import timedelta
+import numpy as np
+from django.db import transaction
+from django.db.models import Count, Max, Min, Sum
+from django.db.models.functions import Trunc
+from django.utils import timezone
+from .models import VitalSigns, VitalSignsRollup
+
+METRICS = [metric for metric, label in VitalSignsRollup.METRIC_CHOICES]
+PERIODS = {'hour': timedelta(hours=1), 'day': timedelta(days=1)}
+
+# Ranges up to RAW_SPAN are served from raw readings, up to HOURLY_SPAN from hourly rollups
+RAW_SPAN = timedelta(days=2)
+HOURLY_SPAN = timedelta(days=90)
+# Bounds of the points a trend may be downsampled to; LTTB needs at least three
+MIN_TREND_POINTS = 3
+MAX_TREND_POINTS = 1000
+
+def truncate(value, period):
+    value = timezone.localtime(value).replace(minute=0, second=0, microsecond=0)
+    if period == 'day':
+        value = value.replace(hour=0)
+    return value
+
+def refresh_rollups(patient_ids, start, end):
+    """Recompute the hourly and daily rollups covering [start, end] for the given patients.
+    
+    Affected buckets are re-aggregated from the raw readings and replaced, so the
+    operation is idempotent and also correct after late or deleted readings.
+    """
+    patient_ids = list(patient_ids)
+    if not patient_ids:
+        return 0
+    aggregates = {}
+    for metric in METRICS:
+        aggregates[f'{metric}__count'] = Count(metric)
+        aggregates[f'{metric}__sum'] = Sum(metric)
+        aggregates[f'{metric}__min'] = Min(metric)
+        aggregates[f'{metric}__max'] = Max(metric)
+    
+    written = 0
+    for period, length in PERIODS.items():
+        window_start = truncate(start, period)
+        window_end = truncate(end, period) + length
+        groups = (VitalSigns.objects
+                  .filter(patient_id__in=patient_ids, recorded_at__gte=window_start, recorded_at__lt=window_end)
+                  .annotate(bucket=Trunc('recorded_at', period))
+                  .order_by()
+                  .values('patient_id', 'bucket')
+                  .annotate(**aggregates))
+        rollups = []
+        for group in groups:
+            for metric in METRICS:
+                count = group[f'{metric}__count']
+                if not count:
+                    continue
+                rollups.append(VitalSignsRollup(
+                    patient_id=group['patient_id'],
+                    metric=metric,
+                    period=period,
+                    bucket=group['bucket'],
+                    count=count,
+                    total=float(group[f'{metric}__sum']),
+                    minimum=float(group[f'{metric}__min']),
+                    maximum=float(group[f'{metric}__max']),
+                ))
+        with transaction.atomic():
+            VitalSignsRollup.objects.filter(
+                patient_id__in=patient_ids, period=period,
+                bucket__gte=window_start, bucket__lt=window_end,
+            ).delete()
+            VitalSignsRollup.objects.bulk_create(rollups)
+        written += len(rollups)
+    return written
+
+def lttb(x, y, threshold):
+    """Largest-Triangle-Three-Buckets downsampling; returns the indices to keep.
+    
+    The first and last points are always kept. Every bucket in between keeps the
+    point forming the largest triangle with the previously kept point and the
+    mean of the following bucket, which preserves peaks and troughs.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    every = (n - 2) / (threshold - 2)
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        areas = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(areas))
+        indices[i + 1] = a
+    return indices
+
+def trend_series(patient_id, metric, start, end, points):
+    """Return (source, [(timestamp, value), ...]) with at most `points` entries.
+    
+    Short ranges read raw readings; longer ones read hourly or daily means so
+    the number of rows fetched stays bounded regardless of history length.
+    """
+    span = end - start
+    if span <= RAW_SPAN:
+        source = 'raw'
+        rows = (VitalSigns.objects
+                .filter(patient_id=patient_id, recorded_at__gte=start, recorded_at__lte=end,
+                        **{f'{metric}__isnull': False})
+                .order_by('recorded_at')
+                .values_list('recorded_at', metric))
+        times, values = zip(*rows) if rows else ((), ())
+    else:
+        source = 'hour' if span <= HOURLY_SPAN else 'day'
+        rows = (VitalSignsRollup.objects
+                .filter(patient_id=patient_id, metric=metric, period=source,
+                        bucket__gte=truncate(start, source), bucket__lte=end)
+                .order_by('bucket')
+                .values_list('bucket', 'total', 'count'))
+        times = [bucket for bucket, total, count in rows]
+        values = [total / count for bucket, total, count in rows]
+    
+    x = np.fromiter((t.timestamp() for t in times), dtype=float, count=len(times))
+    y = np.asarray(values, dtype=float)
+    return source, [(times[i], float(y[i])) for i in lttb(x, y, points)]
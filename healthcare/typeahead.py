@@ -0,0 +1,85 @@
+import re
+from .models import User, UserSearchKey
+
+# Queries made only of these characters are looked up as phone numbers
+PHONE_QUERY = re.compile(r'[\d\s()+.-]+')
+# Fields whose change requires a user's search keys to be rewritten
+SEARCH_FIELDS = {'username', 'first_name', 'last_name', 'phone', 'role', 'is_active'}
+# A user has at most this many keys: username, first name, last name, full name and phone
+KEYS_PER_USER = 5
+# Above every character, so key < prefix + PREFIX_END holds for every key that starts with prefix
+PREFIX_END = '\U0010ffff'
+
+def _digits(value):
+    return re.sub(r'\D', '', value or '')
+
+def normalize(query):
+    query = query.strip()
+    if PHONE_QUERY.fullmatch(query):
+        return _digits(query)
+    return ' '.join(query.casefold().split())
+
+def _label(username, first_name, last_name):
+    full_name = f'{first_name} {last_name}'.strip()
+    return f'{full_name} ({username})' if full_name else username
+
+def search_keys(user):
+    """Unsaved UserSearchKey rows for a user; none for inactive users."""
+    if not user.is_active:
+        return []
+    full_name = f'{user.first_name} {user.last_name}'.strip()
+    keys = {normalize(key) for key in [user.username, user.first_name, user.last_name, full_name]}
+    keys.add(_digits(user.phone))
+    return [UserSearchKey(user_id=user.pk, role=user.role, key=key) for key in sorted(keys) if key]
+
+def index_user(user):
+    """Rewrite the search keys of one user after it was saved."""
+    UserSearchKey.objects.filter(user_id=user.pk).delete()
+    UserSearchKey.objects.bulk_create(search_keys(user))
+
+def rebuild_user_index(user_ids=None, batch_size=2000):
+    """Rewrite the search keys of the given users, or of everyone, and return the number of keys."""
+    users = User.objects.only('pk', 'username', 'first_name', 'last_name', 'phone', 'role', 'is_active')
+    keys = UserSearchKey.objects.all()
+    if user_ids is not None:
+        users = users.filter(pk__in=user_ids)
+        keys = keys.filter(user_id__in=user_ids)
+    keys.delete()
+    written = 0
+    batch = []
+    for user in users.order_by('pk').iterator(chunk_size=batch_size):
+        batch.extend(search_keys(user))
+        if len(batch) >= batch_size:
+            written += len(UserSearchKey.objects.bulk_create(batch))
+            batch = []
+    written += len(UserSearchKey.objects.bulk_create(batch))
+    return written
+
+def search_users(query, roles, limit=10):
+    """Return [{'id', 'text'}] for active users in roles whose name, username or phone starts with query.
+    
+    Each role is one range scan of the (role, key) index, so the cost depends
+    on the limit, not on the number of users. SQLite scans it for the key
+    range, PostgreSQL for the LIKE prefix, which is all a varchar_pattern_ops
+    index can answer under a non-C collation; neither can sort by key there,
+    so matches are not ordered before the limit.
+    """
+    prefix = normalize(query)
+    if not prefix:
+        return []
+    user_ids = []
+    for role in roles:
+        matches = (UserSearchKey.objects
+                   .filter(role=role, key__gte=prefix, key__lt=prefix + PREFIX_END, key__startswith=prefix)
+                   .values_list('user_id', flat=True)[:limit * KEYS_PER_USER])
+        user_ids.extend(list(dict.fromkeys(matches))[:limit])
+    users = User.objects.filter(pk__in=user_ids).values_list(
+        'pk', 'username', 'first_name', 'last_name')
+    results = [{'id': pk, 'text': _label(username, first_name, last_name)}
+               for pk, username, first_name, last_name in users]
+    return sorted(results, key=lambda result: result['text'].casefold())[:limit]
+
+def user_label(pk):
+    """Label of one user for an initial widget value."""
+    user = User.objects.filter(pk=pk).values_list('username', 'first_name', 'last_name').first()
+    return _label(*user) if user else ''
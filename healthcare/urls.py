@@ -15,10 +15,15 @@ urlpatterns = [
     # Appointments
     path('appointments/', views.AppointmentListView.as_view(), name='appointments'),
     path('appointments/create/', views.AppointmentCreateView.as_view(), name='appointment_create'),
+    path('appointments/slots/', views.appointment_slots, name='appointment_slots'),
     path('appointments/<int:pk>/update/', views.AppointmentUpdateView.as_view(), name='appointment_update'),
     path('appointments/<int:pk>/approve/', views.approve_appointment, name='appointment_approve'),
     path('appointments/<int:pk>/reject/', views.reject_appointment, name='appointment_reject'),
     
+    # Patient panel and roster
+    path('my-patients/', views.PatientPanelView.as_view(), name='patient_panel'),
+    path('roster/', views.PatientRosterView.as_view(), name='patient_roster'),
+    
     # Medical Records
     path('medical-records/', views.MedicalRecordListView.as_view(), name='medical_records'),
     path('medical-records/create/', views.MedicalRecordCreateView.as_view(), name='medical_record_create'),
@@ -33,15 +38,30 @@ urlpatterns = [
     # Vital Signs
     path('vitals/', views.VitalSignsListView.as_view(), name='vitals'),
     path('vitals/create/', views.VitalSignsCreateView.as_view(), name='vitals_create'),
+    path('vitals/bulk/', views.VitalSignsBulkUploadView.as_view(), name='vitals_bulk'),
+    path('vitals/trend/<int:patient_id>/', views.vitals_trend, name='vitals_trend'),
+    
+    # Exports
+    path('export/<str:dataset>/', views.export_data, name='export_data'),
+    
+    # JSON API
+    path('api/sync/', views.api_sync, name='api_sync'),
+    path('api/sync/vitals/', views.api_sync_vitals, name='api_sync_vitals'),
+    path('api/<str:resource>/', views.api_list, name='api_list'),
+    path('api/<str:resource>/<int:pk>/', views.api_detail, name='api_detail'),
     
     # Users (Admin only)
     path('users/', views.UserListView.as_view(), name='users'),
+    path('users/search/', views.user_search, name='user_search'),
     path('users/<int:pk>/', views.UserDetailView.as_view(), name='user_detail'),
+    path('profiling/', views.query_profile, name='query_profile'),
     
     # Profile
     path('profile/', views.ProfileView.as_view(), name='profile'),
+    path('avatars/<str:filename>', views.avatar_thumbnail, name='avatar_thumbnail'),
     
     # Notifications
     path('notifications/', views.NotificationListView.as_view(), name='notifications'),
     path('notifications/<int:pk>/mark-read/', views.mark_notification_read, name='notification_mark_read'),
+    path('events/', views.event_stream, name='event_stream'),
 ]
\ No newline at end of file
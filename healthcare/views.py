@@ -1,16 +1,46 @@
+import io
+from datetime import date, timedelta
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import login
 from django.contrib.auth.views import LoginView
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
-from django.views.generic import TemplateView, ListView, CreateView, UpdateView, DetailView
+from django.views.generic import TemplateView, ListView, CreateView, UpdateView, DetailView, FormView
 from django.contrib import messages
+from django.db import transaction
+from asgiref.sync import sync_to_async
 from django.db.models import Q, Count
+from django.conf import settings
 from django.utils import timezone
-from django.http import JsonResponse
-from .models import User, Appointment, MedicalRecord, Task, VitalSigns, Notification
+from django.utils.functional import SimpleLazyObject
+from django.utils.dateparse import parse_datetime
+from django.core.files.storage import default_storage
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, Http404, JsonResponse, HttpResponse, HttpResponseRedirect, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from django.views.decorators.http import require_http_methods
+from .models import User, Appointment, DoctorPatient, MedicalRecord, PatientSummary, Task, VitalSigns, Notification
 from .forms import (CustomUserCreationForm, CustomAuthenticationForm, AppointmentForm, 
-                   MedicalRecordForm, TaskForm, VitalSignsForm, UserUpdateForm)
+                   MedicalRecordForm, TaskForm, VitalSignsForm, UserUpdateForm,
+                   VitalSignsBulkUploadForm, ExportForm)
+from .stats import get_dashboard_stats
+from .notifications import decrement_unread, notify, publish_unread_count, unread_count
+from .events import get_broker, user_channel, format_event
+from .pagination import KeysetPaginationMixin, RankedPaginator
+from .ingest import detect_format, parse_vitals_rows, ingest_vitals
+from .timeseries import MAX_TREND_POINTS, METRICS, MIN_TREND_POINTS, trend_series
+from .scheduling import SlotUnavailable, book_appointment, free_slots, next_free_slots
+from .search import search_records
+from .permissions import ObjectPermissionMixin, has_object_permission
+from .middleware import profiles
+from .export import DATASETS, FORMATS, export_filename, export_queryset, stream_export
+from .api import RESOURCES, ApiError, compute_etag, page_size, parse_payload
+from .sync import sync_changes, upload_vitals
+from .typeahead import search_users
+from .summaries import refresh_summaries
+from .avatars import CONTENT_TYPES, THUMBNAIL_DIR, THUMBNAIL_FILENAME
+from .fragments import USERS_SCOPE, FragmentCacheMixin, attach_fragment_versions, fragment_versions, user_scope
 
 class WelcomeView(TemplateView):
     template_name = 'healthcare/welcome.html'
@@ -42,7 +72,7 @@ class RegisterView(CreateView):
     def get_success_url(self):
         return '/dashboard/'
 
-class DashboardView(LoginRequiredMixin, TemplateView):
+class DashboardView(LoginRequiredMixin, FragmentCacheMixin, TemplateView):
     template_name = 'healthcare/dashboard.html'
     
     def get_context_data(self, **kwargs):
@@ -50,42 +80,47 @@ class DashboardView(LoginRequiredMixin, TemplateView):
         user = self.request.user
         
         # Common stats
-        context['total_users'] = User.objects.count()
-        context['total_appointments'] = Appointment.objects.count()
-        context['pending_appointments'] = Appointment.objects.filter(status='pending').count()
+        stats = get_dashboard_stats()
+        context['total_users'] = stats['total_users']
+        context['total_appointments'] = stats['total_appointments']
+        context['pending_appointments'] = stats['pending_appointments']
         
         # Role-specific data
         if user.role == 'super_admin':
             context['recent_users'] = User.objects.order_by('-date_joined')[:5]
             context['system_stats'] = {
-                'doctors': User.objects.filter(role='doctor').count(),
-                'nurses': User.objects.filter(role='nurse').count(),
-                'patients': User.objects.filter(role='patient').count(),
+                'doctors': stats['doctors'],
+                'nurses': stats['nurses'],
+                'patients': stats['patients'],
             }
         
         elif user.role == 'doctor':
-            context['my_appointments'] = Appointment.objects.filter(doctor=user).order_by('-date')[:5]
+            context['my_appointments'] = Appointment.objects.filter(doctor=user).for_listing().order_by('-date')[:5]
             context['pending_approvals'] = Appointment.objects.filter(doctor=user, status='pending')
-            context['my_patients'] = User.objects.filter(
-                patient_appointments__doctor=user
-            ).distinct()[:5]
+            panel = DoctorPatient.objects.filter(doctor=user)
+            context['my_patients'] = panel.select_related('patient').order_by('-last_visit')[:5]
+            context['patient_count'] = SimpleLazyObject(panel.count)
         
         elif user.role == 'nurse':
             context['my_tasks'] = Task.objects.filter(assigned_to=user).order_by('-created_at')[:5]
-            context['pending_tasks'] = Task.objects.filter(assigned_to=user, status='pending').count()
-            context['today_tasks'] = Task.objects.filter(
+            context['pending_tasks'] = SimpleLazyObject(Task.objects.filter(assigned_to=user, status='pending').count)
+            context['today_tasks'] = SimpleLazyObject(Task.objects.filter(
                 assigned_to=user, 
                 due_date=timezone.now().date()
-            ).count()
+            ).count)
         
         elif user.role == 'patient':
-            context['my_appointments'] = Appointment.objects.filter(patient=user).order_by('-date')[:5]
+            context['my_appointments'] = Appointment.objects.filter(patient=user).for_listing().order_by('-date')[:5]
             context['my_records'] = MedicalRecord.objects.filter(patient=user).order_by('-date')[:3]
-            context['upcoming_appointments'] = Appointment.objects.filter(
+            context['upcoming_appointments'] = SimpleLazyObject(Appointment.objects.filter(
                 patient=user, 
                 status='approved',
                 date__gte=timezone.now().date()
-            ).count()
+            ).count)
+        
+        # The role panels are cached fragments; counts above stay lazy so a cache hit skips their queries
+        context['dashboard_versions'] = fragment_versions(*self.get_fragment_scopes(user))
+        context['today'] = timezone.now().date()
         
         # Notifications
         context['notifications'] = Notification.objects.filter(
@@ -94,22 +129,30 @@ class DashboardView(LoginRequiredMixin, TemplateView):
         ).order_by('-created_at')[:5]
         
         return context
+    
+    def get_fragment_scopes(self, user):
+        if user.role == 'super_admin':
+            return [USERS_SCOPE, 'healthcare.appointment']
+        if user.role == 'doctor':
+            return [USERS_SCOPE, user_scope('healthcare.appointment', user.pk)]
+        if user.role == 'nurse':
+            return [user_scope('healthcare.task', user.pk)]
+        return [USERS_SCOPE, user_scope('healthcare.appointment', user.pk), user_scope('healthcare.medicalrecord', user.pk)]
 
-class AppointmentListView(LoginRequiredMixin, ListView):
+class AppointmentListView(LoginRequiredMixin, KeysetPaginationMixin, FragmentCacheMixin, ListView):
     model = Appointment
     template_name = 'healthcare/appointments.html'
     context_object_name = 'appointments'
     paginate_by = 10
+    cursor_field = 'date'
     
     def get_queryset(self):
-        user = self.request.user
-        if user.role == 'patient':
-            return Appointment.objects.filter(patient=user).order_by('-date')
-        elif user.role == 'doctor':
-            return Appointment.objects.filter(doctor=user).order_by('-date')
-        elif user.role in ['nurse', 'super_admin']:
-            return Appointment.objects.all().order_by('-date')
-        return Appointment.objects.none()
+        return Appointment.objects.visible_to(self.request.user).for_listing().order_by('-date')
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        attach_fragment_versions(context['appointments'], USERS_SCOPE)
+        return context
 
 class AppointmentCreateView(LoginRequiredMixin, CreateView):
     model = Appointment
@@ -124,39 +167,82 @@ class AppointmentCreateView(LoginRequiredMixin, CreateView):
     def form_valid(self, form):
         if self.request.user.role == 'patient':
             form.instance.patient = self.request.user
+        try:
+            self.object = book_appointment(form.instance)
+        except SlotUnavailable as e:
+            form.add_error('time', str(e))
+            return self.form_invalid(form)
         messages.success(self.request, 'Appointment booked successfully!')
-        return super().form_valid(form)
+        return HttpResponseRedirect(self.get_success_url())
     
     def get_success_url(self):
         return '/appointments/'
 
-class AppointmentUpdateView(LoginRequiredMixin, UpdateView):
+class AppointmentUpdateView(LoginRequiredMixin, ObjectPermissionMixin, UpdateView):
     model = Appointment
     form_class = AppointmentForm
     template_name = 'healthcare/appointment_form.html'
+    permission_action = 'change'
     
     def get_form_kwargs(self):
         kwargs = super().get_form_kwargs()
         kwargs['user'] = self.request.user
         return kwargs
     
+    def form_valid(self, form):
+        try:
+            self.object = book_appointment(form.instance)
+        except SlotUnavailable as e:
+            form.add_error('time', str(e))
+            return self.form_invalid(form)
+        return HttpResponseRedirect(self.get_success_url())
+    
     def get_success_url(self):
         return '/appointments/'
 
+@login_required
+def appointment_slots(request):
+    """Free slots for one doctor on a date, or the next free slots across all doctors."""
+    try:
+        if 'doctor' in request.GET:
+            doctor = get_object_or_404(User, pk=int(request.GET['doctor']), role='doctor', is_active=True)
+            day = date.fromisoformat(request.GET['date'])
+            return JsonResponse({
+                'doctor': doctor.pk,
+                'date': day.isoformat(),
+                'slots': [slot.strftime('%H:%M') for slot in free_slots(doctor.pk, day)],
+            })
+        count = min(int(request.GET.get('count', 10)), 100)
+    except (KeyError, ValueError):
+        return JsonResponse({'error': 'Invalid doctor, date or count.'}, status=400)
+    
+    slots = next_free_slots(count)
+    doctors = User.objects.only('first_name', 'last_name').in_bulk({doctor_id for day, start, doctor_id in slots})
+    return JsonResponse({'slots': [
+        {
+            'doctor': doctor_id,
+            'doctor_name': doctors[doctor_id].get_full_name(),
+            'date': day.isoformat(),
+            'time': start.strftime('%H:%M'),
+        }
+        for day, start, doctor_id in slots
+    ]})
+
 @login_required
 def approve_appointment(request, pk):
     appointment = get_object_or_404(Appointment, pk=pk)
-    if request.user.role == 'doctor' and appointment.doctor == request.user:
-        appointment.status = 'approved'
-        appointment.save()
-        
-        # Create notification for patient
-        Notification.objects.create(
-            user=appointment.patient,
-            title='Appointment Approved',
-            message=f'Your appointment with Dr. {appointment.doctor.get_full_name()} has been approved.',
-            type='success'
-        )
+    if has_object_permission(request.user, appointment, 'approve'):
+        with transaction.atomic():
+            appointment.status = 'approved'
+            appointment.save()
+            
+            # Queue notification for patient
+            notify(
+                appointment.patient_id,
+                title='Appointment Approved',
+                message=f'Your appointment with Dr. {request.user.get_full_name()} has been approved.',
+                type='success'
+            )
         
         messages.success(request, 'Appointment approved successfully!')
     return redirect('appointments')
@@ -164,36 +250,54 @@ def approve_appointment(request, pk):
 @login_required
 def reject_appointment(request, pk):
     appointment = get_object_or_404(Appointment, pk=pk)
-    if request.user.role == 'doctor' and appointment.doctor == request.user:
-        appointment.status = 'rejected'
-        appointment.save()
-        
-        # Create notification for patient
-        Notification.objects.create(
-            user=appointment.patient,
-            title='Appointment Rejected',
-            message=f'Your appointment with Dr. {appointment.doctor.get_full_name()} has been rejected.',
-            type='warning'
-        )
+    if has_object_permission(request.user, appointment, 'approve'):
+        with transaction.atomic():
+            appointment.status = 'rejected'
+            appointment.save()
+            
+            # Queue notification for patient
+            notify(
+                appointment.patient_id,
+                title='Appointment Rejected',
+                message=f'Your appointment with Dr. {request.user.get_full_name()} has been rejected.',
+                type='warning'
+            )
         
         messages.warning(request, 'Appointment rejected.')
     return redirect('appointments')
 
-class MedicalRecordListView(LoginRequiredMixin, ListView):
+class MedicalRecordListView(LoginRequiredMixin, KeysetPaginationMixin, FragmentCacheMixin, ListView):
     model = MedicalRecord
     template_name = 'healthcare/medical_records.html'
     context_object_name = 'records'
     paginate_by = 10
+    cursor_field = 'date'
+    
+    def get_search_query(self):
+        return self.request.GET.get('q', '').strip()
     
     def get_queryset(self):
-        user = self.request.user
-        if user.role == 'patient':
-            return MedicalRecord.objects.filter(patient=user).order_by('-date')
-        elif user.role == 'doctor':
-            return MedicalRecord.objects.filter(doctor=user).order_by('-date')
-        elif user.role in ['nurse', 'super_admin']:
-            return MedicalRecord.objects.all().order_by('-date')
-        return MedicalRecord.objects.none()
+        queryset = MedicalRecord.objects.visible_to(self.request.user).for_listing()
+        query = self.get_search_query()
+        if query:
+            return search_records(queryset, query)
+        return queryset.order_by('-date')
+    
+    def paginate_queryset(self, queryset, page_size):
+        if not self.get_search_query():
+            return super().paginate_queryset(queryset, page_size)
+        paginator = RankedPaginator(queryset, page_size)
+        page = paginator.page(self.request.GET.get(self.cursor_kwarg))
+        return (paginator, page, page.object_list, page.has_other_pages())
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['search_query'] = self.get_search_query()
+        attach_fragment_versions(context['records'], USERS_SCOPE)
+        # Cards name the doctor unless the viewer wrote the record, so the fragment varies on that
+        for record in context['records']:
+            record.written_by_viewer = record.doctor_id == self.request.user.pk
+        return context
 
 class MedicalRecordCreateView(LoginRequiredMixin, UserPassesTestMixin, CreateView):
     model = MedicalRecord
@@ -216,10 +320,13 @@ class MedicalRecordCreateView(LoginRequiredMixin, UserPassesTestMixin, CreateVie
     def get_success_url(self):
         return '/medical-records/'
 
-class MedicalRecordDetailView(LoginRequiredMixin, DetailView):
+class MedicalRecordDetailView(LoginRequiredMixin, ObjectPermissionMixin, DetailView):
     model = MedicalRecord
     template_name = 'healthcare/medical_record_detail.html'
     context_object_name = 'record'
+    
+    def get_queryset(self):
+        return MedicalRecord.objects.select_related('patient', 'doctor')
 
 class TaskListView(LoginRequiredMixin, ListView):
     model = Task
@@ -228,12 +335,7 @@ class TaskListView(LoginRequiredMixin, ListView):
     paginate_by = 10
     
     def get_queryset(self):
-        user = self.request.user
-        if user.role in ['nurse', 'doctor']:
-            return Task.objects.filter(assigned_to=user).order_by('-created_at')
-        elif user.role == 'super_admin':
-            return Task.objects.all().order_by('-created_at')
-        return Task.objects.none()
+        return Task.objects.visible_to(self.request.user).for_listing().order_by('-created_at')
 
 class TaskCreateView(LoginRequiredMixin, UserPassesTestMixin, CreateView):
     model = Task
@@ -250,10 +352,11 @@ class TaskCreateView(LoginRequiredMixin, UserPassesTestMixin, CreateView):
     def get_success_url(self):
         return '/tasks/'
 
-class TaskUpdateView(LoginRequiredMixin, UpdateView):
+class TaskUpdateView(LoginRequiredMixin, ObjectPermissionMixin, UpdateView):
     model = Task
     form_class = TaskForm
     template_name = 'healthcare/task_form.html'
+    permission_action = 'change'
     
     def get_success_url(self):
         return '/tasks/'
@@ -261,26 +364,22 @@ class TaskUpdateView(LoginRequiredMixin, UpdateView):
 @login_required
 def complete_task(request, pk):
     task = get_object_or_404(Task, pk=pk)
-    if task.assigned_to == request.user:
+    if has_object_permission(request.user, task, 'complete'):
         task.status = 'completed'
         task.completed_at = timezone.now()
         task.save()
         messages.success(request, 'Task completed successfully!')
     return redirect('tasks')
 
-class VitalSignsListView(LoginRequiredMixin, ListView):
+class VitalSignsListView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     model = VitalSigns
     template_name = 'healthcare/vitals.html'
     context_object_name = 'vitals'
     paginate_by = 10
+    cursor_field = 'recorded_at'
     
     def get_queryset(self):
-        user = self.request.user
-        if user.role == 'patient':
-            return VitalSigns.objects.filter(patient=user).order_by('-recorded_at')
-        elif user.role in ['nurse', 'doctor', 'super_admin']:
-            return VitalSigns.objects.all().order_by('-recorded_at')
-        return VitalSigns.objects.none()
+        return VitalSigns.objects.visible_to(self.request.user).for_listing().order_by('-recorded_at')
 
 class VitalSignsCreateView(LoginRequiredMixin, UserPassesTestMixin, CreateView):
     model = VitalSigns
@@ -298,6 +397,302 @@ class VitalSignsCreateView(LoginRequiredMixin, UserPassesTestMixin, CreateView):
     def get_success_url(self):
         return '/vitals/'
 
+class VitalSignsBulkUploadView(LoginRequiredMixin, UserPassesTestMixin, FormView):
+    """Bulk ingestion of monitor readings from an uploaded file or a raw request body.
+    
+    Multipart uploads render the result page; a CSV or JSON-lines request body
+    gets a JSON summary instead.
+    """
+    form_class = VitalSignsBulkUploadForm
+    template_name = 'healthcare/vitals_bulk_form.html'
+    
+    def test_func(self):
+        return self.request.user.role in ['nurse', 'doctor']
+    
+    def post(self, request, *args, **kwargs):
+        if request.content_type == 'multipart/form-data':
+            return super().post(request, *args, **kwargs)
+        fmt = detect_format(content_type=request.content_type)
+        result = ingest_vitals(parse_vitals_rows(io.BytesIO(request.body), fmt), request.user)
+        status = 400 if result['errors'] and not result['created'] else 200
+        return JsonResponse(result, status=status)
+    
+    def form_valid(self, form):
+        upload = form.cleaned_data['file']
+        fmt = detect_format(upload.name, upload.content_type)
+        result = ingest_vitals(parse_vitals_rows(upload, fmt), self.request.user)
+        if result['created']:
+            messages.success(self.request, f"{result['created']} vital sign readings recorded.")
+        return self.render_to_response(self.get_context_data(form=self.form_class(), result=result))
+
+@login_required
+def vitals_trend(request, patient_id):
+    """Downsampled time series of one vital sign metric for charting."""
+    if not VitalSigns.objects.visible_to(request.user).filter(patient_id=patient_id).exists():
+        return JsonResponse({'error': 'Not found.'}, status=404)
+    
+    metric = request.GET.get('metric', 'heart_rate')
+    if metric not in METRICS:
+        return JsonResponse({'error': f'Unknown metric: {metric}'}, status=400)
+    try:
+        end = parse_datetime(request.GET['end']) if 'end' in request.GET else timezone.now()
+        start = parse_datetime(request.GET['start']) if 'start' in request.GET else end - timedelta(days=7)
+        points = int(request.GET.get('points', 200))
+    except (ValueError, TypeError, OverflowError):
+        return JsonResponse({'error': 'Invalid range or points.'}, status=400)
+    if start is None or end is None or start >= end:
+        return JsonResponse({'error': 'Invalid range or points.'}, status=400)
+    points = max(MIN_TREND_POINTS, min(points, MAX_TREND_POINTS))
+    if timezone.is_naive(start):
+        start = timezone.make_aware(start)
+    if timezone.is_naive(end):
+        end = timezone.make_aware(end)
+    
+    source, series = trend_series(patient_id, metric, start, end, points)
+    return JsonResponse({
+        'patient': patient_id,
+        'metric': metric,
+        'source': source,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'points': [[timestamp.isoformat(), value] for timestamp, value in series],
+    })
+
+@login_required
+def export_data(request, dataset):
+    """Stream every row of a dataset the user can see as CSV, JSON lines or Parquet."""
+    if dataset not in DATASETS:
+        return JsonResponse({'error': f'Unknown dataset: {dataset}'}, status=404)
+    form = ExportForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors}, status=400)
+    
+    filters = form.cleaned_data
+    queryset = DATASETS[dataset].model.objects.visible_to(request.user)
+    try:
+        queryset = export_queryset(dataset, queryset, patient=filters['patient'], doctor=filters['doctor'],
+                                   start=filters['start'], end=filters['end'])
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    fmt = filters['format']
+    response = StreamingHttpResponse(stream_export(dataset, queryset, fmt), content_type=FORMATS[fmt][0])
+    response['Content-Disposition'] = f'attachment; filename="{export_filename(dataset, fmt)}"'
+    return response
+
+def _api_response(data, status=200, etag=None, last_modified=None):
+    response = JsonResponse(data, status=status, json_dumps_params={'separators': (',', ':')})
+    if etag:
+        response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    # Clients may keep the body but must revalidate it with If-None-Match on every poll
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+def _api_object(api, pk, columns):
+    return api.rows([pk], columns)[0]
+
+def _api_save(request, api, instance=None):
+    payload = parse_payload(request)
+    form_fields = list(api.form_class.base_fields)
+    form = api.get_form(request.user, api.form_data(payload, form_fields, instance), instance)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors}, status=400)
+    with transaction.atomic():
+        obj = api.save(form, request.user, created=instance is None)
+    row = _api_object(api, obj.pk, api.columns())
+    return _api_response(row, status=201 if instance is None else 200,
+                         etag=compute_etag(obj.pk, row['updated_at'], api.columns()))
+
+@require_http_methods(['GET', 'HEAD', 'POST'])
+def api_list(request, resource):
+    """List (newest first, paged with ?before=<id>) or create objects of one API resource.
+    
+    The ETag is computed from the (id, updated_at) pairs of the page before
+    any other column is read, so an unchanged poll costs one narrow query
+    and gets a 304 with no body.
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Authentication required.'}, status=401)
+    api = RESOURCES.get(resource)
+    if api is None:
+        return JsonResponse({'error': f'Unknown resource: {resource}'}, status=404)
+    
+    try:
+        if request.method == 'POST':
+            if request.user.role not in api.create_roles:
+                return JsonResponse({'error': 'You cannot create these objects.'}, status=403)
+            return _api_save(request, api)
+        
+        columns = api.columns(request.GET.get('fields'))
+        limit = page_size(request.GET.get('limit'))
+        queryset = api.visible(request.user).order_by('-pk')
+        if request.GET.get('before'):
+            queryset = queryset.filter(pk__lt=int(request.GET['before']))
+    except ApiError as e:
+        return JsonResponse({'error': str(e)}, status=e.status)
+    except ValueError:
+        return JsonResponse({'error': 'before must be an object id.'}, status=400)
+    
+    keys = list(queryset.values_list('pk', 'updated_at')[:limit + 1])
+    has_next = len(keys) > limit
+    keys = keys[:limit]
+    etag = compute_etag(request.user.pk, request.user.role, columns, has_next, keys)
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        return not_modified
+    
+    next_url = None
+    if has_next:
+        params = request.GET.copy()
+        params['before'] = keys[-1][0]
+        next_url = f'{request.path}?{params.urlencode()}'
+    results = api.rows([pk for pk, updated_at in keys], columns)
+    return _api_response({'results': results, 'next': next_url}, etag=etag)
+
+@require_http_methods(['GET', 'HEAD', 'PATCH'])
+def api_detail(request, resource, pk):
+    """Read or partially update one object; GET honours If-None-Match and If-Modified-Since."""
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Authentication required.'}, status=401)
+    api = RESOURCES.get(resource)
+    if api is None:
+        return JsonResponse({'error': f'Unknown resource: {resource}'}, status=404)
+    
+    try:
+        if request.method == 'PATCH':
+            instance = api.editable(request.user).filter(pk=pk).first()
+            if instance is None:
+                if api.visible(request.user).filter(pk=pk).exists():
+                    return JsonResponse({'error': 'You cannot change this object.'}, status=403)
+                return JsonResponse({'error': 'Not found.'}, status=404)
+            return _api_save(request, api, instance)
+        columns = api.columns(request.GET.get('fields'))
+    except ApiError as e:
+        return JsonResponse({'error': str(e)}, status=e.status)
+    
+    updated_at = api.visible(request.user).filter(pk=pk).values_list('updated_at', flat=True).first()
+    if updated_at is None:
+        return JsonResponse({'error': 'Not found.'}, status=404)
+    etag = compute_etag(pk, updated_at, columns)
+    not_modified = get_conditional_response(request, etag=etag, last_modified=int(updated_at.timestamp()))
+    if not_modified is not None:
+        return not_modified
+    return _api_response(_api_object(api, pk, columns), etag=etag, last_modified=updated_at)
+
+@require_http_methods(['GET'])
+def api_sync(request):
+    """Changes to the user's tasks, notifications and vitals since ?token=, for offline clients.
+    
+    Without a token the first call returns everything in scope. Clients keep
+    calling with the returned token while 'more' is true.
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Authentication required.'}, status=401)
+    try:
+        changes = sync_changes(request.user, request.GET.get('token'))
+    except ApiError as e:
+        return JsonResponse({'error': str(e)}, status=e.status)
+    return _api_response(changes)
+
+@require_http_methods(['POST'])
+def api_sync_vitals(request):
+    """Store readings taken offline; each one carries an idempotency_key so retries are safe."""
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Authentication required.'}, status=401)
+    if request.user.role not in RESOURCES['vitals'].create_roles:
+        return JsonResponse({'error': 'You cannot record vitals.'}, status=403)
+    try:
+        readings = parse_payload(request).get('readings')
+        if not isinstance(readings, list):
+            raise ApiError('readings must be a list.')
+        result = upload_vitals(request.user, readings)
+    except ApiError as e:
+        return JsonResponse({'error': str(e)}, status=e.status)
+    return _api_response(result)
+
+@login_required
+def query_profile(request):
+    """Rolling per-view query counts and timings recorded by QueryProfilingMiddleware."""
+    if request.user.role != 'super_admin':
+        return JsonResponse({'error': 'Forbidden.'}, status=403)
+    if request.method == 'POST':
+        profiles.clear()
+    return JsonResponse({'window': profiles.window, 'views': profiles.summary()})
+
+class PatientPanelView(LoginRequiredMixin, UserPassesTestMixin, KeysetPaginationMixin, ListView):
+    """A doctor's patients, most recently seen first."""
+    template_name = 'healthcare/patient_panel.html'
+    context_object_name = 'panel'
+    paginate_by = 25
+    cursor_field = 'last_visit'
+    count_mode = 'exact'
+    
+    def test_func(self):
+        return self.request.user.role == 'doctor'
+    
+    def get_queryset(self):
+        return DoctorPatient.objects.filter(doctor=self.request.user).select_related('patient')
+
+class PatientRosterView(LoginRequiredMixin, UserPassesTestMixin, ListView):
+    """Latest vitals, diagnosis, next appointment and open tasks of many patients, in one query per page."""
+    template_name = 'healthcare/patient_roster.html'
+    context_object_name = 'summaries'
+    paginate_by = 40
+    
+    def test_func(self):
+        return self.request.user.role in ['doctor', 'nurse', 'super_admin']
+    
+    def get_queryset(self):
+        user = self.request.user
+        summaries = PatientSummary.objects.select_related('patient', 'next_appointment_doctor')
+        if user.role == 'doctor':
+            summaries = summaries.filter(patient__panel_doctors__doctor=user)
+        elif user.role == 'nurse':
+            open_tasks = Task.objects.filter(assigned_to=user).exclude(status='completed')
+            summaries = summaries.filter(patient__in=open_tasks.values('patient_id'))
+        return summaries.order_by('patient__last_name', 'patient__first_name', 'pk')
+    
+    def paginate_queryset(self, queryset, page_size):
+        paginator = RankedPaginator(queryset, page_size)
+        page = paginator.page(self.request.GET.get('cursor'))
+        return (paginator, page, page.object_list, page.has_other_pages())
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # Nothing changes when an appointment date passes, so look up the next one for those rows here
+        today = timezone.localdate()
+        stale = [summary.patient_id for summary in context['summaries']
+                 if summary.next_appointment_date and summary.next_appointment_date < today]
+        if stale:
+            refreshed = refresh_summaries(stale, ['appointment'])
+            for summary in context['summaries']:
+                if summary.patient_id in refreshed:
+                    fresh = refreshed[summary.patient_id]
+                    summary.next_appointment_date = fresh.next_appointment_date
+                    summary.next_appointment_time = fresh.next_appointment_time
+                    summary.next_appointment_doctor_id = fresh.next_appointment_doctor_id
+        return context
+
+# Roles each role may look up in user pickers; patients only choose a doctor to book
+TYPEAHEAD_ROLES = {
+    'patient': ['doctor'],
+    'doctor': ['patient', 'doctor', 'nurse'],
+    'nurse': ['patient', 'doctor', 'nurse'],
+    'super_admin': ['patient', 'doctor', 'nurse'],
+}
+
+@login_required
+def user_search(request):
+    """Typeahead suggestions for UserTypeaheadWidget: ?q=<prefix>&role=patient[,doctor]."""
+    allowed = TYPEAHEAD_ROLES.get(request.user.role, [])
+    roles = [role for role in request.GET.get('role', '').split(',') if role]
+    if not roles or any(role not in allowed for role in roles):
+        return JsonResponse({'error': 'Forbidden.'}, status=403)
+    results = search_users(request.GET.get('q', ''), roles, settings.TYPEAHEAD_RESULTS)
+    return JsonResponse({'results': results})
+
 class UserListView(LoginRequiredMixin, UserPassesTestMixin, ListView):
     model = User
     template_name = 'healthcare/users.html'
@@ -314,6 +709,12 @@ class UserDetailView(LoginRequiredMixin, UserPassesTestMixin, DetailView):
     
     def test_func(self):
         return self.request.user.role == 'super_admin'
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        if self.object.role == 'nurse':
+            context['completed_tasks'] = self.object.assigned_tasks.filter(status='completed').count()
+        return context
 
 class ProfileView(LoginRequiredMixin, UpdateView):
     model = User
@@ -326,11 +727,30 @@ class ProfileView(LoginRequiredMixin, UpdateView):
     def get_success_url(self):
         return '/profile/'
 
-class NotificationListView(LoginRequiredMixin, ListView):
+def avatar_thumbnail(request, filename):
+    """Serve a rendered avatar thumbnail.
+    
+    Filenames carry the digest of the original upload, so a URL always
+    returns the same bytes and browsers may cache it for a year.
+    """
+    match = THUMBNAIL_FILENAME.fullmatch(filename)
+    if match is None:
+        raise Http404('Unknown avatar')
+    try:
+        file = default_storage.open(f'{THUMBNAIL_DIR}/{filename}', 'rb')
+    except FileNotFoundError:
+        raise Http404('Unknown avatar')
+    response = FileResponse(file, content_type=CONTENT_TYPES[match.group(1)])
+    patch_cache_control(response, public=True, max_age=365 * 24 * 60 * 60, immutable=True)
+    return response
+
+class NotificationListView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     model = Notification
     template_name = 'healthcare/notifications.html'
     context_object_name = 'notifications'
     paginate_by = 20
+    cursor_field = 'created_at'
+    count_mode = 'estimated'
     
     def get_queryset(self):
         return Notification.objects.filter(user=self.request.user).order_by('-created_at')
@@ -338,6 +758,47 @@ class NotificationListView(LoginRequiredMixin, ListView):
 @login_required
 def mark_notification_read(request, pk):
     notification = get_object_or_404(Notification, pk=pk, user=request.user)
-    notification.is_read = True
-    notification.save()
-    return redirect('notifications')
\ No newline at end of file
+    if not notification.is_read:
+        notification.is_read = True
+        notification.save(update_fields=['is_read', 'updated_at'])
+        decrement_unread(request.user.pk)
+        publish_unread_count(request.user.pk)
+    return redirect('notifications')
+
+def _live_counters(user):
+    counters = {'unread_notifications': unread_count(user.pk)}
+    if user.role == 'doctor':
+        counters['pending_approvals'] = Appointment.objects.filter(doctor=user, status='pending').count()
+    return counters
+
+async def _event_stream(user_id, counters):
+    subscription = get_broker().subscribe(user_channel(user_id))
+    try:
+        yield format_event('counters', counters)
+        while True:
+            event = await subscription.get(timeout=settings.EVENTS_HEARTBEAT_SECONDS)
+            if event is None:
+                yield ': keepalive\n\n'
+            else:
+                yield format_event(event['event'], event['data'])
+    finally:
+        subscription.close()
+
+async def event_stream(request):
+    """Server-sent events with live notifications and counters for the current user.
+    
+    Connections are plain coroutines waiting on a queue, so an ASGI worker can
+    hold thousands of idle streams without a thread each. Under WSGI the whole
+    infinite stream would be buffered in a worker thread, so it answers 204
+    instead, which tells EventSource not to reconnect.
+    """
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+    user = await sync_to_async(lambda: request.user if request.user.is_authenticated else None)()
+    if user is None:
+        return HttpResponse(status=401)
+    counters = await sync_to_async(_live_counters)(user)
+    response = StreamingHttpResponse(_event_stream(user.pk, counters), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -1,6 +1,6 @@
 import os
 from pathlib import Path
-from decouple import config
+from decouple import Csv, config
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -29,6 +29,8 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'healthcare.middleware.QueryProfilingMiddleware',
+    'healthcare.middleware.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -43,13 +45,20 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
+            # Parse each template once per process instead of on every render
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'healthcare.context_processors.notifications',
             ],
         },
     },
@@ -57,14 +66,79 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'medora.wsgi.application'
 
-# Database
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# Database; set DB_ENGINE=postgresql in production. DB_REPLICAS lists read replicas as
+# PostgreSQL hosts (or SQLite files), which are registered as replica_1, replica_2, ...
+DB_ENGINE = config('DB_ENGINE', default='sqlite3')
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': config('DB_NAME', default='medora'),
+            'USER': config('DB_USER', default='medora'),
+            'PASSWORD': config('DB_PASSWORD', default=''),
+            'HOST': config('DB_HOST', default='localhost'),
+            'PORT': config('DB_PORT', default='5432'),
+            # Keep connections open between requests and check them before reuse
+            'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=60, cast=int),
+            'CONN_HEALTH_CHECKS': True,
+            # Required behind PgBouncer in transaction pooling mode
+            'DISABLE_SERVER_SIDE_CURSORS': config('DB_DISABLE_SERVER_SIDE_CURSORS', default=False, cast=bool),
+            'OPTIONS': {
+                'connect_timeout': config('DB_CONNECT_TIMEOUT', default=5, cast=int),
+                'sslmode': config('DB_SSLMODE', default='prefer'),
+            },
+        }
     }
+    REPLICA_SETTING = 'HOST'
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'healthcare.backends.sqlite3',
+            'NAME': config('DB_NAME', default=str(BASE_DIR / 'db.sqlite3')),
+            'OPTIONS': {
+                # Seconds a writer waits for the lock before "database is locked"
+                'timeout': config('DB_BUSY_TIMEOUT', default=20, cast=int),
+            },
+        }
+    }
+    REPLICA_SETTING = 'NAME'
+
+# Applied to every connection by healthcare.backends.sqlite3. WAL lets readers run alongside
+# the writer; synchronous=NORMAL is durable in WAL mode except on power loss. A negative cache_size is in KiB
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': config('SQLITE_CACHE_SIZE', default=-64000, cast=int),
+    'mmap_size': config('SQLITE_MMAP_SIZE', default=268435456, cast=int),
+    'temp_store': 'MEMORY',
 }
 
+for index, replica in enumerate(config('DB_REPLICAS', default='', cast=Csv()), start=1):
+    DATABASES[f'replica_{index}'] = {
+        **DATABASES['default'],
+        REPLICA_SETTING: replica,
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['healthcare.routers.PrimaryReplicaRouter']
+
+# Read-heavy views (by URL name) whose GET requests may be served from a replica.
+# After a write, the client reads from the primary for REPLICA_STICKY_SECONDS so it sees its own changes.
+# Views that fill cached fragments (dashboard, appointments, medical_records) stay on the primary: a
+# fragment rendered from a lagging replica would be cached under the version bumped for the new rows
+REPLICA_VIEWS = [
+    'patient_panel',
+    'medical_record_detail',
+    'tasks',
+    'vitals',
+    'vitals_trend',
+    'notifications',
+    'users',
+    'api_list',
+    'api_detail',
+]
+REPLICA_STICKY_SECONDS = config('REPLICA_STICKY_SECONDS', default=10, cast=int)
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -105,6 +179,93 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap5"
 CRISPY_TEMPLATE_PACK = "bootstrap5"
 
+# Caching. Fragment versions, unread counters, care-team sets and booked slots are
+# invalidated through the cache, so with more than one process CACHE_BACKEND must be
+# shared, e.g. django.core.cache.backends.redis.RedisCache with CACHE_LOCATION=redis://host:6379/1
+# or django.core.cache.backends.memcached.PyMemcacheCache with CACHE_LOCATION=host:11211
+CACHE_BACKEND = config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache')
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': config('CACHE_LOCATION', default='medora'),
+        'KEY_PREFIX': config('CACHE_KEY_PREFIX', default='medora'),
+    }
+}
+if CACHE_BACKEND == 'django.core.cache.backends.locmem.LocMemCache':
+    # Room for cached template fragments on top of counters and stats
+    CACHES['default']['OPTIONS'] = {'MAX_ENTRIES': config('CACHE_MAX_ENTRIES', default=10000, cast=int)}
+DASHBOARD_STATS_TIMEOUT = config('DASHBOARD_STATS_TIMEOUT', default=60, cast=int)
+UNREAD_NOTIFICATIONS_RECONCILE_INTERVAL = config('UNREAD_NOTIFICATIONS_RECONCILE_INTERVAL', default=300, cast=int)
+PERMISSIONS_CACHE_TIMEOUT = config('PERMISSIONS_CACHE_TIMEOUT', default=300, cast=int)
+# Template fragments are keyed by version counters, so this only bounds how long unused ones linger
+FRAGMENT_CACHE_TIMEOUT = config('FRAGMENT_CACHE_TIMEOUT', default=3600, cast=int)
+
+# Admin changelists count at most this many rows; longer lists show an estimate
+ADMIN_COUNT_LIMIT = config('ADMIN_COUNT_LIMIT', default=10000, cast=int)
+
+# User pickers; suggestions returned per keystroke
+TYPEAHEAD_RESULTS = config('TYPEAHEAD_RESULTS', default=10, cast=int)
+
+# Avatars; thumbnails are square, in each size, as WebP and JPEG. Set AVATAR_THUMBNAILS_IN_THREAD=False
+# to render them with rebuild_avatar_thumbnails instead of a background thread
+AVATAR_SIZES = [40, 80, 120, 240]
+AVATAR_MAX_UPLOAD_BYTES = config('AVATAR_MAX_UPLOAD_BYTES', default=5 * 1024 * 1024, cast=int)
+AVATAR_MAX_PIXELS = config('AVATAR_MAX_PIXELS', default=25_000_000, cast=int)
+AVATAR_THUMBNAILS_IN_THREAD = config('AVATAR_THUMBNAILS_IN_THREAD', default=True, cast=bool)
+
+# Bulk ingestion
+VITALS_BULK_BATCH_SIZE = config('VITALS_BULK_BATCH_SIZE', default=500, cast=int)
+# How far ahead of the server clock an uploaded reading's recorded_at may be
+VITALS_CLOCK_SKEW_SECONDS = config('VITALS_CLOCK_SKEW_SECONDS', default=300, cast=int)
+
+# Vital sign rollups are refreshed on insert; disable to rebuild them with rebuild_vitals_rollups instead
+VITALS_ROLLUPS_ON_INSERT = config('VITALS_ROLLUPS_ON_INSERT', default=True, cast=bool)
+
+# Appointment scheduling
+APPOINTMENT_SLOT_MINUTES = config('APPOINTMENT_SLOT_MINUTES', default=30, cast=int)
+APPOINTMENT_SLOTS_CACHE_TIMEOUT = config('APPOINTMENT_SLOTS_CACHE_TIMEOUT', default=3600, cast=int)
+APPOINTMENT_SEARCH_DAYS = config('APPOINTMENT_SEARCH_DAYS', default=60, cast=int)
+
+# Notification outbox; set NOTIFICATIONS_DISPATCH_IN_THREAD=False when running dispatch_notifications --loop
+NOTIFICATIONS_DISPATCH_IN_THREAD = config('NOTIFICATIONS_DISPATCH_IN_THREAD', default=True, cast=bool)
+NOTIFICATIONS_BATCH_SIZE = config('NOTIFICATIONS_BATCH_SIZE', default=1000, cast=int)
+
+# Data export
+EXPORT_CHUNK_SIZE = config('EXPORT_CHUNK_SIZE', default=2000, cast=int)
+
+# JSON API
+API_PAGE_SIZE = config('API_PAGE_SIZE', default=50, cast=int)
+API_MAX_PAGE_SIZE = config('API_MAX_PAGE_SIZE', default=200, cast=int)
+
+# Offline sync; each sync re-reads SYNC_OVERLAP_SECONDS of changes so rows committed late are not missed.
+# Tombstones and idempotency keys are kept SYNC_RETENTION_DAYS; older sync tokens must start over
+SYNC_BATCH_SIZE = config('SYNC_BATCH_SIZE', default=500, cast=int)
+SYNC_OVERLAP_SECONDS = config('SYNC_OVERLAP_SECONDS', default=120, cast=int)
+SYNC_RETENTION_DAYS = config('SYNC_RETENTION_DAYS', default=30, cast=int)
+
+# Live events (server-sent events, served under ASGI)
+EVENTS_BROKER = config('EVENTS_BROKER', default='healthcare.events.InMemoryBroker')
+EVENTS_HEARTBEAT_SECONDS = config('EVENTS_HEARTBEAT_SECONDS', default=15, cast=int)
+EVENTS_QUEUE_SIZE = config('EVENTS_QUEUE_SIZE', default=100, cast=int)
+
+# Query profiling; budgets cap the queries a view (by URL name) may run per request.
+# Tests check them with healthcare.testing.QueryBudgetMixin; QUERY_BUDGET_RAISE=True
+# turns an overrun seen by the middleware into an error instead of a log warning
+QUERY_PROFILING = config('QUERY_PROFILING', default=DEBUG, cast=bool)
+QUERY_PROFILING_HEADERS = config('QUERY_PROFILING_HEADERS', default=DEBUG, cast=bool)
+QUERY_PROFILING_WINDOW = config('QUERY_PROFILING_WINDOW', default=500, cast=int)
+QUERY_BUDGET_DEFAULT = config('QUERY_BUDGET_DEFAULT', default=20, cast=int)
+QUERY_BUDGET_RAISE = config('QUERY_BUDGET_RAISE', default=False, cast=bool)
+QUERY_BUDGETS = {
+    'dashboard': 12,
+    'appointments': 5,
+    'medical_records': 5,
+    'tasks': 5,
+    'vitals': 5,
+    'notifications': 5,
+    'patient_roster': 5,
+}
+
 # Login URLs
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'dashboard'